@@ -0,0 +1,116 @@
+from typing import Callable, Dict, List
+import argparse
+import importlib.util
+import os
+import sys
+import time
+
+import Assessment_engine as engine
+from Assessment_engine import RULE_VERSIONS, ENGINE_FAMILIES, ENGLISH_VERSIONS, score_document
+
+# Worst-case latency benchmark for the text scorers.
+# Each input family targets one matcher with text built to make a
+# backtracking or pairwise implementation superlinear: negation + "such as"
+# chains, far-apart proximity pairs, number/space runs for quantity phrases,
+# one endless sentence, floods of negations and synonyms, attribute
+# statements that never reach a value. Every family is scored at growing
+# sizes with all versions; time per 1000 characters should stay flat up to
+# MAX_INPUT_CHARS and the total flat beyond it. The run fails (exit status 1)
+# when any document takes longer than the budget.
+#
+#   python Adversarial_benchmark.py --sizes 1000 5000 20000 100000 --budget-ms 1000
+#   python Adversarial_benchmark.py --scripts   # also the original app scorers
+
+def _repeat(unit: str, size: int, prefix: str = "", suffix: str = "") -> str:
+    body = unit * max((size - len(prefix) - len(suffix)) // len(unit), 1)
+    return prefix + body + suffix
+
+ADVERSARIAL_INPUTS: Dict[str, Callable[[int], str]] = {
+    "such_as": lambda size: _repeat("no such as ", size, prefix="shrub "),
+    "such_as_lines": lambda size: _repeat("not such as bench\n", size, prefix="wood pile "),
+    "proximity_far": lambda size: _repeat("species ", size // 2) + "x " * 20 + _repeat("diverse ", size // 2),
+    "quantity_words": lambda size: _repeat("1 big old wooden bench ", size),
+    "quantity_spaces": lambda size: _repeat("one" + " \t" * 50 + "x ", size),
+    "digit_runs": lambda size: _repeat("1" * 500 + " ", size, suffix="bench"),
+    "one_sentence": lambda size: _repeat("the meadow has shrubs and no trees ", size),
+    "many_sentences": lambda size: _repeat("no. shrub! ", size),
+    "negations": lambda size: _repeat("no not without lack of none of the ", size, suffix="shrubs"),
+    "synonyms": lambda size: _repeat("bushes thicket rock piles fallen log ", size),
+    "attribute_fillers": lambda size: _repeat("vegetation density is quite very not rather overall ", size)
+}
+
+# ----------------- Scorers -----------------
+def engine_scorer(versions: List[str]) -> Callable[[str], object]:
+    return lambda text: score_document(text, versions)
+
+def script_scorers(versions: List[str]) -> Dict[str, Callable[[str], object]]:
+    # The scoring functions of the original app scripts, loaded without Streamlit running
+    scorers = {}
+    for version in versions:
+        source = RULE_VERSIONS[version].get("source")
+        if not source or not os.path.exists(source.split()[0]):
+            continue
+        path = source.split()[0]
+        spec = importlib.util.spec_from_file_location(os.path.splitext(path)[0], path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        family = ENGINE_FAMILIES[RULE_VERSIONS[version]["engine"]]
+        if family == "biodiversity":
+            scorers[version] = module.assess_biodiversity
+        elif family == "stormwater":
+            if "density_weighted=True" in source:
+                scorers[version] = lambda text, m=module: m.assess_stormwater(text, density_weighted=True)
+            else:
+                scorers[version] = module.assess_stormwater
+        else:
+            scorers[version] = module.evaluate_maintenance
+    return scorers
+
+def time_call(scorer: Callable[[str], object], text: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        scorer(text)
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[len(timings) // 2]
+
+# ----------------- CLI -----------------
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Time the text scorers on adversarial inputs of growing size.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 5000, 20000, 100000])
+    parser.add_argument("--versions", nargs="+", choices=list(RULE_VERSIONS), default=ENGLISH_VERSIONS)
+    parser.add_argument("--inputs", nargs="+", choices=list(ADVERSARIAL_INPUTS), default=list(ADVERSARIAL_INPUTS))
+    parser.add_argument("--budget-ms", type=float, default=1000.0, help="Fail when one document takes longer.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the median is reported.")
+    parser.add_argument("--scripts", action="store_true", help="Also time the scoring functions of the app scripts.")
+    args = parser.parse_args(argv)
+
+    scorers = {"engine": engine_scorer(args.versions)}
+    if args.scripts:
+        # The scripts take the whole text; cap it as the apps' text boxes do
+        scorers.update({
+            version: lambda text, f=scorer: f(text[:engine.MAX_INPUT_CHARS])
+            for version, scorer in script_scorers(args.versions).items()
+        })
+    score_document("warm up the lemmatizer with shrubs and trees", args.versions)
+
+    print(f"MAX_INPUT_CHARS {engine.MAX_INPUT_CHARS}, MAX_SENTENCE_CHARS {engine.MAX_SENTENCE_CHARS}; median ms of {args.repeat}")
+    header = "".join(f"{size:>10}" for size in args.sizes)
+    worst = 0.0
+    for name, scorer in scorers.items():
+        print(f"\n{name:<22}{header}{'ms/1k chars':>14}")
+        for family in args.inputs:
+            texts = [ADVERSARIAL_INPUTS[family](size) for size in args.sizes]
+            timings = [time_call(scorer, text, args.repeat) for text in texts]
+            worst = max(worst, max(timings))
+            # Cost per 1000 scored characters at the largest size within the cap
+            scored = [min(len(text), engine.MAX_INPUT_CHARS or len(text)) for text in texts]
+            rate = 1000 * 1000 * timings[scored.index(max(scored))] / max(max(scored), 1)
+            print(f"  {family:<20}" + "".join(f"{1000 * t:>10.1f}" for t in timings) + f"{rate:>14.2f}")
+
+    print(f"\nWorst case {1000 * worst:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    if 1000 * worst > args.budget_ms:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1951 @@
+from typing import Dict, Tuple, List, Iterable, Iterator, Optional
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import string
+import sys
+import threading
+import time
+import weakref
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+from itertools import combinations
+
+from Metrics import METRICS, register_cache
+
+# One engine for every historical version of the text scorers.
+# Each script in the repo (Biodiversity_score*, Biodiversity_assessment_*,
+# Stormwater_assessment_*, Maintainance_assessment*) is expressed below as a
+# rule configuration in RULE_VERSIONS. All versions run over the same
+# DocumentContext, so lowercasing, synonym normalization, lemmatization,
+# sentence splitting for negation and keyword searches are computed once per
+# document and shared between versions.
+#
+#   python Assessment_engine.py corpus.jsonl --output scores.csv
+#   python Assessment_engine.py corpus.txt --versions maintenance_2 maintenance_3
+#   python Assessment_engine.py corpus.jsonl --typo-tolerance 1    # correct misspelled rule words first
+#   python Assessment_engine.py corpus.jsonl --threads 8           # thread pool; see Thread_benchmark.py
+#   python Resumable_scoring.py archive.jsonl scores.csv          # checkpointed chunks that survive restarts
+#
+# Lemmatization backends:
+#   wordnet  NLTK WordNetLemmatizer (default)
+#   table    lemma_table.json built by Lemma_table.py: inflection -> lemma for
+#            the rule vocabulary only, identity for every other token, and the
+#            stop word list, so NLTK and WordNet are never imported
+# Choose with --lemmatizer or the ASSESSMENT_LEMMATIZER environment variable.
+
+LEMMA_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lemma_table.json")
+
+# ----------------- NLTK Resources -----------------
+# Loaded once per process under _resource_lock (NLTK's lazy corpus loaders
+# are not thread-safe) and never mutated afterwards; initialize() loads them
+# all up front before threads start scoring.
+_resource_lock = threading.RLock()
+_lemmatizer = None
+_stop_words = None
+_lemma_backend = os.environ.get("ASSESSMENT_LEMMATIZER", "wordnet")
+_lemma_table = None
+# Seconds spent loading each resource, reported by the metrics
+RESOURCE_LOAD_SECONDS = {}
+
+def ensure_nltk_resources() -> None:
+    import nltk
+    for resource, path in (("wordnet", "corpora/wordnet"), ("stopwords", "corpora/stopwords")):
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            nltk.download(resource, quiet=True)
+
+def get_lemmatizer():
+    global _lemmatizer
+    if _lemmatizer is None:
+        with _resource_lock:
+            if _lemmatizer is None:
+                start = time.perf_counter()
+                ensure_nltk_resources()
+                from nltk.stem import WordNetLemmatizer
+                lemmatizer = WordNetLemmatizer()
+                # WordNet itself loads on the first lookup
+                lemmatizer.lemmatize("trees")
+                _lemmatizer = lemmatizer
+                RESOURCE_LOAD_SECONDS["wordnet"] = time.perf_counter() - start
+    return _lemmatizer
+
+def get_lemma_table() -> Dict:
+    global _lemma_table
+    if _lemma_table is None:
+        with _resource_lock:
+            if _lemma_table is None:
+                start = time.perf_counter()
+                with open(LEMMA_TABLE_PATH, encoding="utf-8") as f:
+                    table = json.load(f)
+                RESOURCE_LOAD_SECONDS["lemma_table"] = time.perf_counter() - start
+                if table["vocabulary_hash"] != vocabulary_fingerprint():
+                    print(f"Warning: {LEMMA_TABLE_PATH} was built for different rules; "
+                          "run Lemma_table.py to rebuild it.", file=sys.stderr)
+                _lemma_table = table
+    return _lemma_table
+
+def _lemmas_changed() -> None:
+    # Every thread's vocabulary drops its lemma ids before its next document
+    global _lemma_generation
+    lemmatize.cache_clear()
+    _lemma_generation += 1
+
+def set_lemmatizer(backend: str) -> None:
+    global _lemma_backend, _stop_words
+    if backend not in ("wordnet", "table"):
+        raise ValueError(f"Unknown lemmatizer backend: {backend}")
+    with _resource_lock:
+        if backend != _lemma_backend:
+            _lemma_backend = backend
+            _stop_words = None
+            _lemmas_changed()
+
+def extend_lemma_table(lemmas: Dict[str, str]) -> None:
+    # Adds lemmas needed by a new rule pack. Entries are WordNet lemmas, so
+    # adding them never changes a lemma another loaded pack depends on. The
+    # table is replaced, not modified, so concurrent lookups see either version.
+    if _lemma_backend != "table":
+        return
+    with _resource_lock:
+        table = get_lemma_table()
+        new = {token: lemma for token, lemma in lemmas.items() if table["lemmas"].get(token) != lemma}
+        if new:
+            table["lemmas"] = {**table["lemmas"], **new}
+            _lemmas_changed()
+
+def get_stop_words() -> frozenset:
+    global _stop_words
+    if _stop_words is None:
+        with _resource_lock:
+            if _stop_words is None:
+                if _lemma_backend == "table":
+                    _stop_words = frozenset(get_lemma_table()["stop_words"])
+                else:
+                    start = time.perf_counter()
+                    ensure_nltk_resources()
+                    import nltk
+                    _stop_words = frozenset(nltk.corpus.stopwords.words("english"))
+                    RESOURCE_LOAD_SECONDS["stopwords"] = time.perf_counter() - start
+    return _stop_words
+
+@lru_cache(maxsize=65536)
+def lemmatize(word: str) -> str:
+    if _lemma_backend == "table":
+        return get_lemma_table()["lemmas"].get(word, word)
+    return get_lemmatizer().lemmatize(word)
+
+# ----------------- Shared Rule Data -----------------
+BIODIVERSITY_SYNONYMS = {
+    "shrubs": "shrub", "bushy plant": "shrub", "evergreen bushes": "shrub", "flowering shrubs": "shrub",
+    "ornamental plants": "shrub", "thicket": "shrub", "bush": "shrub", "bushes": "shrub",
+    "patch of grass": "low-rise grass", "grassland": "low-rise grass", "grassy field": "low-rise grass",
+    "meadow grass": "grass meadow", "ornamental grass": "grass meadow", "natural meadow": "grass meadow",
+    "tall grass": "grass meadow", "flowering plants": "wildflower meadow", "flower bed": "wildflower meadow",
+    "young tree": "isolated tree with small canopy", "single tree": "isolated tree with small canopy",
+    "insect hotels": "insect hotel", "bee hotel": "insect hotel", "bug house": "insect hotel", "pollinator box": "insect hotel",
+    "deadwoods": "deadwood", "habitat log": "deadwood", "fallen log": "deadwood", "tree stump": "deadwood",
+    "stack of wood": "wood pile", "rocks": "piled rocks", "rock stack": "piled rocks", "pile of rocks": "piled rocks",
+    "rock piles": "piled rocks", "piled rock": "piled rocks", "rock pile": "piled rocks", "hollow logs": "hollow log", "hollow tree": "hollow log",
+    "birdhouses": "birdhouse", "nesting box": "birdhouse", "bird box": "birdhouse", "dead hedges": "dead hedge"
+}
+
+BIODIVERSITY_PHRASES = {
+    "the species variety is moderate": "moderate species variety",
+    "species variety is moderate": "moderate species variety",
+    "species variety appears moderate": "moderate species variety",
+    "species variety across the space is moderate": "moderate species variety",
+    "species variety across the area is moderate": "moderate species variety",
+    "the species variety is diverse": "diverse species variety",
+    "species variety is diverse": "diverse species variety",
+    "species variety appears diverse": "diverse species variety",
+    "vegetation density is dense": "dense vegetation",
+    "vegetation is dense": "dense vegetation",
+    "the vegetation is dense": "dense vegetation",
+    "vegetation density is moderate": "moderate vegetation",
+    "vegetation appears moderate": "moderate vegetation"
+}
+
+# Attribute statements ("the species variety across the area appears quite
+# diverse"): subject, verb, optional fillers and negation, value. Each match is
+# a fact (subject, value) and is rewritten to the canonical phrase the keyword
+# tables list, so new phrasings are new words here rather than new sentences.
+BIODIVERSITY_ATTRIBUTES = {
+    "subjects": {
+        "species variety": "species variety", "specie variety": "species variety", "variety of species": "species variety",
+        "species diversity": "species variety", "plant variety": "species variety", "plant diversity": "species variety",
+        "species mix": "species variety", "plant mix": "species variety",
+        "vegetation": "vegetation", "vegetation density": "vegetation", "vegetation cover": "vegetation",
+        "plant density": "vegetation", "planting density": "vegetation", "planting": "vegetation"
+    },
+    "verbs": ["is", "are", "appears", "appear", "seems", "seem", "looks", "look", "remains", "feels"],
+    "fillers": [
+        "across the space", "across the area", "across the site", "in the area", "on the site", "here", "overall",
+        "generally", "also", "to be", "quite", "fairly", "very", "rather", "relatively", "highly"
+    ],
+    "values": {
+        "species variety": {
+            "diverse": "diverse", "varied": "diverse", "rich": "diverse", "high": "diverse", "wide": "diverse",
+            "moderate": "moderate", "medium": "moderate", "average": "moderate", "balanced": "moderate", "fair": "moderate"
+        },
+        "vegetation": {
+            "dense": "dense", "thick": "dense", "lush": "dense",
+            "moderate": "moderate", "medium": "moderate", "moderately dense": "moderate"
+        }
+    },
+    "statements": {
+        "species variety": {"diverse": "diverse species variety", "moderate": "moderate species variety"},
+        "vegetation": {"dense": "dense vegetation", "moderate": "moderate vegetation"}
+    }
+}
+
+STORMWATER_SURFACES = {
+    "asphalt": "impermeable", "concrete": "impermeable", "paved": "impermeable",
+    "gravel": "semi-permeable", "gravel path": "semi-permeable", "gravel walkway": "semi-permeable",
+    "open soil": "semi-permeable", "dirt": "semi-permeable", "bare soil": "semi-permeable",
+    "grass": "permeable", "meadow": "permeable", "shrub": "permeable", "grasses": "permeable", "shrubs": "permeable",
+    "wood chip": "permeable", "mulch": "permeable", "wildflower": "permeable", "tree cluster": "permeable", "trees cluster": "permeable"
+}
+
+STORMWATER_VEGETATION_WEIGHTS = {
+    "low-rise grass": 1,
+    "grass meadow": 2,
+    "wildflower meadow": 3,
+    "shrub": 3,
+    "isolated tree": 2,
+    "tree cluster": 4
+}
+
+STORMWATER_SYNONYMS = {
+    "bush": "shrub", "bushes": "shrub", "shrubs": "shrub", "bushy plant": "shrub", "evergreen bushes": "shrub",
+    "flowering shrubs": "shrub", "ornamental plants": "shrub", "thicket": "shrub",
+    "natural meadow": "grass meadow", "grassland": "low-rise grass", "grassy field": "low-rise grass", "grass": "low-rise grass",
+    "grasses": "low-rise grass", "tall grass": "grass meadow", "flower bed": "wildflower meadow", "flowering plants": "wildflower meadow",
+    "patch of grass": "grass meadow", "meadow grass": "grass meadow", "ornamental grass": "grass meadow",
+    "single tree": "isolated tree", "several trees": "tree cluster", "dense tree cluster": "tree cluster", "trees cluster": "tree cluster"
+}
+
+STORMWATER_DENSITY_MAP = {
+    "sparse": 0.5, "scattered": 0.5, "patchy": 0.5, "thin": 0.5,
+    "moderate": 0.5, "some": 0.5, "few": 0.5,
+    "dense": 1, "thick": 1, "lush": 1, "abundant": 1
+}
+
+STORMWATER_STOP_WORDS = {"the", "a", "an", "is", "are", "was", "were", "and", "or", "but", "of", "for", "to"}
+
+MAINTENANCE_SYNONYMS_V1 = {
+    # Vegetation
+    "bush": "shrub", "bushes": "shrub", "shrubs": "shrub", "bushy plant": "shrub", "evergreen bushes": "shrub",
+    "flowering shrubs": "shrub", "ornamental plants": "shrub", "thicket": "shrub",
+    "natural meadow": "grass meadow", "grassland": "low-rise grass", "grassy field": "low-rise grass",
+    "tall grass": "grass meadow", "flower bed": "wildflower meadow", "flowering plants": "wildflower meadow", "patch of grass": "low-rise grass",
+    "meadow grass": "grass meadow", "ornamental grass": "grass meadow",
+
+    # Hardscape
+    "gravel walkway": "gravel path", "gravel trail": "gravel path",
+    "dirt path": "open soil path", "bare soil trail": "open soil path", "bare soil path": "open soil path",
+    "wood trail": "wood chip path", "wood path": "wood chip path",
+
+    # Infrastructure
+    "wooden bench": "bench", "benches": "bench", "log bench": "bench", "stone seat": "bench",
+    "seating island": "bench", "seating islands": "bench", "seating": "bench", "seat": "bench", "seating area": "bench", "seating areas": "bench", "tree stump": "wood stumps", "wood stump": "wood stumps", "logs": "wood logs", "wood log": "wood log",
+    "picnic area": "picnic table", "picnic tables": "picnic table", "signpost": "educational sign",
+    "sign": "educational sign", "signs": "educational sign", "educational signs": "educational sign",
+    "biodiversity sign": "educational sign", "sign board": "educational sign", "info sign": "educational sign",
+    "interpretive panel": "educational sign",
+    "plaque": "event plaque", "plaques": "event plaque", "event plaques": "event plaque",
+    "mini library": "bookshelf", "book hut": "bookshelf", "shared bookshelf": "bookshelf", "bookshelves": "bookshelf",
+
+    # Biodiversity
+    "bee hotel": "insect hotel", "bug house": "insect hotel", "insect hotels": "insect hotel",
+    "nest box": "birdhouse", "bird box": "birdhouse", "birdhouses": "birdhouse",
+    "rocks": "piled rocks", "rock stack": "piled rocks",
+    "fallen log": "deadwood", "deadwood": "deadwood",
+    "brush hedge": "dead hedge", "dead hedges": "dead hedge"
+}
+
+MAINTENANCE_SYNONYMS = {
+    syn: norm for syn, norm in MAINTENANCE_SYNONYMS_V1.items()
+    if syn not in ("seating islands", "seating area", "seating areas")
+}
+
+MAINTENANCE_WEIGHTS = {
+    "grass meadow": 1, "low-rise grass": 1, "wildflower meadow": 2, "shrub": 2, "tree": 1, "tree cluster": 2,
+    "gravel path": 2, "open soil path": 2, "wood chip path": 2,
+    "bench": 2, "wood stumps": 1, "wood logs": 1, "picnic table": 2,
+    "educational sign": 3, "event plaque": 2, "bookshelf": 3,
+    "insect hotel": 3, "birdhouse": 2, "piled rocks": 1, "deadwood": 1, "dead hedge": 1
+}
+
+MAINTENANCE_PROXIMITY = {
+    "gravel path": [("gravel", "path"), ("gravel", "trail")],
+    "open soil path": [("bare", "soil"), ("dirt", "trail")],
+    "wood chip path": [("wood", "chips"), ("mulch", "trail"), ("wood", "trail")],
+    "birdhouse": [("bird", "structure"), ("nesting", "box")],
+    "insect hotel": [("insect", "hotel"), ("bug", "shelter")],
+    "deadwood": [("fallen", "log"), ("dead", "wood")],
+    "dead hedge": [("brush", "hedge")],
+    "bench": [("wood", "seating")]
+}
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10
+}
+
+NEGATION_TERMS = ["no", "not", "without", "lacks", "lack of", "missing", "absent", "devoid of", "none of the"]
+
+# Finnish surface forms -> English description words understood by the rule
+# versions. Keys are stemmed with the Snowball Finnish stemmer when the Finnish
+# resources load, so one listed form also covers inflections sharing its stem;
+# forms whose stems differ (puu / puita / puut) are listed separately.
+FINNISH_SYNONYMS = {
+    # Vegetation
+    "pensas": "shrubs", "pensaat": "shrubs", "pensaita": "shrubs", "pensaan": "shrubs", "pensaiden": "shrubs",
+    "pensaikko": "thicket", "pensaikkoa": "thicket", "pensaikkoja": "thicket",
+    "puu": "tree", "puut": "trees", "puita": "trees", "puuta": "tree", "puun": "tree", "puiden": "trees",
+    "puusto": "trees", "puustoa": "trees",
+    "yksittäinen puu": "single tree", "yksittäinen": "single", "yksittäisiä": "single",
+    "puuryhmä": "tree cluster", "puuryhmiä": "tree cluster", "puuryhmät": "tree cluster", "puuryhmää": "tree cluster",
+    "lehtipuu": "tree", "lehtipuita": "trees", "havupuu": "tree", "havupuita": "trees", "nuori puu": "young tree",
+    "nurmikko": "grass", "nurmikkoa": "grass", "nurmikot": "grass", "nurmi": "grass", "nurmea": "grass",
+    "nurmialue": "grassland", "nurmialueita": "grassland", "ruoho": "grass", "ruohoa": "grass",
+    "ruohikko": "grass", "ruohikkoa": "grass", "heinikko": "tall grass", "heinikkoa": "tall grass",
+    "korkea heinä": "tall grass", "korkeaa heinää": "tall grass", "koristeheinä": "ornamental grass", "koristeheiniä": "ornamental grass",
+    "niitty": "natural meadow", "niityt": "natural meadow", "niittyjä": "natural meadow", "niittyä": "natural meadow",
+    "keto": "wildflower meadow", "ketoa": "wildflower meadow", "kedot": "wildflower meadow",
+    "kukkaniitty": "wildflower meadow", "kukkaniittyä": "wildflower meadow", "kukkaniityt": "wildflower meadow",
+    "kukat": "flowering plants", "kukkia": "flowering plants", "kukka": "flowering plants", "kukkien": "flowering plants",
+    "villikukat": "wildflower", "villikukkia": "wildflower", "perennat": "flowering plants", "perennoja": "flowering plants",
+    "kukkapenkki": "flower bed", "kukkapenkkejä": "flower bed", "kukkapenkit": "flower bed",
+    "kasvillisuus": "vegetation", "kasvillisuutta": "vegetation", "kasvillisuuden": "vegetation",
+    "kasvit": "vegetation", "kasveja": "vegetation", "kasvien": "vegetation",
+    "istutus": "planting", "istutuksia": "planting", "istutukset": "planting",
+    "lajit": "species", "lajeja": "species", "lajien": "species", "lajisto": "species", "lajistoa": "species",
+    "lajikirjo": "species variety", "lajikirjoa": "species variety",
+    # Density and variety
+    "monipuolinen": "diverse", "monipuolista": "diverse", "monipuolisia": "diverse",
+    "monimuotoinen": "diverse", "monimuotoista": "diverse", "vaihteleva": "diverse", "vaihtelevaa": "diverse",
+    "tiheä": "dense", "tiheää": "dense", "tiheitä": "dense", "tiheästi": "dense", "tuuhea": "thick", "tuuheaa": "thick",
+    "rehevä": "lush", "rehevää": "lush", "reheviä": "lush", "runsas": "abundant", "runsasta": "abundant", "runsaasti": "abundant",
+    "harva": "sparse", "harvaa": "sparse", "harvoja": "sparse", "niukka": "sparse", "niukkaa": "sparse", "niukasti": "sparse",
+    "hajanainen": "scattered", "hajanaista": "scattered", "laikuttainen": "patchy", "laikuttaista": "patchy",
+    "kohtalainen": "moderate", "kohtalaista": "moderate", "kohtalaisen": "moderate", "jonkin verran": "some",
+    # Surfaces
+    "asfaltti": "asphalt", "asfalttia": "asphalt", "betoni": "concrete", "betonia": "concrete",
+    "päällystetty": "paved", "päällystettyä": "paved", "päällystettyjä": "paved", "kiveys": "paved", "kiveystä": "paved",
+    "sora": "gravel", "soraa": "gravel", "sorapolku": "gravel path", "sorapolkuja": "gravel path", "sorakäytävä": "gravel walkway",
+    "multa": "open soil", "multaa": "open soil", "paljas maa": "bare soil", "paljasta maata": "bare soil",
+    "hiekkapolku": "dirt path", "maapolku": "dirt path", "polku": "path", "polkuja": "path", "polut": "path",
+    "hake": "mulch", "haketta": "mulch", "hakepolku": "wood path", "kuorikate": "mulch", "kuorikatetta": "mulch",
+    # Structures and habitat elements
+    "penkki": "bench", "penkit": "benches", "penkkejä": "benches", "penkkiä": "bench", "istuin": "seat", "istuimia": "seat",
+    "istuskelualue": "seating", "oleskelualue": "seating",
+    "piknikpöytä": "picnic table", "piknikpöytiä": "picnic tables", "pöytä": "picnic table", "pöytiä": "picnic tables",
+    "opaste": "sign", "opasteita": "signs", "opasteet": "signs", "kyltti": "sign", "kylttejä": "signs",
+    "infotaulu": "info sign", "infotauluja": "info sign", "laatta": "plaque", "laattoja": "plaques",
+    "kirjahylly": "bookshelf", "kirjahyllyjä": "bookshelves", "minikirjasto": "mini library",
+    "hyönteishotelli": "insect hotel", "hyönteishotelleja": "insect hotels", "hyönteishotellit": "insect hotels",
+    "ötökkähotelli": "bug house", "mehiläishotelli": "bee hotel",
+    "linnunpönttö": "birdhouse", "linnunpönttöjä": "birdhouses", "linnunpöntöt": "birdhouses", "pönttö": "nest box", "pönttöjä": "birdhouses",
+    "lahopuu": "deadwood", "lahopuuta": "deadwood", "lahopuita": "deadwood", "maapuu": "fallen log", "maapuita": "fallen log",
+    "kuollut puu": "dead wood", "kuollutta puuta": "dead wood", "kanto": "tree stump", "kantoja": "tree stump", "kannot": "tree stump",
+    "pölkky": "wood log", "pölkkyjä": "logs", "tukki": "log", "tukkeja": "logs", "risukasa": "wood pile", "puukasa": "wood pile",
+    "risuaita": "dead hedge", "risuaitoja": "dead hedges", "risuaidat": "dead hedges",
+    "kivi": "rock", "kivet": "rocks", "kiviä": "rocks", "kivikasa": "rock pile", "kivikasoja": "rock piles", "kivikko": "rocks",
+    # Negation
+    "ei": "no", "eikä": "no", "ilman": "without", "vailla": "without", "puuttuu": "lacks", "puuttuvat": "lacks",
+    # Numbers ("kuusi" is also spruce; the number reading is kept for quantity phrases)
+    "yksi": "one", "kaksi": "two", "kolme": "three", "neljä": "four", "viisi": "five", "kuusi": "six",
+    "seitsemän": "seven", "kahdeksan": "eight", "yhdeksän": "nine", "kymmenen": "ten"
+}
+
+# Frequent function words for language detection
+LANGUAGE_MARKERS = {
+    "en": {"the", "and", "is", "are", "with", "of", "there", "a", "in", "some", "this"},
+    "fi": {"ja", "on", "ei", "ole", "se", "ovat", "myös", "tai", "joka", "jotka", "paljon", "mutta", "eikä", "vain", "täällä", "siellä", "kuin", "tässä"}
+}
+
+RATING = {1: "Weak Performance", 2: "Moderate Performance", 3: "Strong Performance"}
+
+# ----------------- Rule Versions -----------------
+_BIODIVERSITY_3 = {
+    "engine": "biodiversity",
+    "source": "Biodiversity_assessment_3.py",
+    "synonym_map": BIODIVERSITY_SYNONYMS,
+    "phrase_normalizations": None,
+    "proximity": "phrase",
+    "proximity_distance": 6,
+    "such_as_negation": True,
+    "vegetation_keywords": [
+        "grass meadow", "low-rise grass", "wildflower meadow",
+        "shrub", "isolated tree with small canopy", "isolated tree with large canopy",
+        "isolated tree with a small canopy", "isolated tree with a large canopy",
+        "single tree with small canopy", "single tree with large canopy",
+        "sparse tree cluster", "dense tree cluster"
+    ],
+    "vegetation_tiers": (4, 2),
+    "high_variety": [
+        "diverse species variety", "diverse specie variety", "high species variety", "numerous species", "vibrant mix",
+        "broad range of species", "many type of flowering plant", "visible diversity of species",
+        "colorful plant mix", "diverse mix", "variety of flowering species", "multiple colors and forms",
+        "visually rich planting", "diverse palette", "rich mix of plants", "structured plant diversity",
+        "species variety is diverse", "wide array", "ecological diversity", "species variety across the space is diverse", "the species variety is diverse",
+        "species variety across the space is high", "species variety appears diverse"
+    ],
+    "moderate_variety": [
+        "moderate species variety", "moderate specie variety", "balanced variety", "curated but not overly complex", "moderate to diverse",
+        "some species variety", "moderate mix", "some plant diversity", "fair variety", "not overly complex palette",
+        "species variety is moderate", "species variety across the space is moderate", "the species variety is moderate",
+        "species variety across the space is low", "species variety appears moderate", "moderate to diverse", "moderate range of species",
+        "somewhat diverse", "plant mix is moderate"
+    ],
+    "high_variety_proximity": [
+        ("species + diverse (proximity match)",
+         [("species", "diverse"), ("species variety", "diverse"), ("variety", "diverse"), ("mix", "species")])
+    ],
+    "moderate_variety_proximity": [
+        ("species + moderate (proximity match)",
+         [("species", "moderate"), ("species variety", "moderate"), ("variety", "moderate")])
+    ],
+    "high_density": [
+        "the vegetation is dense", "thick vegetation", "lush vegetation", "cover the ground entirely",
+        "rich and textured vegetative carpet", "dense vegetation zones", "dense vegetation", "vegetation density is dense", "vegetation density is high"
+    ],
+    "moderate_density": [
+        "moderate vegetation", "moderate density", "partial coverage", "moderate plant mass",
+        "moderate vegetation density", "moderate plant coverage", "the vegetation is moderately dense", "moderate to dense", "vegetation density is moderate",
+        "vegetation is moderate", "moderate to dense vegetation", "moderate density of vegetation", "vegetation appears moderate"
+    ],
+    "high_density_proximity": [
+        ("vegetation + dense (proximity match)", [("vegetation", "dense"), ("vegetation density", "dense")]),
+        ("vegetation density + high (proximity match)", [("vegetation density", "high")])
+    ],
+    "moderate_density_proximity": [
+        ("vegetation + moderate (proximity match)", [("vegetation", "moderate"), ("vegetation density", "moderate")])
+    ],
+    "comment_negated_tiers": True,
+    "hotspot_keywords": [
+        "birdhouse", "bird house", "insect hotel", "bug hotel", "piled rocks",
+        "deadwood", "dead wood", "dead hedge", "hollow log", "log", "wood pile"
+    ],
+    "hotspot_tiers": (3, 1),
+    "rounding": "half_even"
+}
+
+_BIODIVERSITY_6 = {
+    **_BIODIVERSITY_3,
+    "source": "Biodiversity_assessment_6.py",
+    "phrase_normalizations": BIODIVERSITY_PHRASES,
+    "proximity": "stopword",
+    "proximity_distance": 10,
+    "such_as_negation": False,
+    "vegetation_keywords": [
+        "grass meadow", "low-rise grass", "wildflower meadow",
+        "shrub", "sparse tree cluster", "dense tree cluster", "isolated tree", "single tree"
+    ],
+    "high_variety": ["diverse species variety"],
+    "moderate_variety": ["moderate species variety"],
+    "high_variety_proximity": [
+        ("species + diverse (proximity match)", [("species", "diverse"), ("species variety", "diverse")])
+    ],
+    "moderate_variety_proximity": [
+        ("species + moderate (proximity match)", [("species", "moderate"), ("species variety", "moderate")])
+    ],
+    "high_density": ["dense vegetation"],
+    "moderate_density": ["moderate vegetation"],
+    "high_density_proximity": [
+        ("vegetation + dense (proximity match)", [("vegetation", "dense"), ("vegetation density", "dense")])
+    ],
+    "comment_negated_tiers": False,
+    "hotspot_keywords": [
+        "birdhouse", "bird house", "insect hotel", "bug hotel", "rocks", "rock",
+        "deadwood", "dead wood", "dead hedge", "log", "wood pile"
+    ],
+    "hotspot_tiers": (3, 2)
+}
+
+_BIODIVERSITY_7 = {**_BIODIVERSITY_6, "source": "Biodiversity_assessment_7.py", "hotspot_tiers": (3, 1)}
+
+_BIODIVERSITY_8 = {
+    **_BIODIVERSITY_7,
+    "source": "Biodiversity_assessment_8.py",
+    "phrase_normalizations": None,
+    "attribute_statements": BIODIVERSITY_ATTRIBUTES,
+    "vegetation_tiers": (3, 2),
+    "rounding": "half_up"
+}
+
+_STORMWATER_3 = {
+    "engine": "stormwater",
+    "source": "Stormwater_assessment_3.py",
+    "synonym_map": STORMWATER_SYNONYMS,
+    "surface_types": STORMWATER_SURFACES,
+    "vegetation_weights": STORMWATER_VEGETATION_WEIGHTS,
+    "density_map": STORMWATER_DENSITY_MAP,
+    "density_window": 6,
+    "density_weighting": True,
+    "vegetation_tiers": (8, 4),
+    "diversity_threshold": None,
+    "evaluate_density": False
+}
+
+_STORMWATER_4 = {
+    **_STORMWATER_3,
+    "source": "Stormwater_assessment_4.py",
+    "density_weighting": False,
+    "diversity_threshold": 12,
+    "evaluate_density": True,
+    "high_density_keywords": ["dense vegetation", "dense planting", "dense coverage"],
+    "moderate_density_keywords": ["moderate vegetation", "moderate planting", "moderate coverage"]
+}
+
+_STORMWATER_4_DENSITY = {
+    **_STORMWATER_4,
+    "source": "Stormwater_assessment_4.py (density_weighted=True)",
+    "density_weighting": True
+}
+
+_MAINTENANCE_1 = {
+    "engine": "maintenance",
+    "source": "Maintainance_assessment.py",
+    "synonym_map": MAINTENANCE_SYNONYMS_V1,
+    "weights": MAINTENANCE_WEIGHTS,
+    "proximity_keywords": MAINTENANCE_PROXIMITY,
+    "proximity_distance": 6,
+    "effort_thresholds": (20, 12)
+}
+
+_MAINTENANCE_2 = {**_MAINTENANCE_1, "source": "Maintainance_assessment_2.py", "synonym_map": MAINTENANCE_SYNONYMS}
+
+_MAINTENANCE_3 = {**_MAINTENANCE_2, "source": "Maintainance_assessment_3.py", "effort_thresholds": (20, 10)}
+
+RULE_VERSIONS = {
+    "biodiversity_score": {"engine": "biodiversity_basic", "source": "Biodiversity_score.py"},
+    "biodiversity_score_2": {"engine": "biodiversity_basic", "source": "Biodiversity_score_2.py"},
+    "biodiversity_3": _BIODIVERSITY_3,
+    "biodiversity_6": _BIODIVERSITY_6,
+    "biodiversity_7": _BIODIVERSITY_7,
+    "biodiversity_8": _BIODIVERSITY_8,
+    "stormwater_3": _STORMWATER_3,
+    "stormwater_4": _STORMWATER_4,
+    "stormwater_4_density": _STORMWATER_4_DENSITY,
+    "maintenance_1": _MAINTENANCE_1,
+    "maintenance_2": _MAINTENANCE_2,
+    "maintenance_3": _MAINTENANCE_3,
+    # Finnish notes are normalized onto the same English vocabulary, so the
+    # Finnish versions share the current rules and weights of each family
+    "biodiversity_fi": {**_BIODIVERSITY_8, "language": "fi", "source": "comparison_notes (Finnish)"},
+    "stormwater_fi": {**_STORMWATER_4, "language": "fi", "source": "comparison_notes (Finnish)"},
+    "maintenance_fi": {**_MAINTENANCE_3, "language": "fi", "source": "comparison_notes (Finnish)"}
+}
+
+LANGUAGE_VERSIONS = {
+    "en": {"biodiversity": "biodiversity_8", "stormwater": "stormwater_4", "maintenance": "maintenance_3"},
+    "fi": {"biodiversity": "biodiversity_fi", "stormwater": "stormwater_fi", "maintenance": "maintenance_fi"}
+}
+
+ENGLISH_VERSIONS = [name for name, rules in RULE_VERSIONS.items() if rules.get("language", "en") == "en"]
+
+ENGINE_FAMILIES = {
+    "biodiversity_basic": "biodiversity",
+    "biodiversity": "biodiversity",
+    "stormwater": "stormwater",
+    "maintenance": "maintenance"
+}
+
+ATTRIBUTE_GRAMMAR_KEYS = {"subjects", "verbs", "fillers", "values", "statements"}
+
+def _attribute_strings(grammar: Dict) -> Iterator[str]:
+    # The words of an attribute grammar; its structural keys are not rule words
+    yield from grammar["subjects"]
+    yield from grammar["verbs"]
+    yield from grammar["fillers"]
+    for table in grammar["values"].values():
+        yield from table
+    for table in grammar["statements"].values():
+        yield from table.values()
+
+def _rule_strings(value) -> Iterator[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict) and value.keys() == ATTRIBUTE_GRAMMAR_KEYS:
+        yield from _attribute_strings(value)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield from _rule_strings(key)
+            yield from _rule_strings(item)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            yield from _rule_strings(item)
+
+def rule_vocabulary(rule_versions: Dict[str, Dict] = None) -> set:
+    # Every token the rules can compare against lemmatized text
+    words = set()
+    rule_data = [
+        value for rules in (rule_versions or RULE_VERSIONS).values() for key, value in rules.items()
+        if key not in ("engine", "source", "proximity", "rounding", "language")
+    ]
+    for text in _rule_strings([rule_data, NEGATION_TERMS, list(NUMBER_WORDS)]):
+        words.update(text.lower().split())
+    return words
+
+def vocabulary_fingerprint(rule_versions: Dict[str, Dict] = None) -> str:
+    return hashlib.sha1(" ".join(sorted(rule_vocabulary(rule_versions))).encode("utf-8")).hexdigest()[:12]
+
+# ----------------- Compiled Patterns -----------------
+@lru_cache(maxsize=None)
+def word_pattern(term: str, plural: bool = False) -> "re.Pattern":
+    suffix = "s?" if plural else ""
+    return re.compile(rf"\b{re.escape(term)}{suffix}\b")
+
+_NUMBER_TOKEN = re.compile(r'\b(\d+|one|two|three|four|five|six|seven|eight|nine|ten)\b')
+_SPACE_RUN = re.compile(r'\s+')
+_WORD_RUN = re.compile(r'\w+')
+
+_PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+
+# ----------------- Token Vocabulary -----------------
+# Tokens are interned to integer ids shared by all documents of a thread;
+# token sequences are array('I') and each id remembers the id of its lemma, so
+# negation and proximity checks compare integers instead of rebuilding string
+# lists. The vocabulary is per-thread scratch: ids are only compared within
+# one document, so threads never share (or lock) it, and a DocumentContext
+# uses the vocabulary of the thread that created it. Past VOCABULARY_LIMIT
+# tokens (typos, numbers, names of a long run) the thread starts a fresh
+# vocabulary before its next document, so memory stays bounded.
+VOCABULARY_LIMIT = int(os.environ.get("ASSESSMENT_VOCABULARY_LIMIT", 100000))
+_lemma_generation = 0
+
+class Vocabulary:
+    def __init__(self):
+        self.ids = {}
+        self.tokens = []
+        self.lemma_of = array("i")
+        self.generation = _lemma_generation
+        self._negation_ids = None
+        # [lemma lookups, lookups that had to call lemmatize], for the metrics
+        self.stats = [0, 0]
+
+    def intern(self, token: str) -> int:
+        token_id = self.ids.get(token)
+        if token_id is None:
+            token_id = self.ids[token] = len(self.tokens)
+            self.tokens.append(token)
+            self.lemma_of.append(-1)
+        return token_id
+
+    def encode(self, tokens: Iterable[str]) -> array:
+        return array("I", map(self.intern, tokens))
+
+    def reset_lemmas(self) -> None:
+        self.lemma_of = array("i", [-1]) * len(self.tokens)
+
+    def decode(self, ids: Iterable[int]) -> List[str]:
+        return [self.tokens[i] for i in ids]
+
+    def lemma_id(self, token_id: int) -> int:
+        lemma = self.lemma_of[token_id]
+        if lemma < 0:
+            self.stats[1] += 1
+            lemma = self.lemma_of[token_id] = self.intern(lemmatize(self.tokens[token_id]))
+        return lemma
+
+    def lemma_ids(self, tokens: Iterable[str]) -> array:
+        lemma_id = self.lemma_id
+        ids = array("I", (lemma_id(t) for t in map(self.intern, tokens)))
+        self.stats[0] += len(ids)
+        return ids
+
+    def negation_ids(self) -> List[Tuple[str, int]]:
+        if self._negation_ids is None:
+            self._negation_ids = [(term, self.intern(term)) for term in NEGATION_TERMS]
+        return self._negation_ids
+
+_thread_state = threading.local()
+# (thread, lemma statistics) of the live vocabularies; ended threads are folded into the totals
+_vocabulary_stats = []
+_ended_vocabulary_stats = [0, 0]
+
+def _fold_vocabulary_stats() -> None:
+    live = []
+    for thread, stats in _vocabulary_stats:
+        if thread() is not None and thread().is_alive():
+            live.append((thread, stats))
+        else:
+            _ended_vocabulary_stats[0] += stats[0]
+            _ended_vocabulary_stats[1] += stats[1]
+    _vocabulary_stats[:] = live
+
+def get_vocabulary() -> Vocabulary:
+    vocabulary = getattr(_thread_state, "vocabulary", None)
+    if vocabulary is None:
+        vocabulary = _thread_state.vocabulary = Vocabulary()
+        with _resource_lock:
+            _fold_vocabulary_stats()
+            _vocabulary_stats.append((weakref.ref(threading.current_thread()), vocabulary.stats))
+    elif len(vocabulary.tokens) > VOCABULARY_LIMIT:
+        # Contexts still holding the old vocabulary keep using it consistently
+        fresh = _thread_state.vocabulary = Vocabulary()
+        fresh.stats = vocabulary.stats
+        vocabulary = fresh
+    if vocabulary.generation != _lemma_generation:
+        vocabulary.reset_lemmas()
+        vocabulary.generation = _lemma_generation
+    return vocabulary
+
+def find_sequence(ids: array, pattern: array, start: int = 0, stop: int = None) -> List[int]:
+    # Start positions of pattern in ids[start:stop], relative to start
+    window = ids[start:stop] if start or stop is not None else ids
+    if not pattern:
+        return list(range(len(window) + 1))
+    first, n = pattern[0], len(pattern)
+    return [i for i, token in enumerate(window) if token == first and window[i:i + n] == pattern]
+
+# ----------------- Languages -----------------
+# Per-language normalization onto the English rule vocabulary. Resources are
+# loaded the first time a document in that language is scored.
+FINNISH_STEM_CACHE_SIZE = 100000
+_language_resources = {}
+
+def load_finnish() -> Dict:
+    from nltk.stem.snowball import SnowballStemmer
+    # Finnish inflection multiplies surface forms, so the stem cache is bounded
+    stem = lru_cache(maxsize=FINNISH_STEM_CACHE_SIZE)(SnowballStemmer("finnish").stem)
+    phrases = {}
+    for surface, english in FINNISH_SYNONYMS.items():
+        phrases.setdefault(tuple(stem(word) for word in surface.split()), english)
+    return {"stem": stem, "phrases": phrases, "max_phrase": max(len(key) for key in phrases)}
+
+LANGUAGE_LOADERS = {
+    "fi": load_finnish
+}
+
+def get_language_resources(language: str) -> Dict:
+    if language not in _language_resources:
+        with _resource_lock:
+            if language not in _language_resources:
+                start = time.perf_counter()
+                _language_resources[language] = LANGUAGE_LOADERS[language]()
+                RESOURCE_LOAD_SECONDS[f"language_{language}"] = time.perf_counter() - start
+    return _language_resources[language]
+
+def detect_language(text: str) -> str:
+    words = re.findall(r"\w+", text.lower())
+    hits = {language: sum(word in markers for word in words) for language, markers in LANGUAGE_MARKERS.items()}
+    if hits["fi"] > hits["en"] or (hits["fi"] == hits["en"] and re.search(r"[äö]", text.lower())):
+        return "fi"
+    return "en"
+
+def normalize_finnish(text: str) -> str:
+    resources = get_language_resources("fi")
+    stem, phrases, max_phrase = resources["stem"], resources["phrases"], resources["max_phrase"]
+    # Words are replaced by their English phrase (longest match first);
+    # punctuation stays attached so sentence and comma splits are unchanged
+    tokens = re.findall(r"\w+|[^\w\s]+", text.lower())
+    stems = [stem(token) if token[0].isalnum() else None for token in tokens]
+    output = []
+    i = 0
+    while i < len(tokens):
+        if stems[i] is None:
+            if output:
+                output[-1] += tokens[i]
+            else:
+                output.append(tokens[i])
+            i += 1
+            continue
+        for n in range(min(max_phrase, len(tokens) - i), 0, -1):
+            key = tuple(stems[i:i + n])
+            if None not in key and key in phrases:
+                output.append(phrases[key])
+                i += n
+                break
+        else:
+            output.append(tokens[i])
+            i += 1
+    return " ".join(output)
+
+LANGUAGE_NORMALIZERS = {
+    "en": lambda text: text,
+    "fi": normalize_finnish
+}
+
+def context_for(contexts: Dict[str, "DocumentContext"], text: str, rules: Dict) -> "DocumentContext":
+    # One DocumentContext per language (and typo tolerance) a document is scored in
+    language = rules.get("language", "en")
+    # Only English text is corrected; Finnish notes keep untranslated words as written
+    typos = rules.get("typo_tolerance", 0) if language == "en" else 0
+    key = (language, typos) if typos else language
+    if key not in contexts:
+        text = LANGUAGE_NORMALIZERS[language](limit_input(text))
+        if typos:
+            text = correct_typos(text, rules.get("spelling_index") or get_spelling_index(), typos)
+        contexts[key] = DocumentContext(text)
+    return contexts[key]
+
+# ----------------- Input Guardrails -----------------
+# Pasted documents are cut to MAX_INPUT_CHARS before scoring, and sentences
+# longer than MAX_SENTENCE_CHARS are split at a space for the negation checks.
+# Every matcher is linear in the text, so these caps bound the worst case.
+MAX_INPUT_CHARS = int(os.environ.get("ASSESSMENT_MAX_INPUT_CHARS", 20000))
+MAX_SENTENCE_CHARS = int(os.environ.get("ASSESSMENT_MAX_SENTENCE_CHARS", 1000))
+
+def limit_input(text: str) -> str:
+    return text[:MAX_INPUT_CHARS] if MAX_INPUT_CHARS and len(text) > MAX_INPUT_CHARS else text
+
+def split_sentences(text: str) -> List[str]:
+    sentences = []
+    for sentence in re.split(r'[.!?]', text):
+        while MAX_SENTENCE_CHARS and len(sentence) > MAX_SENTENCE_CHARS:
+            cut = sentence.rfind(" ", 0, MAX_SENTENCE_CHARS)
+            cut = cut if cut > 0 else MAX_SENTENCE_CHARS
+            sentences.append(sentence[:cut])
+            sentence = sentence[cut:]
+        sentences.append(sentence)
+    return sentences
+
+# ----------------- Typo Tolerance -----------------
+# Versions with "typo_tolerance": 1 or 2 correct misspelled words ("birdhose",
+# "insect hotell") to the rule vocabulary before matching. The index is
+# SymSpell-style: every vocabulary word is stored under all its deletions up
+# to two characters, so looking up a token only generates the token's own
+# deletions, independent of the vocabulary size. A token is corrected when
+# it is long enough for the edit distance (TYPO_MIN_LENGTHS), is not itself
+# a known word and has one closest vocabulary word. Known words are the
+# vocabulary, stop words and the dictionary words near the vocabulary, which
+# Lemma_table.py lists from WordNet ("meadows" stays "meadows"). Negation
+# words are never targets: a wrong correction would flip a criterion.
+TYPO_MIN_LENGTHS = (5, 9)
+_TYPO_WORD = re.compile(r"[a-zäöå][a-zäöå'-]*")
+
+def _deletes(word: str, distance: int) -> set:
+    variants = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    # Optimal string alignment distance (adjacent transpositions count once), capped at limit + 1
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+class SpellingIndex:
+    def __init__(self, words: Iterable[str], known: Iterable[str] = (), max_distance: int = 2):
+        self.words = set(words)
+        self.known = set(known) | self.words
+        self.max_distance = max_distance
+        self.deletes = {}
+        for word in sorted(self.words):
+            for variant in _deletes(word, max_distance):
+                self.deletes.setdefault(variant, []).append(word)
+        self._corrections = {}
+
+    def __getstate__(self) -> Dict:
+        return {**self.__dict__, "_corrections": {}}
+
+    def allowed_distance(self, token: str, max_distance: int) -> int:
+        return sum(len(token) >= length for length in TYPO_MIN_LENGTHS[:min(max_distance, self.max_distance)])
+
+    def candidates(self, token: str, distance: int) -> Dict[str, int]:
+        # Vocabulary words within the edit distance, with their distances
+        found = {}
+        for variant in _deletes(token, distance):
+            for word in self.deletes.get(variant, ()):
+                if word not in found:
+                    found[word] = edit_distance(token, word, distance)
+        return {word: d for word, d in found.items() if d <= distance}
+
+    def correct(self, token: str, max_distance: int) -> Optional[str]:
+        # Shared between threads: a lost entry is only recomputed, so no lock
+        key = (token, max_distance)
+        corrections = self._corrections
+        if key in corrections:
+            return corrections[key]
+        if len(corrections) >= 100000:
+            corrections = self._corrections = {}
+        corrected = corrections[key] = self._correct(token, max_distance)
+        return corrected
+
+    def _correct(self, token: str, max_distance: int) -> Optional[str]:
+        distance = self.allowed_distance(token, max_distance)
+        if not distance or token in self.known:
+            return None
+        found = self.candidates(token, distance)
+        if not found:
+            return None
+        best = min(found.values())
+        closest = [word for word, d in found.items() if d == best]
+        if len(closest) > 1:
+            # "hotell", "benchs": the base form when the others extend it ("hotel", not "hotels")
+            closest = [word for word in closest if all(other.startswith(word) for other in closest)]
+        return closest[0] if len(closest) == 1 else None
+
+def typo_vocabulary(rule_versions: Dict[str, Dict] = None) -> set:
+    # Rule words typos are corrected to; stop words and negation words are never targets
+    negation_words = {word for term in NEGATION_TERMS for word in term.split()}
+    return {
+        word for word in rule_vocabulary(rule_versions)
+        if _TYPO_WORD.fullmatch(word) and word not in get_stop_words() and word not in negation_words
+    }
+
+def build_spelling_index(rule_versions: Dict[str, Dict] = None, near_words: Iterable[str] = ()) -> SpellingIndex:
+    return SpellingIndex(typo_vocabulary(rule_versions), set(near_words) | get_stop_words())
+
+_spelling_index = None
+
+def get_spelling_index() -> SpellingIndex:
+    # Index of the built-in rules; compiled rule packs carry their own
+    global _spelling_index
+    if _spelling_index is None:
+        with _resource_lock:
+            if _spelling_index is None:
+                _spelling_index = build_spelling_index(near_words=get_lemma_table().get("near_words", []))
+    return _spelling_index
+
+def correct_typos(text: str, index: SpellingIndex, max_distance: int) -> str:
+    def replace(match):
+        return index.correct(match.group(0), max_distance) or match.group(0)
+    return _TYPO_WORD.sub(replace, text.lower())
+
+# ----------------- Document Context -----------------
+class DocumentContext:
+    def __init__(self, text: str):
+        self.text = text
+        self.lower = text.lower()
+        self.vocabulary = get_vocabulary()
+        self._memo = {}
+
+    def cached(self, key: tuple, compute):
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    def normalized(self, text: str, synonym_map: Dict[str, str]) -> str:
+        return self.cached(("synonyms", text, id(synonym_map)), lambda: normalize_synonyms(text, synonym_map))
+
+    def phrase_normalized(self, text: str, phrase_map: Dict[str, str]) -> str:
+        return self.cached(("phrases", text, id(phrase_map)), lambda: normalize_phrases(text, phrase_map))
+
+    def attributes(self, text: str, grammar: Dict) -> List[Tuple[str, str, bool, int, int]]:
+        return self.cached(("attributes", text, id(grammar)), lambda: attribute_facts(text, grammar))
+
+    def lemmatized(self, text: str) -> str:
+        return self.cached(("lemmas", text), lambda: " ".join(self.vocabulary.decode(self.vocabulary.lemma_ids(text.lower().split()))))
+
+    def token_ids(self, key: str, text: str, tokenize) -> array:
+        return self.cached(("tokens", key, text), lambda: self.vocabulary.encode(tokenize(text)))
+
+    def contains(self, text: str, term: str, plural: bool = False) -> bool:
+        return self.cached(("contains", text, term, plural),
+                           lambda: term in text and word_pattern(term, plural).search(text) is not None)
+
+    def sentences(self, text: str) -> List[Tuple[str, array]]:
+        def split():
+            return [
+                (sentence, self.vocabulary.lemma_ids(re.sub(r"[,;]", " ", sentence).split()))
+                for sentence in split_sentences(text.lower())
+            ]
+        return self.cached(("sentences", text), split)
+
+    def negated(self, text: str, keyword: str, such_as: bool) -> bool:
+        return self.cached(("negated", text, keyword, such_as), lambda: is_negated(self, text, keyword, such_as))
+
+    def nearby(self, style: str, text: str, phrase1: str, phrase2: str, max_distance: int) -> bool:
+        return self.cached(("nearby", style, text, phrase1, phrase2, max_distance),
+                           lambda: PROXIMITY_STYLES[style](self, text, phrase1, phrase2, max_distance))
+
+    def feature(self, name: str, rules: Dict):
+        # Computed on first use; the steps underneath are memoized above
+        return FEATURES[name]["compute"](self, rules)
+
+# ----------------- Text Normalization -----------------
+def normalize_synonyms(text: str, synonym_map: Dict[str, str]) -> str:
+    text = text.lower()
+    for synonym, standard in synonym_map.items():
+        if synonym in text:
+            text = word_pattern(synonym).sub(standard, text)
+    return text
+
+def normalize_phrases(text: str, phrase_map: Dict[str, str]) -> str:
+    text = text.lower()
+    for phrase, replacement in phrase_map.items():
+        if phrase in text:
+            text = text.replace(phrase, replacement)
+    return text
+
+_attribute_patterns = {}
+
+def attribute_pattern(grammar: Dict) -> "re.Pattern":
+    # One alternation per slot, longest first; fillers are bounded so a failed
+    # statement costs no more than a few word comparisons
+    cached = _attribute_patterns.get(id(grammar))
+    if cached is None or cached[0] is not grammar:
+        def slot(words):
+            return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+        values = {value for table in grammar["values"].values() for value in table}
+        fillers = rf"(?:\s+(?:{slot(grammar['fillers'])})){{0,3}}"
+        pattern = re.compile(
+            rf"\b(?P<subject>{slot(grammar['subjects'])}){fillers}\s+(?:{slot(grammar['verbs'])})"
+            rf"{fillers}(?P<negation>\s+not)?{fillers}\s+(?P<value>{slot(values)})\b"
+        )
+        cached = _attribute_patterns[id(grammar)] = (grammar, pattern)
+    return cached[1]
+
+def attribute_facts(text: str, grammar: Dict) -> List[Tuple[str, str, bool, int, int]]:
+    # (subject, value, negated, start, end) for every statement, in one pass over the text
+    facts = []
+    for match in attribute_pattern(grammar).finditer(text):
+        subject = grammar["subjects"][match["subject"]]
+        value = grammar["values"][subject].get(match["value"])
+        if value in grammar["statements"][subject]:
+            facts.append((subject, value, match["negation"] is not None, match.start(), match.end()))
+    return facts
+
+def render_attributes(text: str, facts: List[Tuple[str, str, bool, int, int]], grammar: Dict) -> str:
+    parts = []
+    position = 0
+    for subject, value, negated, start, end in facts:
+        parts.append(text[position:start])
+        parts.append(("not " if negated else "") + grammar["statements"][subject][value])
+        position = end
+    parts.append(text[position:])
+    return "".join(parts)
+
+def normalize_attributes(text: str, grammar: Dict) -> str:
+    text = text.lower()
+    return render_attributes(text, attribute_facts(text, grammar), grammar)
+
+# ----------------- Proximity Styles -----------------
+def _within(positions1: List[int], positions2: List[int], max_distance: int) -> bool:
+    # Both lists are ascending: walk them together instead of comparing every pair
+    j = 0
+    for i in positions1:
+        while j < len(positions2) and positions2[j] < i - max_distance:
+            j += 1
+        if j == len(positions2):
+            return False
+        if positions2[j] <= i + max_distance:
+            return True
+    return False
+
+def _positions(words: array, token_ids: set) -> List[int]:
+    return [i for i, word in enumerate(words) if word in token_ids]
+
+def _stopword_tokens(text: str) -> List[str]:
+    stop_words = get_stop_words()
+    return [w for w in text.lower().translate(_PUNCTUATION_TABLE).split() if w not in stop_words]
+
+def _basic_stopword_tokens(text: str) -> List[str]:
+    return [w for w in text.lower().translate(_PUNCTUATION_TABLE).split() if w not in STORMWATER_STOP_WORDS]
+
+TOKENIZERS = {
+    "split": lambda text: text.lower().split(),
+    "stopword": _stopword_tokens,
+    "basic_stopword": _basic_stopword_tokens
+}
+
+def nearby_phrase(ctx: DocumentContext, text: str, phrase1: str, phrase2: str, max_distance: int) -> bool:
+    words = ctx.token_ids("split", text, TOKENIZERS["split"])
+    tokens1 = ctx.vocabulary.encode(phrase1.split())
+    tokens2 = ctx.vocabulary.encode(phrase2.split())
+    indices1 = find_sequence(words, tokens1)[:max(len(words) - len(tokens1) + 1, 0)]
+    indices2 = find_sequence(words, tokens2)[:max(len(words) - len(tokens2) + 1, 0)]
+    return _within(indices1, indices2, max_distance)
+
+def nearby_stopword(ctx: DocumentContext, text: str, phrase1: str, phrase2: str, max_distance: int) -> bool:
+    stop_words = get_stop_words()
+    words = ctx.token_ids("stopword", text, TOKENIZERS["stopword"])
+    tokens1 = set(ctx.vocabulary.encode(w for w in phrase1.lower().split() if w not in stop_words))
+    tokens2 = set(ctx.vocabulary.encode(w for w in phrase2.lower().split() if w not in stop_words))
+    return _within(_positions(words, tokens1), _positions(words, tokens2), max_distance)
+
+def nearby_basic_stopword(ctx: DocumentContext, text: str, phrase1: str, phrase2: str, max_distance: int) -> bool:
+    words = ctx.token_ids("basic_stopword", text, TOKENIZERS["basic_stopword"])
+    tokens1 = set(ctx.vocabulary.encode(phrase1.lower().split()))
+    tokens2 = set(ctx.vocabulary.encode(phrase2.lower().split()))
+    return _within(_positions(words, tokens1), _positions(words, tokens2), max_distance)
+
+def nearby_substring(ctx: DocumentContext, text: str, word1: str, word2: str, max_distance: int) -> bool:
+    # Substring semantics: resolve which of the document's distinct token ids contain each word
+    words = ctx.token_ids("split", text, TOKENIZERS["split"])
+    distinct = ctx.cached(("distinct", text), lambda: set(words))
+    tokens = ctx.vocabulary.tokens
+    tokens1 = {t for t in distinct if word1 in tokens[t]}
+    tokens2 = {t for t in distinct if word2 in tokens[t]}
+    return _within(_positions(words, tokens1), _positions(words, tokens2), max_distance)
+
+PROXIMITY_STYLES = {
+    "phrase": nearby_phrase,
+    "stopword": nearby_stopword,
+    "basic_stopword": nearby_basic_stopword,
+    "substring": nearby_substring
+}
+
+# Token sequence each proximity style compares (a TOKENIZERS key)
+PROXIMITY_TOKENS = {"phrase": "split", "stopword": "stopword", "basic_stopword": "basic_stopword", "substring": "split"}
+
+# ----------------- Negation -----------------
+def is_negated(ctx: DocumentContext, text: str, keyword: str, such_as: bool = False) -> bool:
+    negation_ids = ctx.vocabulary.negation_ids()
+    keyword_tokens = keyword.lower().split()
+    keyword_lemmas = ctx.vocabulary.lemma_ids(keyword_tokens)
+    n = len(keyword_lemmas)
+
+    for sentence, lemma_ids in ctx.sentences(text):
+        if not any(tok in sentence for tok in keyword_tokens):
+            continue
+
+        for term, term_id in negation_ids:
+            if term_id in lemma_ids:
+                term_index = lemma_ids.index(term_id)
+                window = lemma_ids[term_index + 1: term_index + 21]
+                if any(window[i:i + n] == keyword_lemmas for i in range(len(window) - n + 1)):
+                    return True
+                if such_as and such_as_follows(sentence, term, keyword):
+                    return True
+    return False
+
+def such_as_follows(sentence: str, term: str, keyword: str) -> bool:
+    # re.search(term + ".*such as.*" + keyword) without backtracking: the
+    # earliest term, then the earliest "such as" after it, then the keyword;
+    # "." does not cross line breaks
+    for line in sentence.split("\n"):
+        start = line.find(term)
+        if start < 0:
+            continue
+        middle = line.find("such as", start + len(term))
+        if middle >= 0 and line.find(keyword, middle + len("such as")) >= 0:
+            return True
+    return False
+
+# ----------------- Document Features -----------------
+# The preprocessing steps a criterion can depend on, as a graph: each feature
+# names the features it is built from and is computed on first use, so
+# scoring only some criteria skips whatever they do not need (stormwater
+# criteria never load the lemmatizer). Text features depend on the rule
+# version (phrase and synonym maps); the DocumentContext memo shares them
+# between versions with the same maps.
+def _attribute_facts(ctx: DocumentContext, rules: Dict) -> List[Tuple[str, str, bool, int, int]]:
+    grammar = rules.get("attribute_statements")
+    return ctx.attributes(ctx.lower, grammar) if grammar else []
+
+def _statement_phrases(ctx: DocumentContext, rules: Dict) -> Dict[str, bool]:
+    # Canonical phrase -> negated, from the statement's own "not" (negated only if every statement is)
+    phrases = {}
+    for subject, value, negated, _, _ in ctx.feature("attributes", rules):
+        phrase = rules["attribute_statements"]["statements"][subject][value]
+        phrases[phrase] = phrases.get(phrase, True) and negated
+    return phrases
+
+def _phrase_text(ctx: DocumentContext, rules: Dict) -> str:
+    grammar = rules.get("attribute_statements")
+    if grammar:
+        facts = ctx.feature("attributes", rules)
+        return ctx.cached(("attribute_text", ctx.lower, id(grammar)), lambda: render_attributes(ctx.lower, facts, grammar))
+    phrase_map = rules.get("phrase_normalizations")
+    return ctx.phrase_normalized(ctx.lower, phrase_map) if phrase_map else ctx.lower
+
+def _density_index(ctx: DocumentContext, rules: Dict) -> Tuple[Dict[str, List[int]], List[int], List[int]]:
+    description = ctx.feature("synonyms", rules)
+    return ctx.cached(("density_index", description, id(rules["density_map"])),
+                      lambda: build_density_index(description, rules["density_map"]))
+
+FEATURES = {
+    "text": {"depends": (), "compute": lambda ctx, rules: ctx.lower},
+    # Attribute statements as (subject, value, negated, start, end) facts over the lowercased text
+    "attributes": {"depends": ("text",), "compute": _attribute_facts},
+    # Canonical phrases of those statements, matched as stated (lemmatizing would turn "species" into
+    # "specie") and negated only by the statement's own "not"
+    "statements": {"depends": ("attributes",), "compute": _statement_phrases},
+    "phrases": {"depends": ("text", "attributes"), "compute": _phrase_text},
+    "synonyms": {"depends": ("phrases",),
+                 "compute": lambda ctx, rules: ctx.normalized(ctx.feature("phrases", rules), rules["synonym_map"])},
+    "lemmas": {"depends": ("synonyms",), "compute": lambda ctx, rules: ctx.lemmatized(ctx.feature("synonyms", rules))},
+    # Sentences with lemma ids, for the negation checks
+    "sentences": {"depends": ("phrases",), "compute": lambda ctx, rules: ctx.sentences(ctx.feature("phrases", rules))},
+    "tokens": {"depends": ("lemmas",),
+               "compute": lambda ctx, rules: ctx.token_ids("split", ctx.feature("lemmas", rules), TOKENIZERS["split"])},
+    # Lemma tokens as the version's proximity style compares them
+    "proximity_tokens": {"depends": ("lemmas",), "compute": lambda ctx, rules: ctx.token_ids(
+        PROXIMITY_TOKENS[rules["proximity"]], ctx.feature("lemmas", rules), TOKENIZERS[PROXIMITY_TOKENS[rules["proximity"]]]
+    )},
+    "stopword_tokens": {"depends": ("synonyms",), "compute": lambda ctx, rules: ctx.token_ids(
+        "basic_stopword", ctx.feature("synonyms", rules), TOKENIZERS["basic_stopword"]
+    )},
+    "quantities": {"depends": ("text",), "compute": lambda ctx, rules: quantity_slots(ctx.lower)},
+    "density_index": {"depends": ("synonyms",), "compute": _density_index}
+}
+
+def required_features(rules: Dict, criteria: Iterable[str] = None) -> set:
+    # Every feature the selected criteria of a rule version may compute
+    needed = set()
+    pending = [
+        feature for name, plugin in CRITERIA[rules["engine"]].items()
+        if (criteria is None or name in criteria) and plugin["applies"](rules)
+        for feature in plugin["features"]
+    ]
+    while pending:
+        feature = pending.pop()
+        if feature not in needed:
+            needed.add(feature)
+            pending.extend(FEATURES[feature]["depends"])
+    return needed
+
+# ----------------- Biodiversity Criteria -----------------
+def average_tier(scores: List[int], rounding: str) -> int:
+    if rounding == "half_up":
+        return int(Decimal(sum(scores) / len(scores)).quantize(0, ROUND_HALF_UP))
+    return round(sum(scores) / len(scores))
+
+def overall_rating(scores: Dict[str, Dict], rounding: str) -> Tuple[int, str]:
+    average = average_tier([scores[criterion]["score"] for criterion in scores], rounding)
+    return average, RATING[average]
+
+def basic_vegetation_layers(ctx: DocumentContext, rules: Dict) -> Dict:
+    description = ctx.feature("text", rules)
+    if any(x in description for x in ["wildflower", "shrubs", "low-rise", "canopy", "trees", "layers"]):
+        return {"score": 3, "comment": "Multiple vegetation layers observed, supporting diverse niches."}
+    if "some layering" in description or "grass and trees" in description:
+        return {"score": 2, "comment": "Some layering, but not highly diverse."}
+    return {"score": 1, "comment": "Limited vertical structure."}
+
+def basic_species_variety(ctx: DocumentContext, rules: Dict) -> Dict:
+    description = ctx.feature("text", rules)
+    if "variety of species" in description or "diverse plant species" in description:
+        return {"score": 3, "comment": "High diversity of plant species visible."}
+    if "some mix" in description:
+        return {"score": 2, "comment": "Moderate species variety."}
+    return {"score": 1, "comment": "Limited or uniform species present."}
+
+def basic_vegetation_density(ctx: DocumentContext, rules: Dict) -> Dict:
+    description = ctx.feature("text", rules)
+    if "dense" in description:
+        return {"score": 3, "comment": "Vegetation is dense, providing good habitat."}
+    if "moderate" in description:
+        return {"score": 2, "comment": "Moderate vegetation coverage."}
+    return {"score": 1, "comment": "Sparse vegetation areas observed."}
+
+def basic_biodiversity_hotspots(ctx: DocumentContext, rules: Dict) -> Dict:
+    description = ctx.feature("text", rules)
+    features = sum(x in description for x in ["birdhouse", "insect hotel", "deadwood", "rock pile"])
+    if features >= 2:
+        return {"score": 3, "comment": "Multiple biodiversity features present."}
+    if features == 1:
+        return {"score": 2, "comment": "One biodiversity feature detected."}
+    return {"score": 1, "comment": "No biodiversity hotspots visible."}
+
+def biodiversity_texts(ctx: DocumentContext, rules: Dict) -> Tuple[str, str]:
+    # (text used for negation checks, synonym-normalized lemmatized text used for matching)
+    return ctx.feature("phrases", rules), ctx.feature("lemmas", rules)
+
+def keyword_found(ctx: DocumentContext, rules: Dict, clean: str, keyword: str) -> bool:
+    return keyword in ctx.feature("statements", rules) or ctx.contains(clean, keyword)
+
+def keyword_negated(ctx: DocumentContext, rules: Dict, description: str, keyword: str) -> bool:
+    statements = ctx.feature("statements", rules)
+    if keyword in statements:
+        return statements[keyword]
+    return ctx.negated(description, keyword, rules["such_as_negation"])
+
+# The attribute each proximity group guesses at
+PROXIMITY_SUBJECTS = {
+    "high_variety_proximity": "species variety", "moderate_variety_proximity": "species variety",
+    "high_density_proximity": "vegetation", "moderate_density_proximity": "vegetation"
+}
+
+def proximity_groups(ctx: DocumentContext, rules: Dict, key: str) -> List:
+    # None when an attribute statement already settles the subject: "plant mix
+    # is moderate" must not be upgraded by an unrelated "diverse" nearby, nor
+    # "species variety is not diverse" by its own "diverse"
+    subject = PROXIMITY_SUBJECTS.get(key)
+    if any(fact[0] == subject for fact in ctx.feature("attributes", rules)):
+        return []
+    return rules[key]
+
+def keyword_matches(ctx: DocumentContext, rules: Dict, keywords: List[str]) -> Tuple[List[str], List[str]]:
+    description, clean = biodiversity_texts(ctx, rules)
+    matched = []
+    negated = []
+    for kw in keywords:
+        if keyword_found(ctx, rules, clean, kw):
+            if keyword_negated(ctx, rules, description, kw):
+                negated.append(kw)
+            else:
+                matched.append(kw)
+    return matched, negated
+
+def _tiered(ctx: DocumentContext, rules: Dict, high_label: str, mod_label: str,
+            high: Tuple[List[str], List[str]], moderate: Tuple[List[str], List[str]],
+            high_proximity: List, moderate_proximity: List, fallback: str) -> Dict:
+    high_matched, high_negated = high
+    mod_matched, mod_negated = moderate
+    style, distance = rules["proximity"], rules["proximity_distance"]
+    clean = ctx.feature("lemmas", rules)
+
+    for matched, groups in ((high_matched, high_proximity), (mod_matched, moderate_proximity)):
+        if matched:
+            continue
+        for label, pairs in groups:
+            if any(ctx.nearby(style, clean, p1, p2, distance) for p1, p2 in pairs):
+                matched.append(label)
+                break
+
+    if high_matched:
+        score, comment, negated = 3, f"{high_label}: {', '.join(high_matched)}", high_negated
+    elif mod_matched:
+        score, comment, negated = 2, f"{mod_label}: {', '.join(mod_matched)}", mod_negated
+    else:
+        return {"score": 1, "comment": fallback}
+    if rules["comment_negated_tiers"] and negated:
+        comment += f" (Skipped negated: {', '.join(negated)})"
+    return {"score": score, "comment": comment}
+
+def vegetation_layers(ctx: DocumentContext, rules: Dict) -> Dict:
+    veg_matched, veg_negated = keyword_matches(ctx, rules, rules["vegetation_keywords"])
+    top, middle = rules["vegetation_tiers"]
+    score = 3 if len(veg_matched) >= top else 2 if len(veg_matched) >= middle else 1
+    comment = f"{len(veg_matched)} matches: {', '.join(veg_matched)}" if veg_matched else "Limited vegetation layers detected."
+    if veg_negated:
+        comment += f" (Skipped negated: {', '.join(veg_negated)})"
+    return {"score": score, "comment": comment}
+
+def species_variety(ctx: DocumentContext, rules: Dict) -> Dict:
+    return _tiered(
+        ctx, rules, "High variety", "Moderate variety",
+        keyword_matches(ctx, rules, rules["high_variety"]), keyword_matches(ctx, rules, rules["moderate_variety"]),
+        proximity_groups(ctx, rules, "high_variety_proximity"), proximity_groups(ctx, rules, "moderate_variety_proximity"),
+        "Limited or sparse species variety."
+    )
+
+def vegetation_density(ctx: DocumentContext, rules: Dict) -> Dict:
+    return _tiered(
+        ctx, rules, "Dense", "Moderate",
+        keyword_matches(ctx, rules, rules["high_density"]), keyword_matches(ctx, rules, rules["moderate_density"]),
+        proximity_groups(ctx, rules, "high_density_proximity"), proximity_groups(ctx, rules, "moderate_density_proximity"),
+        "Sparse or low vegetation coverage."
+    )
+
+def biodiversity_hotspots(ctx: DocumentContext, rules: Dict) -> Dict:
+    matched, negated = keyword_matches(ctx, rules, rules["hotspot_keywords"])
+    count = len(matched)
+    top, middle = rules["hotspot_tiers"]
+    score = 3 if count >= top else 2 if count >= middle else 1
+    comment = f"{count} hotspot(s): {', '.join(matched)}"
+    if negated:
+        comment += f" (Skipped negated: {', '.join(negated)})"
+    return {"score": score, "comment": comment}
+
+# Score-only variants: the tier without comments, stopping once it is locked in.
+# Negation is checked only for keywords that can still move the tier.
+def keyword_tier(ctx: DocumentContext, rules: Dict, keywords: List[str], tiers: Tuple[int, int]) -> int:
+    description, clean = biodiversity_texts(ctx, rules)
+    top, middle = tiers
+    candidates = [kw for kw in keywords if keyword_found(ctx, rules, clean, kw)]
+    count = 0
+    for i, kw in enumerate(candidates):
+        remaining = len(candidates) - i
+        if count + remaining < middle:
+            return 1
+        if count >= middle and count + remaining < top:
+            return 2
+        if not keyword_negated(ctx, rules, description, kw):
+            count += 1
+            if count >= top:
+                return 3
+    return 3 if count >= top else 2 if count >= middle else 1
+
+def any_unnegated(ctx: DocumentContext, rules: Dict, keywords: List[str]) -> bool:
+    description, clean = biodiversity_texts(ctx, rules)
+    return any(keyword_found(ctx, rules, clean, kw) and not keyword_negated(ctx, rules, description, kw) for kw in keywords)
+
+def any_nearby(ctx: DocumentContext, rules: Dict, key: str) -> bool:
+    clean = ctx.feature("lemmas", rules)
+    return any(
+        ctx.nearby(rules["proximity"], clean, p1, p2, rules["proximity_distance"])
+        for _, pairs in proximity_groups(ctx, rules, key) for p1, p2 in pairs
+    )
+
+def species_variety_tier(ctx: DocumentContext, rules: Dict) -> int:
+    if any_unnegated(ctx, rules, rules["high_variety"]) or any_nearby(ctx, rules, "high_variety_proximity"):
+        return 3
+    if any_unnegated(ctx, rules, rules["moderate_variety"]) or any_nearby(ctx, rules, "moderate_variety_proximity"):
+        return 2
+    return 1
+
+def vegetation_density_tier(ctx: DocumentContext, rules: Dict) -> int:
+    if any_unnegated(ctx, rules, rules["high_density"]) or any_nearby(ctx, rules, "high_density_proximity"):
+        return 3
+    if any_unnegated(ctx, rules, rules["moderate_density"]) or any_nearby(ctx, rules, "moderate_density_proximity"):
+        return 2
+    return 1
+
+# ----------------- Stormwater Criteria -----------------
+def build_density_index(description: str, density_map: Dict[str, float]) -> Tuple[Dict[str, List[int]], List[int], List[int]]:
+    rank = {term: r for r, term in enumerate(density_map)}
+    word_positions = defaultdict(list)
+    density_positions = []
+    density_ranks = []
+    for i, word in enumerate(description.lower().split()):
+        word_positions[word].append(i)
+        if word in rank:
+            density_positions.append(i)
+            density_ranks.append(rank[word])
+    return word_positions, density_positions, density_ranks
+
+def get_density_multiplier(index: Tuple[Dict[str, List[int]], List[int], List[int]], veg: str,
+                           density_map: Dict[str, float], window_size: int) -> float:
+    word_positions, density_positions, density_ranks = index
+    multipliers_by_rank = list(density_map.values())
+    multipliers = []
+    for i in word_positions.get(veg.lower().split()[0], []):
+        lo = bisect_left(density_positions, i - window_size)
+        hi = bisect_right(density_positions, i + window_size)
+        multipliers.append(multipliers_by_rank[min(density_ranks[lo:hi])] if lo < hi else 1.0)
+    return max(multipliers) if multipliers else 1.0
+
+def evaluate_permeable_balance(surface_counts: Dict[str, int]) -> Tuple[int, str]:
+    permeable = surface_counts["permeable"]
+    semi_impermeable = surface_counts["semi-permeable"]
+    impermeable = surface_counts["impermeable"]
+    comparison_value = semi_impermeable + impermeable
+
+    if permeable > comparison_value:
+        score = 3
+    elif permeable == comparison_value:
+        score = 2
+    else:
+        score = 1
+
+    comment = (f"Permeable surfaces = {permeable}; "
+               f"Semi-permeable + Impermeable = {comparison_value} "
+               f"(Semi-permeable: {semi_impermeable}, Impermeable: {impermeable})")
+    return score, comment
+
+def evaluate_stormwater_density(ctx: DocumentContext, description: str, rules: Dict) -> Tuple[int, str]:
+    for kw in rules["high_density_keywords"]:
+        if ctx.contains(description, kw):
+            return 3, f"Dense vegetation detected directly: '{kw}'"
+
+    for kw in rules["moderate_density_keywords"]:
+        if ctx.contains(description, kw):
+            return 2, f"Moderate vegetation detected directly: '{kw}'"
+
+    if (ctx.nearby("basic_stopword", description, "vegetation", "dense", 10)
+            or ctx.nearby("basic_stopword", description, "vegetation density", "dense", 10)):
+        return 3, "Dense vegetation detected via proximity match."
+
+    if (ctx.nearby("basic_stopword", description, "vegetation", "moderate", 10)
+            or ctx.nearby("basic_stopword", description, "vegetation density", "moderate", 10)):
+        return 2, "Moderate vegetation detected via proximity match."
+
+    return 1, "Sparse or low vegetation coverage."
+
+def count_surfaces(ctx: DocumentContext, rules: Dict) -> Dict[str, int]:
+    description = ctx.feature("synonyms", rules)
+    surface_counts = {"permeable": 0, "semi-permeable": 0, "impermeable": 0}
+    for surface, category in rules["surface_types"].items():
+        if ctx.contains(description, surface):
+            surface_counts[category] += 1
+    return surface_counts
+
+def permeable_surface(ctx: DocumentContext, rules: Dict) -> Dict:
+    score, comment = evaluate_permeable_balance(count_surfaces(ctx, rules))
+    return {"score": score, "comment": comment}
+
+def permeable_surface_tier(ctx: DocumentContext, rules: Dict) -> int:
+    surface_counts = count_surfaces(ctx, rules)
+    permeable = surface_counts["permeable"]
+    others = surface_counts["semi-permeable"] + surface_counts["impermeable"]
+    return 3 if permeable > others else 2 if permeable == others else 1
+
+def retention_tier(veg_score_raw: float, rules: Dict) -> int:
+    if rules["diversity_threshold"]:
+        veg_score = round((veg_score_raw / rules["diversity_threshold"]) * 3)
+        return min(max(veg_score, 1), 3)
+    top, middle = rules["vegetation_tiers"]
+    return 3 if veg_score_raw >= top else 2 if veg_score_raw >= middle else 1
+
+def vegetation_retention(ctx: DocumentContext, rules: Dict) -> Dict:
+    description = ctx.feature("synonyms", rules)
+    veg_score_raw = 0
+    veg_found = []
+    for veg, base_weight in rules["vegetation_weights"].items():
+        if ctx.contains(description, veg):
+            if rules["density_weighting"]:
+                density_index = ctx.feature("density_index", rules)
+                density_multiplier = get_density_multiplier(density_index, veg, rules["density_map"], rules["density_window"])
+                weighted_score = base_weight * density_multiplier
+                veg_found.append(f"{veg} (base {base_weight} × density {density_multiplier} = {weighted_score})")
+            else:
+                weighted_score = base_weight
+                veg_found.append(f"{veg} (weight {base_weight})")
+            veg_score_raw += weighted_score
+
+    veg_comment = ", ".join(veg_found) if veg_found else "No significant water-retentive vegetation found."
+    return {"score": retention_tier(veg_score_raw, rules), "comment": veg_comment}
+
+def vegetation_retention_tier(ctx: DocumentContext, rules: Dict) -> int:
+    description = ctx.feature("synonyms", rules)
+    # With non-negative weights the sum only grows, so the top tier is final
+    monotone = min(rules["vegetation_weights"].values(), default=0) >= 0 and min(rules["density_map"].values(), default=0) >= 0
+    veg_score_raw = 0
+    for veg, base_weight in rules["vegetation_weights"].items():
+        if ctx.contains(description, veg):
+            if rules["density_weighting"]:
+                density_index = ctx.feature("density_index", rules)
+                veg_score_raw += base_weight * get_density_multiplier(density_index, veg, rules["density_map"], rules["density_window"])
+            else:
+                veg_score_raw += base_weight
+            if monotone and retention_tier(veg_score_raw, rules) == 3:
+                return 3
+    return retention_tier(veg_score_raw, rules)
+
+def stormwater_vegetation_density(ctx: DocumentContext, rules: Dict) -> Dict:
+    score, comment = evaluate_stormwater_density(ctx, ctx.feature("synonyms", rules), rules)
+    return {"score": score, "comment": comment}
+
+# ----------------- Maintenance Criteria -----------------
+@lru_cache(maxsize=64)
+def quantity_slots(text: str) -> List[Tuple[str, int, Tuple[int, ...]]]:
+    # Every number token with the positions where a counted element may start
+    # after it: past 0-4 words, each run of spaces and word characters taken
+    # whole. One pass per document instead of one regex scan per keyword.
+    slots = []
+    for match in _NUMBER_TOKEN.finditer(text):
+        positions = []
+        end = match.end()
+        for words in range(5):
+            space = _SPACE_RUN.match(text, end)
+            if not space:
+                break
+            positions.append(space.end())
+            word = _WORD_RUN.match(text, space.end()) if words < 4 else None
+            if not word:
+                break
+            end = word.end()
+        slots.append((match.group(1), match.start(), tuple(positions)))
+    return slots
+
+def extract_quantity_phrases(text: str, keyword: str) -> List[int]:
+    # Same matches as findall(r'\b(number)\b(?:\s+\w+){0,4}?\s+' + keyword), in linear time
+    text = text.lower()
+    results = []
+    end = 0
+    for number, start, positions in quantity_slots(text):
+        if start < end:
+            continue
+        for position in positions:
+            if text.startswith(keyword, position):
+                end = position + len(keyword)
+                if number.isdigit():
+                    results.append(int(number))
+                elif number in NUMBER_WORDS:
+                    results.append(NUMBER_WORDS[number])
+                break
+    return results
+
+_reverse_maps = {}
+
+def reverse_synonyms(synonym_map: Dict[str, str]) -> Dict[str, List[str]]:
+    key = id(synonym_map)
+    if key not in _reverse_maps:
+        reverse_map = defaultdict(list)
+        for syn, norm in synonym_map.items():
+            reverse_map[norm].append(syn)
+        # A plain dict: lookups of missing keys must not insert into shared state
+        _reverse_maps[key] = (synonym_map, dict(reverse_map))
+    return _reverse_maps[key][1]
+
+def maintenance_effort(ctx: DocumentContext, rules: Dict) -> Dict:
+    raw_text = ctx.feature("phrases", rules)
+    clean_text = ctx.feature("lemmas", rules)
+    reverse_map = reverse_synonyms(rules["synonym_map"])
+    proximity_keywords = rules["proximity_keywords"]
+
+    matched_elements = {}
+    for keyword, weight in rules["weights"].items():
+        count = sum(ctx.cached(("quantity", keyword), lambda: extract_quantity_phrases(raw_text, keyword)))
+
+        found = count > 0
+        if not found and keyword in proximity_keywords:
+            for w1, w2 in proximity_keywords[keyword]:
+                if ctx.nearby("substring", clean_text, w1, w2, rules["proximity_distance"]):
+                    count = 1
+                    found = True
+                    break
+
+        if not found and ctx.contains(clean_text, keyword, plural=True):
+            count = 1
+            found = True
+
+        if found:
+            if not any(ctx.negated(raw_text, syn, True) for syn in reverse_map.get(keyword, [])):
+                matched_elements[f"{keyword} (x{count})"] = count * weight
+
+    total_weight = sum(matched_elements.values())
+    high, moderate = rules["effort_thresholds"]
+    if total_weight >= high:
+        score, label = 1, "High Effort (🛠️)"
+    elif total_weight >= moderate:
+        score, label = 2, "Moderate Effort (🔧)"
+    else:
+        score, label = 3, "Low Effort (✅)"
+    return {"score": score, "comment": label, "matched": matched_elements}
+
+def maintenance_effort_tier(ctx: DocumentContext, rules: Dict) -> int:
+    raw_text = ctx.feature("phrases", rules)
+    clean_text = ctx.feature("lemmas", rules)
+    reverse_map = reverse_synonyms(rules["synonym_map"])
+    proximity_keywords = rules["proximity_keywords"]
+    high, moderate = rules["effort_thresholds"]
+
+    candidates = []
+    for keyword, weight in rules["weights"].items():
+        count = sum(ctx.cached(("quantity", keyword), lambda: extract_quantity_phrases(raw_text, keyword)))
+        if count <= 0:
+            # A proximity or plain match both count once, so the cheap check goes first
+            found = ctx.contains(clean_text, keyword, plural=True) or any(
+                ctx.nearby("substring", clean_text, w1, w2, rules["proximity_distance"])
+                for w1, w2 in proximity_keywords.get(keyword, [])
+            )
+            count = 1 if found else 0
+        if count > 0 and count * weight:
+            candidates.append((keyword, count * weight))
+
+    # With non-negative weights the possible totals are bounded, and negation is
+    # checked only while a candidate can still move the total across a threshold
+    monotone = all(weight > 0 for _, weight in candidates)
+    remaining = sum(weight for _, weight in candidates)
+    total_weight = 0
+    for keyword, weight in candidates:
+        if monotone:
+            if total_weight >= high:
+                return 1
+            if total_weight + remaining < moderate:
+                return 3
+            if total_weight >= moderate and total_weight + remaining < high:
+                return 2
+        remaining -= weight
+        if not any(ctx.negated(raw_text, syn, True) for syn in reverse_map.get(keyword, [])):
+            total_weight += weight
+    return 1 if total_weight >= high else 2 if total_weight >= moderate else 3
+
+# ----------------- Metrics -----------------
+# Latency per rule version engine and per criterion (a criterion's time
+# includes the document features it is the first to need), and the state of
+# the shared caches. See Metrics.py for the exporters.
+DOCUMENTS = METRICS.counter("scorer_documents_total", "Documents scored.")
+ENGINE_SECONDS = METRICS.histogram("scorer_engine_seconds", "Time to score one document with one rule version.", ("engine",))
+CRITERION_SECONDS = METRICS.histogram("scorer_criterion_seconds", "Time to score one criterion of one document.",
+                                      ("engine", "criterion"))
+
+def _lru_stats(function) -> Tuple[int, int]:
+    info = function.cache_info()
+    return info.hits, info.misses
+
+def _vocabulary_lemma_stats() -> Tuple[int, int]:
+    with _resource_lock:
+        _fold_vocabulary_stats()
+        lookups = _ended_vocabulary_stats[0] + sum(stats[0] for _, stats in _vocabulary_stats)
+        misses = _ended_vocabulary_stats[1] + sum(stats[1] for _, stats in _vocabulary_stats)
+    return lookups - misses, misses
+
+register_cache("lemma", _vocabulary_lemma_stats)
+register_cache("lemmatizer", lambda: _lru_stats(lemmatize))
+register_cache("finnish_stem", lambda: _lru_stats(_language_resources["fi"]["stem"]) if "fi" in _language_resources else (0, 0))
+METRICS.collector("scorer_resource_load_seconds", "gauge", "Time spent loading a language resource.", ("resource",),
+                  lambda: {(name,): seconds for name, seconds in RESOURCE_LOAD_SECONDS.items()})
+
+# ----------------- Criteria -----------------
+# Criterion plugins per engine, in report order. "features" lists the
+# document features (FEATURES) the criterion reads; "applies" turns a
+# criterion off for rule versions that do not score it; "tier" is the
+# score-only variant (by default the score of the full result).
+CRITERIA = {}
+
+def register_criterion(engine: str, name: str, score, features: Iterable[str], applies=None, tier=None) -> None:
+    unknown = set(features) - set(FEATURES)
+    if unknown:
+        raise ValueError(f"Criterion {engine}.{name} depends on unknown features: {', '.join(sorted(unknown))}")
+    CRITERIA.setdefault(engine, {})[name] = {
+        "score": score,
+        "features": tuple(features),
+        "applies": applies or (lambda rules: True),
+        "tier": tier or (lambda ctx, rules: score(ctx, rules)["score"])
+    }
+
+register_criterion("biodiversity_basic", "vegetation_layers", basic_vegetation_layers, ["text"])
+register_criterion("biodiversity_basic", "species_variety", basic_species_variety, ["text"])
+register_criterion("biodiversity_basic", "vegetation_density", basic_vegetation_density, ["text"])
+register_criterion("biodiversity_basic", "biodiversity_hotspots", basic_biodiversity_hotspots, ["text"])
+
+register_criterion("biodiversity", "vegetation_layers", vegetation_layers, ["statements", "lemmas", "sentences"],
+                   tier=lambda ctx, rules: keyword_tier(ctx, rules, rules["vegetation_keywords"], rules["vegetation_tiers"]))
+register_criterion("biodiversity", "species_variety", species_variety, ["statements", "lemmas", "sentences", "proximity_tokens"],
+                   tier=species_variety_tier)
+register_criterion("biodiversity", "vegetation_density", vegetation_density, ["statements", "lemmas", "sentences", "proximity_tokens"],
+                   tier=vegetation_density_tier)
+register_criterion("biodiversity", "biodiversity_hotspots", biodiversity_hotspots, ["statements", "lemmas", "sentences"],
+                   tier=lambda ctx, rules: keyword_tier(ctx, rules, rules["hotspot_keywords"], rules["hotspot_tiers"]))
+
+register_criterion("stormwater", "permeable_surface", permeable_surface, ["synonyms"], tier=permeable_surface_tier)
+register_criterion("stormwater", "vegetation_retention", vegetation_retention, ["synonyms", "density_index"],
+                   tier=vegetation_retention_tier)
+# evaluate_stormwater_density already stops at the first hit
+register_criterion("stormwater", "vegetation_density", stormwater_vegetation_density, ["synonyms", "stopword_tokens"],
+                   applies=lambda rules: rules["evaluate_density"])
+
+register_criterion("maintenance", "maintenance_effort", maintenance_effort, ["quantities", "lemmas", "tokens", "sentences"],
+                   tier=maintenance_effort_tier)
+
+def run_criteria(ctx: DocumentContext, rules: Dict, criteria: Iterable[str], step: str) -> Dict[str, object]:
+    # Runs the "score" or "tier" step of the selected criteria, timing each
+    selected = None if criteria is None else set(criteria)
+    engine = rules["engine"]
+    clock, observe = time.perf_counter, CRITERION_SECONDS.observe
+    results = {}
+    for name, plugin in CRITERIA[engine].items():
+        if (selected is None or name in selected) and plugin["applies"](rules):
+            start = clock()
+            results[name] = plugin[step](ctx, rules)
+            observe((engine, name), clock() - start)
+    return results
+
+def score_criteria(ctx: DocumentContext, rules: Dict, criteria: Iterable[str] = None) -> Dict[str, Dict]:
+    # {criterion: {"score", "comment"}} for the selected criteria of one rule version
+    return run_criteria(ctx, rules, criteria, "score")
+
+# ----------------- Engines -----------------
+def score_biodiversity(ctx: DocumentContext, rules: Dict) -> Dict:
+    scores = score_criteria(ctx, rules)
+    overall_score, overall_comment = overall_rating(scores, rules.get("rounding", "half_even"))
+    return {"criteria_scores": scores, "overall_score": overall_score, "overall_comment": overall_comment}
+
+def score_stormwater(ctx: DocumentContext, rules: Dict) -> Dict:
+    result = score_criteria(ctx, rules)
+    criterion_scores = [data["score"] for data in result.values()]
+    overall = round(sum(criterion_scores) / len(criterion_scores))
+    result["overall_score"] = overall
+    result["overall_comment"] = RATING[overall]
+    return result
+
+def score_maintenance(ctx: DocumentContext, rules: Dict) -> Tuple[int, str, Dict[str, int]]:
+    effort = score_criteria(ctx, rules)["maintenance_effort"]
+    return effort["score"], effort["comment"], effort["matched"]
+
+def score_tiers(ctx: DocumentContext, rules: Dict, criteria: Iterable[str] = None) -> Dict[str, int]:
+    # Score-only fast path: the same numbers as flatten_scores(engine, ENGINES[engine](...)),
+    # or only the selected criteria (no overall) when criteria is given
+    tiers = run_criteria(ctx, rules, criteria, "tier")
+    if criteria is not None:
+        return tiers
+    family = ENGINE_FAMILIES[rules["engine"]]
+    if family == "maintenance":
+        return {"overall": tiers["maintenance_effort"]}
+    if family == "biodiversity":
+        tiers["overall"] = average_tier(list(tiers.values()), rules.get("rounding", "half_even"))
+    else:
+        tiers["overall"] = round(sum(tiers.values()) / len(tiers))
+    return tiers
+
+ENGINES = {
+    "biodiversity_basic": score_biodiversity,
+    "biodiversity": score_biodiversity,
+    "stormwater": score_stormwater,
+    "maintenance": score_maintenance
+}
+
+# ----------------- Flattened Scores -----------------
+def flatten_scores(engine: str, result) -> Dict[str, int]:
+    family = ENGINE_FAMILIES[engine]
+    if family == "maintenance":
+        score, _, _ = result
+        return {"overall": score}
+    if family == "biodiversity":
+        flat = {criterion: data["score"] for criterion, data in result["criteria_scores"].items()}
+    else:
+        flat = {criterion: data["score"] for criterion, data in result.items() if isinstance(data, dict)}
+    flat["overall"] = result["overall_score"]
+    return flat
+
+# ----------------- Corpus Runs -----------------
+def initialize(versions: Iterable[str] = None, rule_versions: Dict[str, Dict] = None) -> None:
+    # Loads every shared resource and compiled table the versions use, so that
+    # threads scoring afterwards only read shared state
+    get_stop_words()
+    if _lemma_backend == "table":
+        get_lemma_table()
+    else:
+        get_lemmatizer()
+    for name in versions or ENGLISH_VERSIONS:
+        rules = (rule_versions or RULE_VERSIONS)[name]
+        language = rules.get("language", "en")
+        if language != "en":
+            get_language_resources(language)
+        elif rules.get("typo_tolerance") and not rules.get("spelling_index"):
+            get_spelling_index()
+        if rules.get("synonym_map"):
+            reverse_synonyms(rules["synonym_map"])
+        if rules.get("attribute_statements"):
+            attribute_pattern(rules["attribute_statements"])
+
+def score_document(text: str, versions: Iterable[str] = None, rule_versions: Dict[str, Dict] = None,
+                   criteria: Iterable[str] = None, score_only: bool = False) -> Dict[str, object]:
+    # rule_versions replaces RULE_VERSIONS, e.g. with a compiled rule pack. With
+    # criteria, each version returns only {criterion: {"score", "comment"}} for
+    # the criteria it has (no overall score) and only their features are computed.
+    # score_only returns {criterion: score} per version without building comments.
+    contexts = {}
+    results = {}
+    for name in versions or ENGLISH_VERSIONS:
+        rules = (rule_versions or RULE_VERSIONS)[name]
+        start = time.perf_counter()
+        ctx = context_for(contexts, text, rules)
+        if score_only:
+            results[name] = score_tiers(ctx, rules, criteria)
+        elif criteria is None:
+            results[name] = ENGINES[rules["engine"]](ctx, rules)
+        else:
+            results[name] = score_criteria(ctx, rules, criteria)
+        ENGINE_SECONDS.observe((rules["engine"],), time.perf_counter() - start)
+    DOCUMENTS.inc()
+    return results
+
+def score_any_language(text: str) -> Tuple[str, Dict[str, object]]:
+    # Detects the language and scores with that language's current version of each family
+    language = detect_language(text)
+    versions = LANGUAGE_VERSIONS[language]
+    results = score_document(text, versions.values())
+    return language, {family: results[name] for family, name in versions.items()}
+
+def corpus_document(path: str, record, number: int) -> Tuple[str, str]:
+    # (doc_id, text) of one corpus record: a stripped line, or a CSV row as a
+    # dict. number is the line (or CSV row after the header) it came from.
+    if isinstance(record, dict):
+        return str(record.get("id") or number), record.get("description", record.get("text")) or ""
+    if path.endswith(".jsonl"):
+        record = json.loads(record)
+        return str(record.get("id", number)), record.get("description", record.get("text", ""))
+    return str(number), record
+
+def iter_corpus(path: str) -> Iterator[Tuple[str, str]]:
+    # JSONL, CSV with 'id' and 'description' columns, or one description per line
+    if path.endswith(".csv"):
+        with open(path, encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            for number, row in enumerate(reader, start=1):
+                if row:
+                    yield corpus_document(path, dict(zip(header, row)), number)
+        return
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if line:
+                yield corpus_document(path, line, line_number)
+
+def run_corpus(documents: Iterable[Tuple[str, str]], versions: List[str], rule_versions: Dict[str, Dict] = None,
+               threads: int = 1) -> Iterator[Tuple[str, Dict[str, Dict[str, int]]]]:
+    # With threads > 1 documents are scored in a thread pool and yielded in
+    # input order; at most a few documents per thread are in flight
+    if threads <= 1:
+        for doc_id, text in documents:
+            yield doc_id, score_document(text, versions, rule_versions, score_only=True)
+        return
+
+    def score(doc_id: str, text: str) -> Tuple[str, Dict[str, Dict[str, int]]]:
+        return doc_id, score_document(text, versions, rule_versions, score_only=True)
+
+    initialize(versions, rule_versions)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="scorer") as executor:
+        for doc_id, text in documents:
+            pending.append(executor.submit(score, doc_id, text))
+            if len(pending) >= 4 * threads:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def compare_versions(rows: Iterable[Tuple[str, Dict[str, Dict[str, int]]]], versions: List[str]) -> Dict[Tuple[str, str], Dict[str, Dict[str, int]]]:
+    pairs = [
+        (a, b) for a, b in combinations(versions, 2)
+        if ENGINE_FAMILIES[RULE_VERSIONS[a]["engine"]] == ENGINE_FAMILIES[RULE_VERSIONS[b]["engine"]]
+    ]
+    report = {pair: defaultdict(lambda: {"differ": 0, "higher": 0, "lower": 0, "compared": 0}) for pair in pairs}
+    for _, scores in rows:
+        for a, b in pairs:
+            for criterion in scores[a].keys() & scores[b].keys():
+                stats = report[(a, b)][criterion]
+                stats["compared"] += 1
+                delta = scores[b][criterion] - scores[a][criterion]
+                if delta:
+                    stats["differ"] += 1
+                    stats["higher" if delta > 0 else "lower"] += 1
+    return {pair: dict(stats) for pair, stats in report.items()}
+
+def print_report(report: Dict[Tuple[str, str], Dict[str, Dict[str, int]]], out=sys.stdout) -> None:
+    for (a, b), criteria in report.items():
+        out.write(f"\n{a} → {b}\n")
+        for criterion, stats in sorted(criteria.items()):
+            share = stats["differ"] / stats["compared"] if stats["compared"] else 0
+            out.write(f"  {criterion:<24} differ {stats['differ']:>7} ({share:6.1%})  "
+                      f"higher {stats['higher']:>7}  lower {stats['lower']:>7}\n")
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Score a corpus with every historical rule version in one pass.")
+    parser.add_argument("corpus", help="JSONL with 'id' and 'description', CSV with those columns, or one description per line.")
+    parser.add_argument("--versions", nargs="+", choices=list(RULE_VERSIONS), default=ENGLISH_VERSIONS)
+    parser.add_argument("--output", help="CSV file for per-document scores (doc_id, version, criterion, score).")
+    parser.add_argument("--lemmatizer", choices=["wordnet", "table"], default=_lemma_backend)
+    parser.add_argument("--typo-tolerance", type=int, choices=[0, 1, 2], default=0,
+                        help="Correct misspelled rule words up to this many edits before matching.")
+    parser.add_argument("--threads", type=int, default=1, help="Score documents in a pool of this many threads.")
+    args = parser.parse_args(argv)
+    set_lemmatizer(args.lemmatizer)
+    rule_versions = None
+    if args.typo_tolerance:
+        rule_versions = {name: {**rules, "typo_tolerance": args.typo_tolerance} for name, rules in RULE_VERSIONS.items()}
+
+    rows = []
+    writer = None
+    out_file = open(args.output, "w", newline="", encoding="utf-8") if args.output else None
+    try:
+        if out_file:
+            writer = csv.writer(out_file)
+            writer.writerow(["doc_id", "version", "criterion", "score"])
+        for doc_id, scores in run_corpus(iter_corpus(args.corpus), args.versions, rule_versions, args.threads):
+            rows.append((doc_id, scores))
+            if writer:
+                for version, criteria in scores.items():
+                    for criterion, score in criteria.items():
+                        writer.writerow([doc_id, version, criterion, score])
+    finally:
+        if out_file:
+            out_file.close()
+
+    print(f"Scored {len(rows)} documents with {len(args.versions)} rule versions.")
+    print_report(compare_versions(rows, args.versions))
+
+if __name__ == "__main__":
+    main()
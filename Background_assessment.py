@@ -0,0 +1,95 @@
+from typing import Callable, Dict, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+from Metrics import METRICS, register_cache
+
+# Background assessments for the Streamlit apps.
+# The scorer runs on a shared thread pool instead of the script thread. While
+# it runs, the script polls it behind a progress bar; every poll is a point
+# where Streamlit can stop the script, so the page stays interactive. The job
+# and its result live in st.session_state under one key per app:
+#   - clicking the button again with the same text reuses the running job,
+#   - a new text cancels the stale job (a queued job never starts, a running
+#     one is abandoned and its result dropped),
+#   - other widget interactions re-render the stored result without scoring.
+#
+#   if st.button("🌺 Assess Biodiversity"):
+#       start_assessment("biodiversity_job", assess_biodiversity, description)
+#   results = assessment_result("biodiversity_job", description, "Assessing biodiversity...")
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="assessment")
+
+# Observed scoring speed, used to estimate progress of the next run
+_throughput = {"chars_per_second": 20000.0}
+
+# Jobs by key and event (started, reused, cancelled, completed) and their scoring time
+JOBS = METRICS.counter("app_assessment_jobs_total", "Background assessment jobs by event.", ("job", "event"))
+JOB_SECONDS = METRICS.histogram("app_assessment_seconds", "Time to score one background assessment.", ("job",))
+# A reused job is a result cache hit: the same text was already scored or is being scored
+register_cache("assessment_jobs", lambda: tuple(
+    sum(count for (_, event), count in JOBS.snapshot().items() if event == wanted) for wanted in ("reused", "started")
+))
+METRICS.collector("app_assessment_queue", "gauge", "Background assessments waiting for a worker thread.", (),
+                  lambda: {(): _executor._work_queue.qsize()})
+
+def _run(key: str, scorer: Callable, text: str, cancelled: threading.Event):
+    if cancelled.is_set():
+        return None
+    start = time.perf_counter()
+    result = scorer(text)
+    elapsed = time.perf_counter() - start
+    JOBS.inc((key, "completed"))
+    JOB_SECONDS.observe((key,), elapsed)
+    if elapsed > 0.05:
+        rate = len(text) / elapsed
+        _throughput["chars_per_second"] = 0.8 * _throughput["chars_per_second"] + 0.2 * rate
+    return result
+
+def start_assessment(key: str, scorer: Callable, text: str) -> Dict:
+    job = st.session_state.get(key)
+    if job and job["text"] == text and not job["cancelled"].is_set():
+        JOBS.inc((key, "reused"))
+        return job
+    cancel_assessment(key)
+    cancelled = threading.Event()
+    job = {
+        "text": text,
+        "cancelled": cancelled,
+        "started": time.monotonic(),
+        "future": _executor.submit(_run, key, scorer, text, cancelled)
+    }
+    st.session_state[key] = job
+    JOBS.inc((key, "started"))
+    return job
+
+def cancel_assessment(key: str) -> None:
+    job = st.session_state.pop(key, None)
+    if job:
+        job["cancelled"].set()
+        job["future"].cancel()
+        if not job["future"].done() or job["future"].cancelled():
+            JOBS.inc((key, "cancelled"))
+
+def assessment_result(key: str, text: str, label: str) -> Optional[object]:
+    # The finished result for this text, waiting behind a progress bar if the job is running
+    job = st.session_state.get(key)
+    if job is None:
+        return None
+    if job["text"] != text:
+        cancel_assessment(key)
+        return None
+
+    future = job["future"]
+    if not future.done():
+        expected = max(len(text) / _throughput["chars_per_second"], 0.5)
+        progress = st.progress(0.0, text=label)
+        while not future.done():
+            elapsed = time.monotonic() - job["started"]
+            progress.progress(min(elapsed / expected, 0.95), text=f"{label} ({elapsed:.1f}s)")
+            time.sleep(0.1)
+        progress.empty()
+    return future.result()
@@ -0,0 +1,302 @@
+from typing import Dict, Tuple, List, Iterable
+import argparse
+import csv
+import time
+
+import numpy as np
+from scipy import sparse
+
+from Assessment_engine import (
+    RULE_VERSIONS, ENGLISH_VERSIONS, DocumentContext, context_for, biodiversity_texts, keyword_found, keyword_negated,
+    proximity_groups, build_density_index, get_density_multiplier, reverse_synonyms, extract_quantity_phrases, iter_corpus
+)
+
+# Vectorized corpus scoring.
+# Matching runs once per document and yields canonical match features keyed
+# (version, group, term). The features of the whole corpus are stored in a
+# sparse document × term matrix; every criterion of every rule version is then
+# a sparse projection (X @ P) followed by NumPy tier logic, so re-scoring a
+# million documents takes a few matrix products.
+#
+#   python Batch_scoring.py corpus.jsonl --output scores.csv
+
+Column = Tuple[str, str, str]
+
+# ----------------- Match Features -----------------
+BASIC_GROUPS = {
+    "layers_high": ["wildflower", "shrubs", "low-rise", "canopy", "trees", "layers"],
+    "layers_moderate": ["some layering", "grass and trees"],
+    "variety_high": ["variety of species", "diverse plant species"],
+    "variety_moderate": ["some mix"],
+    "density_high": ["dense"],
+    "density_moderate": ["moderate"],
+    "hotspots": ["birdhouse", "insect hotel", "deadwood", "rock pile"]
+}
+
+BIODIVERSITY_GROUPS = [
+    ("vegetation", "vegetation_keywords", None),
+    ("variety_high", "high_variety", "high_variety_proximity"),
+    ("variety_moderate", "moderate_variety", "moderate_variety_proximity"),
+    ("density_high", "high_density", "high_density_proximity"),
+    ("density_moderate", "moderate_density", "moderate_density_proximity"),
+    ("hotspots", "hotspot_keywords", None)
+]
+
+def basic_features(ctx: DocumentContext, rules: Dict) -> Dict[Tuple[str, str], float]:
+    return {
+        (group, term): 1.0
+        for group, terms in BASIC_GROUPS.items() for term in terms if term in ctx.lower
+    }
+
+def biodiversity_features(ctx: DocumentContext, rules: Dict) -> Dict[Tuple[str, str], float]:
+    description, clean = biodiversity_texts(ctx, rules)
+    features = {}
+    for group, keywords_key, proximity_key in BIODIVERSITY_GROUPS:
+        found = False
+        for kw in rules[keywords_key]:
+            if keyword_found(ctx, rules, clean, kw) and not keyword_negated(ctx, rules, description, kw):
+                features[(group, kw)] = features.get((group, kw), 0.0) + 1.0
+                found = True
+        if found or proximity_key is None:
+            continue
+        for label, pairs in proximity_groups(ctx, rules, proximity_key):
+            if any(ctx.nearby(rules["proximity"], clean, p1, p2, rules["proximity_distance"]) for p1, p2 in pairs):
+                features[(group, label)] = 1.0
+                break
+    return features
+
+def stormwater_features(ctx: DocumentContext, rules: Dict) -> Dict[Tuple[str, str], float]:
+    description = ctx.normalized(ctx.lower, rules["synonym_map"])
+    features = {}
+
+    for surface, category in rules["surface_types"].items():
+        if ctx.contains(description, surface):
+            features[(f"surface:{category}", surface)] = 1.0
+
+    density_index = None
+    for veg in rules["vegetation_weights"]:
+        if ctx.contains(description, veg):
+            multiplier = 1.0
+            if rules["density_weighting"]:
+                if density_index is None:
+                    density_index = build_density_index(description, rules["density_map"])
+                multiplier = get_density_multiplier(density_index, veg, rules["density_map"], rules["density_window"])
+            features[("vegetation", veg)] = multiplier
+
+    if rules["evaluate_density"]:
+        features.update(stormwater_density_features(ctx, description, rules))
+    return features
+
+def stormwater_density_features(ctx: DocumentContext, description: str, rules: Dict) -> Dict[Tuple[str, str], float]:
+    # evaluate_stormwater_density stops at the first hit, so at most one feature is emitted
+    for group, keywords in (("density_high", rules["high_density_keywords"]), ("density_moderate", rules["moderate_density_keywords"])):
+        for kw in keywords:
+            if ctx.contains(description, kw):
+                return {(group, kw): 1.0}
+    for group, word in (("density_high", "dense"), ("density_moderate", "moderate")):
+        if (ctx.nearby("basic_stopword", description, "vegetation", word, 10)
+                or ctx.nearby("basic_stopword", description, "vegetation density", word, 10)):
+            return {(group, "proximity"): 1.0}
+    return {}
+
+def maintenance_features(ctx: DocumentContext, rules: Dict) -> Dict[Tuple[str, str], float]:
+    raw_text = ctx.lower
+    clean_text = ctx.lemmatized(ctx.normalized(raw_text, rules["synonym_map"]))
+    reverse_map = reverse_synonyms(rules["synonym_map"])
+    proximity_keywords = rules["proximity_keywords"]
+
+    features = {}
+    for keyword in rules["weights"]:
+        count = sum(ctx.cached(("quantity", keyword), lambda: extract_quantity_phrases(raw_text, keyword)))
+        if count == 0:
+            if any(ctx.nearby("substring", clean_text, w1, w2, rules["proximity_distance"])
+                   for w1, w2 in proximity_keywords.get(keyword, [])):
+                count = 1
+            elif ctx.contains(clean_text, keyword, plural=True):
+                count = 1
+        if count and not any(ctx.negated(raw_text, syn, True) for syn in reverse_map.get(keyword, [])):
+            features[("elements", keyword)] = float(count)
+    return features
+
+FEATURE_EXTRACTORS = {
+    "biodiversity_basic": basic_features,
+    "biodiversity": biodiversity_features,
+    "stormwater": stormwater_features,
+    "maintenance": maintenance_features
+}
+
+def document_features(text: str, versions: Iterable[str]) -> Dict[Column, float]:
+    contexts = {}
+    features = {}
+    for name in versions:
+        rules = RULE_VERSIONS[name]
+        ctx = context_for(contexts, text, rules)
+        for (group, term), value in FEATURE_EXTRACTORS[rules["engine"]](ctx, rules).items():
+            features[(name, group, term)] = value
+    return features
+
+# ----------------- Term Matrix -----------------
+def build_term_matrix(texts: Iterable[str], versions: List[str]) -> Tuple[sparse.csr_matrix, List[Column]]:
+    vocabulary = {}
+    indptr = [0]
+    indices = []
+    data = []
+    for text in texts:
+        for column, value in document_features(text, versions).items():
+            indices.append(vocabulary.setdefault(column, len(vocabulary)))
+            data.append(value)
+        indptr.append(len(indices))
+
+    matrix = sparse.csr_matrix(
+        (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(indptr) - 1, len(vocabulary))
+    )
+    return matrix, list(vocabulary)
+
+def projection(columns: List[Column], version: str, aggregates: Dict[str, Dict]) -> sparse.csc_matrix:
+    # One output column per aggregate: 1 (or the term weight) for every term
+    # column of this version that belongs to one of the aggregate's groups.
+    rows, cols, vals = [], [], []
+    for j, spec in enumerate(aggregates.values()):
+        weights = spec.get("weights")
+        for i, (col_version, group, term) in enumerate(columns):
+            if col_version != version or group not in spec["groups"]:
+                continue
+            coefficient = weights.get(term, 0) if weights is not None else 1
+            if coefficient:
+                rows.append(i)
+                cols.append(j)
+                vals.append(coefficient)
+    return sparse.csc_matrix((np.asarray(vals, dtype=np.float64), (rows, cols)), shape=(len(columns), len(aggregates)))
+
+def aggregate(matrix: sparse.csr_matrix, columns: List[Column], version: str, aggregates: Dict[str, Dict]) -> Dict[str, np.ndarray]:
+    values = (matrix @ projection(columns, version, aggregates)).toarray()
+    return {name: values[:, j] for j, name in enumerate(aggregates)}
+
+# ----------------- Vectorized Rules -----------------
+def tiers(count: np.ndarray, top: float, middle: float) -> np.ndarray:
+    return np.where(count >= top, 3, np.where(count >= middle, 2, 1)).astype(np.int8)
+
+def first_present(high: np.ndarray, moderate: np.ndarray) -> np.ndarray:
+    return np.where(high > 0, 3, np.where(moderate > 0, 2, 1)).astype(np.int8)
+
+def round_scores(values: np.ndarray, rounding: str) -> np.ndarray:
+    if rounding == "half_up":
+        return np.floor(values + 0.5).astype(np.int8)
+    return np.round(values).astype(np.int8)
+
+def overall(criteria: Dict[str, np.ndarray], rounding: str = "half_even") -> np.ndarray:
+    return round_scores(np.mean(np.stack(np.broadcast_arrays(*criteria.values())), axis=0), rounding)
+
+# Each engine is split into the aggregates it needs (linear in the term
+# weights) and the tier rules applied to them. Thresholds may be NumPy arrays
+# that broadcast against the aggregates, which Sensitivity_sweep relies on.
+def basic_aggregates(rules: Dict) -> Dict[str, Dict]:
+    return {group: {"groups": [group]} for group in BASIC_GROUPS}
+
+def basic_scores(a: Dict[str, np.ndarray], rules: Dict) -> Dict[str, np.ndarray]:
+    scores = {
+        "vegetation_layers": first_present(a["layers_high"], a["layers_moderate"]),
+        "species_variety": first_present(a["variety_high"], a["variety_moderate"]),
+        "vegetation_density": first_present(a["density_high"], a["density_moderate"]),
+        "biodiversity_hotspots": tiers(a["hotspots"], 2, 1)
+    }
+    scores["overall"] = overall(scores)
+    return scores
+
+def biodiversity_aggregates(rules: Dict) -> Dict[str, Dict]:
+    return {group: {"groups": [group]} for group, _, _ in BIODIVERSITY_GROUPS}
+
+def biodiversity_scores(a: Dict[str, np.ndarray], rules: Dict) -> Dict[str, np.ndarray]:
+    scores = {
+        "vegetation_layers": tiers(a["vegetation"], *rules["vegetation_tiers"]),
+        "species_variety": first_present(a["variety_high"], a["variety_moderate"]),
+        "vegetation_density": first_present(a["density_high"], a["density_moderate"]),
+        "biodiversity_hotspots": tiers(a["hotspots"], *rules["hotspot_tiers"])
+    }
+    scores["overall"] = overall(scores, rules["rounding"])
+    return scores
+
+def vegetation_retention(raw: np.ndarray, rules: Dict) -> np.ndarray:
+    if rules["diversity_threshold"] is not None:
+        return np.clip(np.round(raw / rules["diversity_threshold"] * 3), 1, 3).astype(np.int8)
+    return tiers(raw, *rules["vegetation_tiers"])
+
+def stormwater_aggregates(rules: Dict) -> Dict[str, Dict]:
+    return {
+        "permeable": {"groups": ["surface:permeable"]},
+        "semi_permeable": {"groups": ["surface:semi-permeable"]},
+        "impermeable": {"groups": ["surface:impermeable"]},
+        "vegetation": {"groups": ["vegetation"], "weights": rules["vegetation_weights"]},
+        "density_high": {"groups": ["density_high"]},
+        "density_moderate": {"groups": ["density_moderate"]}
+    }
+
+def stormwater_scores(a: Dict[str, np.ndarray], rules: Dict) -> Dict[str, np.ndarray]:
+    comparison = a["semi_permeable"] + a["impermeable"]
+    scores = {
+        "permeable_surface": np.where(a["permeable"] > comparison, 3, np.where(a["permeable"] == comparison, 2, 1)).astype(np.int8),
+        "vegetation_retention": vegetation_retention(a["vegetation"], rules)
+    }
+    if rules["evaluate_density"]:
+        scores["vegetation_density"] = first_present(a["density_high"], a["density_moderate"])
+    scores["overall"] = overall(scores)
+    return scores
+
+def maintenance_aggregates(rules: Dict) -> Dict[str, Dict]:
+    return {"total_weight": {"groups": ["elements"], "weights": rules["weights"]}}
+
+def maintenance_scores(a: Dict[str, np.ndarray], rules: Dict) -> Dict[str, np.ndarray]:
+    high, moderate = rules["effort_thresholds"]
+    total = a["total_weight"]
+    return {"overall": np.where(total >= high, 1, np.where(total >= moderate, 2, 3)).astype(np.int8)}
+
+MATRIX_RULES = {
+    "biodiversity_basic": (basic_aggregates, basic_scores),
+    "biodiversity": (biodiversity_aggregates, biodiversity_scores),
+    "stormwater": (stormwater_aggregates, stormwater_scores),
+    "maintenance": (maintenance_aggregates, maintenance_scores)
+}
+
+def score_version(matrix: sparse.csr_matrix, columns: List[Column], name: str, rules: Dict) -> Dict[str, np.ndarray]:
+    aggregates, scores = MATRIX_RULES[rules["engine"]]
+    return scores(aggregate(matrix, columns, name, aggregates(rules)), rules)
+
+def score_term_matrix(matrix: sparse.csr_matrix, columns: List[Column], versions: List[str]) -> Dict[str, Dict[str, np.ndarray]]:
+    matrix = sparse.csr_matrix(matrix)
+    return {name: score_version(matrix, columns, name, RULE_VERSIONS[name]) for name in versions}
+
+# ----------------- CLI -----------------
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Score a corpus with a sparse document × term matrix.")
+    parser.add_argument("corpus", help="Text file with one description per line, or JSONL with 'id' and 'description'.")
+    parser.add_argument("--versions", nargs="+", choices=list(RULE_VERSIONS), default=ENGLISH_VERSIONS)
+    parser.add_argument("--output", help="CSV file for per-document scores (doc_id, version, criterion, score).")
+    args = parser.parse_args(argv)
+
+    doc_ids = []
+    texts = []
+    for doc_id, text in iter_corpus(args.corpus):
+        doc_ids.append(doc_id)
+        texts.append(text)
+
+    start = time.perf_counter()
+    matrix, columns = build_term_matrix(texts, args.versions)
+    matched = time.perf_counter()
+    scores = score_term_matrix(matrix, columns, args.versions)
+    scored = time.perf_counter()
+
+    print(f"Matched {matrix.shape[0]} documents into {matrix.shape[1]} terms ({matrix.nnz} entries) in {matched - start:.2f}s")
+    print(f"Scored {len(args.versions)} rule versions in {scored - matched:.3f}s")
+
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["doc_id", "version", "criterion", "score"])
+            for i, doc_id in enumerate(doc_ids):
+                for version, criteria in scores.items():
+                    for criterion, values in criteria.items():
+                        writer.writerow([doc_id, version, criterion, int(values[i])])
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,13 @@
 import streamlit as st
+from Background_assessment import start_assessment, cancel_assessment, assessment_result
+from Assessment_engine import MAX_INPUT_CHARS, get_lemmatizer, get_stop_words
 from typing import Dict, Tuple
-import nltk
-from nltk.stem import WordNetLemmatizer
 import re
 import string
 
-# Download resources
-nltk.download("wordnet")
-nltk.download('stopwords')
-
-lemmatizer = WordNetLemmatizer()
-stop_words = set(nltk.corpus.stopwords.words('english'))
+# Shared resources, fully loaded before any assessment thread uses them
+lemmatizer = get_lemmatizer()
+stop_words = get_stop_words()
 
 # ----------------- Synonym Map -----------------
 synonym_map = {
@@ -237,15 +234,19 @@ st.title("🌺 Biodiversity Performance Assessment Tool")
 
 st.markdown("Describe a landscape scenario and evaluate its biodiversity performance across diversity of vegetation layers, species variety, density of vegetation, and presence of biodiversity microhabitat spots.")
 
-description = st.text_area("📝 Paste or write your landscape description below:", height=250)
+description = st.text_area("📝 Paste or write your landscape description below:", height=250, max_chars=MAX_INPUT_CHARS)
 
 if st.button("🌺 Assess Biodiversity"):
     if description.strip():
-        results = assess_biodiversity(description)
-        st.subheader("💡 Biodiversity Assessment Results")
-        for criterion, data in results["criteria_scores"].items():
-            st.markdown(f"**{criterion.replace('_', ' ').title()}**")
-            st.write(f"Score: {data['score']} — {data['comment']}")
-        st.success(f"🌺 **Overall Score: {results['overall_score']} — {results['overall_comment']}**")
+        start_assessment("biodiversity_job", assess_biodiversity, description)
     else:
+        cancel_assessment("biodiversity_job")
         st.warning("Please enter a description to analyze.")
+
+results = assessment_result("biodiversity_job", description, "🌺 Assessing biodiversity...")
+if results:
+    st.subheader("💡 Biodiversity Assessment Results")
+    for criterion, data in results["criteria_scores"].items():
+        st.markdown(f"**{criterion.replace('_', ' ').title()}**")
+        st.write(f"Score: {data['score']} — {data['comment']}")
+    st.success(f"🌺 **Overall Score: {results['overall_score']} — {results['overall_comment']}**")
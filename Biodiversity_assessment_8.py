@@ -1,16 +1,13 @@
 import streamlit as st
+from Background_assessment import start_assessment, cancel_assessment, assessment_result
+from Assessment_engine import MAX_INPUT_CHARS, BIODIVERSITY_ATTRIBUTES, attribute_facts, render_attributes, get_lemmatizer, get_stop_words
 from typing import Dict, Tuple
-import nltk
-from nltk.stem import WordNetLemmatizer
 import re
 import string
 
-# Download resources
-nltk.download("wordnet")
-nltk.download('stopwords')
-
-lemmatizer = WordNetLemmatizer()
-stop_words = set(nltk.corpus.stopwords.words('english'))
+# Shared resources, fully loaded before any assessment thread uses them
+lemmatizer = get_lemmatizer()
+stop_words = get_stop_words()
 
 # ----------------- Synonym Map -----------------
 synonym_map = {
@@ -27,29 +24,7 @@ synonym_map = {
     "birdhouses": "birdhouse", "nesting box": "birdhouse", "bird box": "birdhouse", "dead hedges": "dead hedge"
 }
 
-# ----------------- Phrase Normalizations -----------------
-phrase_normalizations = {
-    "the species variety is moderate": "moderate species variety",
-    "species variety is moderate": "moderate species variety",
-    "species variety appears moderate": "moderate species variety",
-    "species variety across the space is moderate": "moderate species variety",
-    "species variety across the area is moderate": "moderate species variety",
-    "the species variety is diverse": "diverse species variety",
-    "species variety is diverse": "diverse species variety",
-    "species variety appears diverse": "diverse species variety",
-    "vegetation density is dense": "dense vegetation",
-    "vegetation is dense": "dense vegetation",
-    "the vegetation is dense": "dense vegetation",
-    "vegetation density is moderate": "moderate vegetation",
-    "vegetation appears moderate": "moderate vegetation"
-}
-
 # ----------------- Text Normalization -----------------
-def normalize_phrases(text: str, phrase_map: Dict[str, str]) -> str:
-    for phrase, replacement in phrase_map.items():
-        text = re.sub(re.escape(phrase), replacement, text.lower())
-    return text
-
 def normalize_synonyms(text: str, synonym_map: Dict[str, str]) -> str:
     text = text.lower()
     for synonym, standard in synonym_map.items():
@@ -112,7 +87,17 @@ def is_negated(text: str, keyword: str) -> bool:
 
 # ----------------- Evaluation Logic -----------------
 def evaluate_criteria(description: str) -> Dict[str, Dict[str, str | int]]:
-    description = normalize_phrases(description, phrase_normalizations)
+    description = description.lower()
+    facts = attribute_facts(description, BIODIVERSITY_ATTRIBUTES)
+    # Attributes stated outright count as their canonical phrase (lemmatizing
+    # would turn "species" into "specie"), negated only by their own "not",
+    # and are not second-guessed by proximity matches
+    stated = {subject for subject, _, _, _, _ in facts}
+    statements = {}
+    for subject, value, negated, _, _ in facts:
+        phrase = BIODIVERSITY_ATTRIBUTES["statements"][subject][value]
+        statements[phrase] = statements.get(phrase, True) and negated
+    description = render_attributes(description, facts, BIODIVERSITY_ATTRIBUTES)
     normalized_description = normalize_synonyms(description, synonym_map)
     clean_description = lemmatize_text(normalized_description)
     scores = {}
@@ -121,7 +106,9 @@ def evaluate_criteria(description: str) -> Dict[str, Dict[str, str | int]]:
         matched = []
         negated = []
         for kw in keywords:
-            if re.search(r"\b" + re.escape(kw) + r"\b", clean_description):
+            if kw in statements:
+                (negated if statements[kw] else matched).append(kw)
+            elif re.search(r"\b" + re.escape(kw) + r"\b", clean_description):
                 if is_negated(description, kw):
                     negated.append(kw)
                 else:
@@ -147,13 +134,13 @@ def evaluate_criteria(description: str) -> Dict[str, Dict[str, str | int]]:
     high_matched, high_negated = keyword_matches(high_variety)
     mod_matched, mod_negated = keyword_matches(moderate_variety)
 
-    if not high_matched and (
+    if not high_matched and "species variety" not in stated and (
         keywords_nearby(clean_description, "species", "diverse") or
         keywords_nearby(clean_description, "species variety", "diverse")
     ):
         high_matched.append("species + diverse (proximity match)")
 
-    if not mod_matched and (
+    if not mod_matched and "species variety" not in stated and (
         keywords_nearby(clean_description, "species", "moderate") or
         keywords_nearby(clean_description, "species variety", "moderate")
     ):
@@ -177,13 +164,13 @@ def evaluate_criteria(description: str) -> Dict[str, Dict[str, str | int]]:
     high_matched, high_negated = keyword_matches(high_density)
     mod_matched, mod_negated = keyword_matches(moderate_density)
 
-    if not high_matched and (
+    if not high_matched and "vegetation" not in stated and (
         keywords_nearby(clean_description, "vegetation", "dense") or
         keywords_nearby(clean_description, "vegetation density", "dense")
     ):
         high_matched.append("vegetation + dense (proximity match)")
 
-    if not mod_matched and (
+    if not mod_matched and "vegetation" not in stated and (
         keywords_nearby(clean_description, "vegetation", "moderate") or
         keywords_nearby(clean_description, "vegetation density", "moderate")
     ):
@@ -239,15 +226,19 @@ st.title("🌺 Biodiversity Performance Assessment Tool")
 
 st.markdown("Describe a landscape scenario and evaluate its biodiversity performance across diversity of vegetation layers, species variety, density of vegetation, and presence of biodiversity microhabitat spots.")
 
-description = st.text_area("📝 Paste or write your landscape description below:", height=250)
+description = st.text_area("📝 Paste or write your landscape description below:", height=250, max_chars=MAX_INPUT_CHARS)
 
 if st.button("🌺 Assess Biodiversity"):
     if description.strip():
-        results = assess_biodiversity(description)
-        st.subheader("💡 Biodiversity Assessment Results")
-        for criterion, data in results["criteria_scores"].items():
-            st.markdown(f"**{criterion.replace('_', ' ').title()}**")
-            st.write(f"Score: {data['score']} — {data['comment']}")
-        st.success(f"🌺 **Overall Score: {results['overall_score']} — {results['overall_comment']}**")
+        start_assessment("biodiversity_job", assess_biodiversity, description)
     else:
+        cancel_assessment("biodiversity_job")
         st.warning("Please enter a description to analyze.")
+
+results = assessment_result("biodiversity_job", description, "🌺 Assessing biodiversity...")
+if results:
+    st.subheader("💡 Biodiversity Assessment Results")
+    for criterion, data in results["criteria_scores"].items():
+        st.markdown(f"**{criterion.replace('_', ' ').title()}**")
+        st.write(f"Score: {data['score']} — {data['comment']}")
+    st.success(f"🌺 **Overall Score: {results['overall_score']} — {results['overall_comment']}**")
@@ -0,0 +1,127 @@
+from typing import Dict, Tuple, List, Iterable
+import argparse
+import csv
+import time
+
+import numpy as np
+
+from Assessment_engine import RULE_VERSIONS, iter_corpus
+from Sensitivity_sweep import load_term_matrix, compress_rows, score_grid, parse_param
+
+# Calibration of the text scorers against expert image ratings.
+# Joins the reflection CSVs exported by Experts_image_evaluator.py
+# (Image, Criterion, Rating, Note) with the text-scorer features of the
+# matching image descriptions, then searches a grid of weights and thresholds
+# for the setting with the highest quadratic weighted kappa. Features are
+# matched once (Sensitivity_sweep cache) and every grid point is scored as
+# arrays over the unique match rows, so thousands of settings take seconds.
+#
+#   python Expert_calibration.py descriptions.jsonl reflections/*.csv \
+#       --criterion "Kunnossapidon tarve" \
+#       --param effort_thresholds.0=10:30 --param effort_thresholds.1=4:20
+#
+# descriptions.jsonl holds one {"id": ..., "description": "..."} per image, keyed
+# by the Image ID column of the reflection CSVs (the photo's content hash,
+# see Image_identity.py); exports without that column join on the "Kuva 1" label.
+
+CRITERION_VERSIONS = {
+    "Monimuotoisuuden edistäminen": "biodiversity_8",
+    "Kunnossapidon tarve": "maintenance_3",
+    "Hulevesien suodatus ja hallinta": "stormwater_4"
+}
+
+# 🔴 is the weak end for every impact criterion; for "Kunnossapidon tarve" it is
+# high maintenance need, which the maintenance scorer also rates 1.
+RATING_SCORES = {"🔴": 1, "🟡": 2, "🟢": 3}
+
+# ----------------- Expert Ratings -----------------
+def read_ratings(paths: Iterable[str], criterion: str) -> List[Tuple[str, int]]:
+    ratings = []
+    for path in paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                rating = row.get("Rating", "")
+                if row.get("Criterion") == criterion and rating[:1] in RATING_SCORES:
+                    ratings.append((row.get("Image ID") or row["Image"], RATING_SCORES[rating[:1]]))
+    return ratings
+
+def rating_counts(ratings: List[Tuple[str, int]], doc_ids: List[str], inverse: np.ndarray, n_unique: int) -> np.ndarray:
+    # counts[u, r - 1]: expert ratings r given to images whose description collapses to unique row u
+    row_of = {doc_id: inverse[i] for i, doc_id in enumerate(doc_ids)}
+    counts = np.zeros((n_unique, 3))
+    for image, rating in ratings:
+        if image in row_of:
+            counts[row_of[image], rating - 1] += 1
+    return counts
+
+# ----------------- Agreement -----------------
+def quadratic_kappa(confusion: np.ndarray) -> np.ndarray:
+    # confusion: (settings, expert, predicted); returns one kappa per setting
+    k = confusion.shape[-1]
+    weights = (np.subtract.outer(np.arange(k), np.arange(k)) ** 2) / (k - 1) ** 2
+    total = confusion.sum(axis=(1, 2), keepdims=True)
+    expected = confusion.sum(axis=2, keepdims=True) * confusion.sum(axis=1, keepdims=True) / np.maximum(total, 1)
+    observed_disagreement = (weights * confusion).sum(axis=(1, 2))
+    expected_disagreement = (weights * expected).sum(axis=(1, 2))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(expected_disagreement > 0, 1 - observed_disagreement / expected_disagreement, 1.0)
+
+def calibrate(matrix, columns, doc_ids: List[str], ratings: List[Tuple[str, int]], version: str,
+              params: List[Tuple[str, List[float]]], criterion: str = "overall") -> List[Tuple[Dict[str, float], float, float]]:
+    unique, _, inverse, version_columns = compress_rows(matrix, columns, version)
+    counts = rating_counts(ratings, doc_ids, inverse, unique.shape[0])
+    results = []
+    for settings, scores in score_grid(unique, version_columns, version, params):
+        predicted = scores[criterion]
+        # confusion[g, r, s] = sum_u counts[u, r] * [predicted[u, g] == s]
+        confusion = np.stack([counts.T @ (predicted == s) for s in (1, 2, 3)], axis=2).transpose(1, 0, 2)
+        kappas = quadratic_kappa(confusion)
+        total = confusion.sum(axis=(1, 2))
+        exact = np.trace(confusion, axis1=1, axis2=2) / np.maximum(total, 1)
+        results.extend(zip(settings, kappas.tolist(), exact.tolist()))
+    return results
+
+# ----------------- CLI -----------------
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Tune text-scorer weights and thresholds to agree with expert image ratings.")
+    parser.add_argument("descriptions", help="JSONL with one {'id': image label, 'description': text} per image.")
+    parser.add_argument("reflections", nargs="+", help="Reflection CSVs exported by the image evaluators.")
+    parser.add_argument("--criterion", choices=list(CRITERION_VERSIONS), required=True)
+    parser.add_argument("--version", choices=list(RULE_VERSIONS), help="Rule version to tune (default depends on the criterion).")
+    parser.add_argument("--param", action="append", default=[], type=parse_param,
+                        help="path=values, e.g. effort_thresholds.0=10:30, weights.bench=1,2,3")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", help="CSV file with the kappa of every setting.")
+    args = parser.parse_args(argv)
+
+    version = args.version or CRITERION_VERSIONS[args.criterion]
+    ratings = read_ratings(args.reflections, args.criterion)
+
+    start = time.perf_counter()
+    doc_ids = [doc_id for doc_id, _ in iter_corpus(args.descriptions)]
+    matrix, columns = load_term_matrix(args.descriptions, [version])
+    known = set(doc_ids)
+    joined = sum(1 for image, _ in ratings if image in known)
+    print(f"{len(ratings)} expert ratings, {joined} joined to {len(doc_ids)} descriptions")
+
+    baseline = calibrate(matrix, columns, doc_ids, ratings, version, [])[0]
+    results = calibrate(matrix, columns, doc_ids, ratings, version, args.param)
+    elapsed = time.perf_counter() - start
+    results.sort(key=lambda r: (-r[1], -r[2]))
+
+    print(f"Current rules ({version}): kappa {baseline[1]:.3f}, exact agreement {baseline[2]:.1%}")
+    print(f"Evaluated {len(results)} settings in {elapsed:.2f}s")
+    for setting, kappa, exact in results[:args.top]:
+        values = ", ".join(f"{path}={value:g}" for path, value in setting.items())
+        print(f"  kappa {kappa:.3f}  exact {exact:.1%}  {values}")
+
+    if args.output:
+        paths = [path for path, _ in args.param]
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(paths + ["kappa", "exact_agreement"])
+            for setting, kappa, exact in results:
+                writer.writerow([setting[p] for p in paths] + [f"{kappa:.4f}", f"{exact:.4f}"])
+
+if __name__ == "__main__":
+    main()
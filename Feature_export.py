@@ -0,0 +1,297 @@
+from typing import Dict, Tuple, List, Iterable, Iterator
+import argparse
+import json
+import os
+
+import numpy as np
+from scipy import sparse
+
+from Assessment_engine import (
+    RULE_VERSIONS, DocumentContext, context_for, biodiversity_texts, keyword_found, keyword_negated, proximity_groups,
+    reverse_synonyms, extract_quantity_phrases, word_pattern, iter_corpus
+)
+from Batch_scoring import FEATURE_EXTRACTORS, BIODIVERSITY_GROUPS
+
+# Per-document feature export for analytics.
+# Writes a CSR matrix as raw memory-mappable arrays plus a vocabulary sidecar:
+#
+#   out_dir/vocabulary.json    columns, row/nnz counts, array dtypes
+#   out_dir/indptr.bin         int64, rows + 1
+#   out_dir/indices.bin        int32, nnz
+#   out_dir/data.bin           float32, nnz
+#   out_dir/doc_ids.bin        utf-8 bytes of all document ids
+#   out_dir/doc_id_offsets.bin int64, rows + 1
+#
+# Columns are (kind, version, group, term) with kind one of
+#   match      the value the scorer uses (what Batch_scoring puts in its matrix)
+#   count      occurrences of the canonical term in the normalized text (a stated
+#              attribute counts even where lemmatizing hides its phrase)
+#   negated    1 when the term is present but negated
+#   quantity   summed number phrases in front of a maintenance element
+#   proximity  1 when a proximity pair is within range
+#
+# vocabulary.json is written last, so a directory without it is an unfinished export.
+#
+#   python Feature_export.py corpus.jsonl features/
+#   store = FeatureStore("features/"); store.rows(1_000_000, 1_000_100)
+
+DEFAULT_VERSIONS = ["biodiversity_8", "stormwater_4", "maintenance_3"]
+
+ARRAY_DTYPES = {
+    "indptr": "int64",
+    "indices": "int32",
+    "data": "float32",
+    "doc_ids": "uint8",
+    "doc_id_offsets": "int64"
+}
+
+FeatureColumn = Tuple[str, str, str, str]
+
+# Entries of indices read at a time by column scans
+SCAN_BLOCK = 1 << 22
+
+# ----------------- Analytic Features -----------------
+def _term_features(ctx: DocumentContext, clean: str, negation_text: str, group: str, term: str,
+                   negated_terms: Iterable[str], such_as: bool) -> Dict[Tuple[str, str, str], float]:
+    features = {}
+    if term not in clean:
+        return features
+    count = len(word_pattern(term).findall(clean))
+    if count:
+        features[("count", group, term)] = float(count)
+        if any(ctx.negated(negation_text, t, such_as) for t in negated_terms):
+            features[("negated", group, term)] = 1.0
+    return features
+
+def _statement_counts(ctx: DocumentContext, rules: Dict) -> Dict[str, int]:
+    # Canonical phrase -> number of attribute statements rendered as it
+    counts = {}
+    for subject, value, _, _, _ in ctx.feature("attributes", rules):
+        phrase = rules["attribute_statements"]["statements"][subject][value]
+        counts[phrase] = counts.get(phrase, 0) + 1
+    return counts
+
+def biodiversity_analytics(ctx: DocumentContext, rules: Dict) -> Dict[Tuple[str, str, str], float]:
+    # Terms are found and negated as the scorer finds them (keyword_found, keyword_negated)
+    description, clean = biodiversity_texts(ctx, rules)
+    stated = _statement_counts(ctx, rules)
+    features = {}
+    for group, keywords_key, proximity_key in BIODIVERSITY_GROUPS:
+        for kw in rules[keywords_key]:
+            if not keyword_found(ctx, rules, clean, kw):
+                continue
+            count = len(word_pattern(kw).findall(clean)) if kw in clean else 0
+            features[("count", group, kw)] = float(max(count, stated.get(kw, 0)))
+            if keyword_negated(ctx, rules, description, kw):
+                features[("negated", group, kw)] = 1.0
+        for _, pairs in proximity_groups(ctx, rules, proximity_key) if proximity_key else []:
+            for p1, p2 in pairs:
+                if ctx.nearby(rules["proximity"], clean, p1, p2, rules["proximity_distance"]):
+                    features[("proximity", group, f"{p1} ~ {p2}")] = 1.0
+    return features
+
+def stormwater_analytics(ctx: DocumentContext, rules: Dict) -> Dict[Tuple[str, str, str], float]:
+    description = ctx.normalized(ctx.lower, rules["synonym_map"])
+    features = {}
+    for surface, category in rules["surface_types"].items():
+        if surface in description:
+            count = len(word_pattern(surface).findall(description))
+            if count:
+                features[("count", f"surface:{category}", surface)] = float(count)
+    for veg in rules["vegetation_weights"]:
+        if veg in description:
+            count = len(word_pattern(veg).findall(description))
+            if count:
+                features[("count", "vegetation", veg)] = float(count)
+    if rules["evaluate_density"]:
+        for phrase in ("vegetation", "vegetation density"):
+            for word in ("dense", "moderate"):
+                if ctx.nearby("basic_stopword", description, phrase, word, 10):
+                    features[("proximity", "density", f"{phrase} ~ {word}")] = 1.0
+    return features
+
+def maintenance_analytics(ctx: DocumentContext, rules: Dict) -> Dict[Tuple[str, str, str], float]:
+    raw_text = ctx.lower
+    clean_text = ctx.lemmatized(ctx.normalized(raw_text, rules["synonym_map"]))
+    reverse_map = reverse_synonyms(rules["synonym_map"])
+    features = {}
+    for keyword in rules["weights"]:
+        features.update(_term_features(ctx, clean_text, raw_text, "elements", keyword, reverse_map.get(keyword, []), True))
+        quantity = sum(ctx.cached(("quantity", keyword), lambda: extract_quantity_phrases(raw_text, keyword)))
+        if quantity:
+            features[("quantity", "elements", keyword)] = float(quantity)
+        for w1, w2 in rules["proximity_keywords"].get(keyword, []):
+            if ctx.nearby("substring", clean_text, w1, w2, rules["proximity_distance"]):
+                features[("proximity", keyword, f"{w1} ~ {w2}")] = 1.0
+    return features
+
+ANALYTIC_EXTRACTORS = {
+    "biodiversity_basic": lambda ctx, rules: {},
+    "biodiversity": biodiversity_analytics,
+    "stormwater": stormwater_analytics,
+    "maintenance": maintenance_analytics
+}
+
+def export_features(text: str, versions: Iterable[str]) -> Dict[FeatureColumn, float]:
+    contexts = {}
+    features = {}
+    for name in versions:
+        rules = RULE_VERSIONS[name]
+        ctx = context_for(contexts, text, rules)
+        for (group, term), value in FEATURE_EXTRACTORS[rules["engine"]](ctx, rules).items():
+            features[("match", name, group, term)] = value
+        for (kind, group, term), value in ANALYTIC_EXTRACTORS[rules["engine"]](ctx, rules).items():
+            features[(kind, name, group, term)] = value
+    return features
+
+# ----------------- Writer -----------------
+def write_feature_store(documents: Iterable[Tuple[str, str]], out_dir: str, versions: List[str],
+                        chunk_size: int = 10000) -> int:
+    os.makedirs(out_dir, exist_ok=True)
+    sidecar = os.path.join(out_dir, "vocabulary.json")
+    if os.path.exists(sidecar):
+        os.remove(sidecar)
+
+    files = {name: open(os.path.join(out_dir, f"{name}.bin"), "wb") for name in ARRAY_DTYPES}
+    vocabulary = {}
+    rows = 0
+    nnz = 0
+    id_bytes = 0
+    try:
+        files["indptr"].write(np.zeros(1, dtype=np.int64).tobytes())
+        files["doc_id_offsets"].write(np.zeros(1, dtype=np.int64).tobytes())
+        for chunk in _chunks(documents, chunk_size):
+            indptr, indices, data, offsets, ids = [], [], [], [], []
+            for doc_id, text in chunk:
+                row = sorted((vocabulary.setdefault(c, len(vocabulary)), v) for c, v in export_features(text, versions).items())
+                indices.extend(column for column, _ in row)
+                data.extend(value for _, value in row)
+                indptr.append(nnz + len(indices))
+                encoded = doc_id.encode("utf-8")
+                ids.append(encoded)
+                id_bytes += len(encoded)
+                offsets.append(id_bytes)
+            nnz += len(indices)
+            rows += len(chunk)
+            files["indptr"].write(np.asarray(indptr, dtype=np.int64).tobytes())
+            files["indices"].write(np.asarray(indices, dtype=np.int32).tobytes())
+            files["data"].write(np.asarray(data, dtype=np.float32).tobytes())
+            files["doc_ids"].write(b"".join(ids))
+            files["doc_id_offsets"].write(np.asarray(offsets, dtype=np.int64).tobytes())
+    finally:
+        for f in files.values():
+            f.close()
+
+    with open(sidecar + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({
+            "rows": rows,
+            "nnz": nnz,
+            "versions": versions,
+            "arrays": ARRAY_DTYPES,
+            "columns": [list(column) for column in vocabulary]
+        }, f, ensure_ascii=False)
+    os.replace(sidecar + ".tmp", sidecar)
+    return rows
+
+def _chunks(documents: Iterable[Tuple[str, str]], size: int) -> Iterator[List[Tuple[str, str]]]:
+    chunk = []
+    for document in documents:
+        chunk.append(document)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# ----------------- Reader -----------------
+class FeatureStore:
+    def __init__(self, path: str):
+        with open(os.path.join(path, "vocabulary.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.path = path
+        self.versions = meta["versions"]
+        self.columns = [tuple(column) for column in meta["columns"]]
+        self.column_index = {column: i for i, column in enumerate(self.columns)}
+        self.n_rows = meta["rows"]
+        self.nnz = meta["nnz"]
+        self.arrays = {
+            name: self._map(name, dtype) for name, dtype in meta["arrays"].items()
+        }
+
+    def _map(self, name: str, dtype: str) -> np.ndarray:
+        filename = os.path.join(self.path, f"{name}.bin")
+        if os.path.getsize(filename) == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(filename, dtype=dtype, mode="r")
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.n_rows, len(self.columns)
+
+    def rows(self, start: int, stop: int) -> sparse.csr_matrix:
+        # Rows start..stop-1 with slice semantics (stop past the end is clamped);
+        # only the requested slice of indices/data is read from disk
+        start, stop, _ = slice(start, stop).indices(self.n_rows)
+        stop = max(start, stop)
+        indptr = self.arrays["indptr"][start:stop + 1]
+        lo, hi = int(indptr[0]), int(indptr[-1])
+        return sparse.csr_matrix(
+            (self.arrays["data"][lo:hi], self.arrays["indices"][lo:hi], indptr - lo),
+            shape=(stop - start, len(self.columns))
+        )
+
+    def doc_ids(self, start: int, stop: int) -> List[str]:
+        start, stop, _ = slice(start, stop).indices(self.n_rows)
+        stop = max(start, stop)
+        offsets = self.arrays["doc_id_offsets"][start:stop + 1]
+        raw = bytes(self.arrays["doc_ids"][offsets[0]:offsets[-1]])
+        return [raw[a - offsets[0]:b - offsets[0]].decode("utf-8") for a, b in zip(offsets[:-1], offsets[1:])]
+
+    def column(self, kind: str, version: str, group: str, term: str) -> np.ndarray:
+        return self.dense_columns([(kind, version, group, term)])[:, 0]
+
+    def dense_columns(self, keys: List[FeatureColumn]) -> np.ndarray:
+        # Dense rows × len(keys) array without building the matrix. The CSR
+        # layout has no column index, so every call reads all of indices (in
+        # blocks): ask for every column you need in one call.
+        lookup = np.full(len(self.columns), -1, dtype=np.int64)
+        lookup[[self.column_index[key] for key in keys]] = np.arange(len(keys))
+        values = np.zeros((self.n_rows, len(keys)), dtype=np.float32)
+        indices = self.arrays["indices"]
+        for block in range(0, self.nnz, SCAN_BLOCK):
+            targets = lookup[indices[block:block + SCAN_BLOCK]]
+            positions = np.flatnonzero(targets >= 0)
+            rows = np.searchsorted(self.arrays["indptr"], positions + block, side="right") - 1
+            values[rows, targets[positions]] = self.arrays["data"][positions + block]
+        return values
+
+    def select(self, kind: str = None, version: str = None, group: str = None) -> List[int]:
+        return [
+            i for i, (k, v, g, _) in enumerate(self.columns)
+            if (kind is None or k == kind) and (version is None or v == version) and (group is None or g == group)
+        ]
+
+    def term_matrix(self, start: int = 0, stop: int = None) -> Tuple[sparse.csr_matrix, List[Tuple[str, str, str]]]:
+        # The "match" columns in the (version, group, term) layout used by Batch_scoring
+        keep = self.select(kind="match")
+        matrix = self.rows(start, self.n_rows if stop is None else stop)[:, keep]
+        return matrix, [self.columns[i][1:] for i in keep]
+
+# ----------------- CLI -----------------
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Export per-document match features as memory-mapped CSR arrays.")
+    parser.add_argument("corpus", help="Text file with one description per line, or JSONL with 'id' and 'description'.")
+    parser.add_argument("out_dir", help="Directory for the arrays and vocabulary.json.")
+    parser.add_argument("--versions", nargs="+", choices=list(RULE_VERSIONS), default=DEFAULT_VERSIONS)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    rows = write_feature_store(iter_corpus(args.corpus), args.out_dir, args.versions, args.chunk_size)
+    store = FeatureStore(args.out_dir)
+    print(f"Exported {rows} documents × {len(store.columns)} columns ({store.nnz} entries) to {args.out_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+from typing import Dict, Optional
+import io
+import threading
+
+import numpy as np
+from PIL import Image
+
+from Image_identity import content_hash
+from Metrics import register_cache
+
+# Image indices shown next to the human ratings.
+# Each photo is decoded at reduced size (JPEG draft mode decodes a 12 MP photo
+# at 1/8 scale), shrunk to ANALYSIS_SIZE on the long side and classified per
+# pixel with NumPy:
+#   vegetation  excess green 2g - r - b on chromatic coordinates (r = R / (R + G + B), ...)
+#   sky         bright blue or bright gray pixels connected to the top edge of their column
+#   impervious  gray (unsaturated) mid-brightness pixels that are not sky
+# The fractions are cached by image hash, so reruns and other sessions reuse them.
+
+ANALYSIS_SIZE = 256
+ANALYSIS_THRESHOLDS = {
+    "excess_green": 0.05,    # vegetation when 2g - r - b is above this
+    "dark": 0.12,            # pixels darker than this (mean of R, G, B) are not classified
+    "gray_saturation": 0.15, # (max - min) / max below this is gray
+    "sky_brightness": 0.55,
+    "impervious_brightness": 0.85
+}
+FEATURE_CACHE_SIZE = 4096
+
+_feature_cache = {}
+_feature_lock = threading.Lock()
+_feature_cache_stats = {"hits": 0, "misses": 0}
+register_cache("image_features", lambda: (_feature_cache_stats["hits"], _feature_cache_stats["misses"]))
+
+def open_reduced(data: bytes) -> Image.Image:
+    image = Image.open(io.BytesIO(data))
+    image.draft("RGB", (2 * ANALYSIS_SIZE, 2 * ANALYSIS_SIZE))
+    return image.convert("RGB")
+
+def pixel_array(image: Image.Image) -> np.ndarray:
+    image = image.copy()
+    image.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE), Image.Resampling.BILINEAR)
+    return np.asarray(image, dtype=np.float32) / 255
+
+def decode_rgb(data: bytes) -> np.ndarray:
+    return pixel_array(open_reduced(data))
+
+def cover_fractions(rgb: np.ndarray) -> Dict[str, float]:
+    red, green, blue = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    total = red + green + blue
+    brightness = total / 3
+    high = rgb.max(axis=2)
+    saturation = (high - rgb.min(axis=2)) / np.maximum(high, 1e-6)
+    lit = brightness >= ANALYSIS_THRESHOLDS["dark"]
+
+    excess_green = (2 * green - red - blue) / np.maximum(total, 1e-6)
+    vegetation = lit & (excess_green > ANALYSIS_THRESHOLDS["excess_green"])
+
+    gray = saturation < ANALYSIS_THRESHOLDS["gray_saturation"]
+    bright = brightness >= ANALYSIS_THRESHOLDS["sky_brightness"]
+    sky_colour = bright & ~vegetation & (((blue > red) & (blue >= green)) | gray)
+    # Only sky-coloured runs that start at the top row count, not blue cars or white walls
+    sky = np.logical_and.accumulate(sky_colour, axis=0)
+
+    impervious = lit & gray & ~sky & (brightness < ANALYSIS_THRESHOLDS["impervious_brightness"])
+
+    pixels = rgb.shape[0] * rgb.shape[1]
+    return {
+        "vegetation": round(float(vegetation.sum()) / pixels, 3),
+        "sky": round(float(sky.sum()) / pixels, 3),
+        "impervious": round(float(impervious.sum()) / pixels, 3)
+    }
+
+def analyze_image(data: bytes, image_hash: Optional[str] = None) -> Dict[str, float]:
+    # image_hash is the image ID or content hash when the caller already has it
+    key = image_hash or content_hash(data)
+    features = _feature_cache.get(key)
+    if features is None:
+        features = cover_fractions(decode_rgb(data))
+        with _feature_lock:
+            _feature_cache_stats["misses"] += 1
+            if len(_feature_cache) >= FEATURE_CACHE_SIZE:
+                _feature_cache.pop(next(iter(_feature_cache)))
+            _feature_cache[key] = features
+    else:
+        with _feature_lock:
+            _feature_cache_stats["hits"] += 1
+    return features
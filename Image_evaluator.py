@@ -2,6 +2,9 @@ import streamlit as st
 import pandas as pd
 import io
 
+from Image_identity import register_uploads
+from Image_analysis import analyze_image
+
 # ---------- CSS: Reduce side padding ----------
 st.markdown("""
     <style>
@@ -67,9 +70,22 @@ criterion_options = {
     ]
 }
 
+# ---------- Image Indices ----------
+# Cover fractions computed from the photo itself, shown next to the ratings
+image_index_labels = {
+    "vegetation": "🌿 Vegetation cover",
+    "sky": "☁️ Sky",
+    "impervious": "🛣️ Impervious surface"
+}
+
+def image_indices(i):
+    return analyze_image(st.session_state.images_uploaded[i], st.session_state.image_ids[i])
+
 # ---------- Session State Setup ----------
 if 'images_uploaded' not in st.session_state:
     st.session_state.images_uploaded = None
+if 'image_ids' not in st.session_state:
+    st.session_state.image_ids = []
 if 'active_image' not in st.session_state:
     st.session_state.active_image = 0
 if 'responses' not in st.session_state:
@@ -89,6 +105,7 @@ if st.session_state.images_uploaded and not st.session_state.show_summary:
     with col2:
         if st.button("🔄", help="Re-upload images"):
             st.session_state.images_uploaded = None
+            st.session_state.image_ids = []
             st.session_state.active_image = 0
             st.session_state.responses = [{} for _ in range(4)]
             st.session_state.favorites = [False, False, False, False]
@@ -103,9 +120,13 @@ if not st.session_state.images_uploaded:
         "Upload 4 Images", type=["png", "jpg", "jpeg"], accept_multiple_files=True
     )
 
-    if uploaded_images and len(uploaded_images) == 4:
-        st.session_state.images_uploaded = uploaded_images
+    image_ids, images = register_uploads(uploaded_images) if uploaded_images else ([], [])
+    if len(image_ids) == 4:
+        st.session_state.image_ids = image_ids
+        st.session_state.images_uploaded = images
         st.rerun()
+    elif uploaded_images and len(image_ids) < len(uploaded_images):
+        st.warning("Some of the images are the same photo. Please upload 4 different images.")
     elif uploaded_images:
         st.warning("Please upload exactly 4 images.")
 
@@ -136,6 +157,8 @@ elif not st.session_state.show_summary:
         st.session_state.responses[index][criterion] = response
 
     st.markdown("**See the impact of this landscape in the long term:**")
+    indices = image_indices(index)
+    st.caption("Image analysis: " + " · ".join(f"{label} {indices[name]:.0%}" for name, label in image_index_labels.items()))
     for criterion in impact_visualization:
         response = st.selectbox(
             label=criterion,
@@ -190,6 +213,7 @@ elif st.session_state.viewing_comparison:
                 rating = st.session_state.responses[i].get(crit, "")
                 data.append({
                     "Image": image_label,
+                    "Image ID": st.session_state.image_ids[i],
                     "Criterion": crit,
                     "Rating": rating,
                     "Note": note
@@ -246,6 +270,12 @@ elif st.session_state.show_summary:
 
             row[i + 1].markdown(tooltip_html, unsafe_allow_html=True)
 
+    for name, label in image_index_labels.items():
+        row = st.columns(5)
+        row[0].markdown(f"**{label}**")
+        for i in range(4):
+            row[i + 1].markdown(f"<div style='text-align: center;'>{image_indices(i)[name]:.0%}</div>", unsafe_allow_html=True)
+
     st.markdown("---")
     if st.button("🔙 Go Back to Evaluation"):
         st.session_state.show_summary = False
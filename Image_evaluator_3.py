@@ -2,6 +2,10 @@ import streamlit as st
 import pandas as pd
 import io
 
+from Image_identity import register_uploads
+from Image_analysis import analyze_image
+from Study_catalog import current_study
+
 # ---------- CSS: Reduce side padding ----------
 st.markdown("""
     <style>
@@ -74,9 +78,24 @@ criterion_options = {
     ]
 }
 
+# ---------- Image Indices ----------
+# Cover fractions computed from the photo itself, shown next to the ratings
+image_index_labels = {
+    "vegetation": "🌿 Kasvillisuus",
+    "sky": "☁️ Taivas",
+    "impervious": "🛣️ Päällystetty pinta"
+}
+
+def image_indices(i):
+    return analyze_image(st.session_state.images_uploaded[i], st.session_state.image_ids[i])
+
 # ---------- Session State Setup ----------
 if 'images_uploaded' not in st.session_state:
     st.session_state.images_uploaded = None
+if 'image_ids' not in st.session_state:
+    st.session_state.image_ids = []
+if 'image_previews' not in st.session_state:
+    st.session_state.image_previews = []
 if 'active_image' not in st.session_state:
     st.session_state.active_image = 0
 if 'responses' not in st.session_state:
@@ -90,12 +109,26 @@ if 'comparison_notes' not in st.session_state:
 if 'viewing_comparison' not in st.session_state:
     st.session_state.viewing_comparison = False
 
+# ---------- Study Mode ----------
+study = current_study()
+if study and not st.session_state.images_uploaded:
+    # Shared, preloaded photos of the study; nothing to upload
+    st.session_state.image_ids = list(study["image_ids"])
+    st.session_state.images_uploaded = list(study["images"])
+    st.session_state.image_previews = list(study["previews"])
+    num_images = len(study["images"])
+    st.session_state.responses = [{} for _ in range(num_images)]
+    st.session_state.favorites = [False for _ in range(num_images)]
+    st.session_state.comparison_notes = ["", ""]
+    st.session_state.active_image = 0
+
 # ---------- Re-upload Button ----------
-if st.session_state.images_uploaded and not st.session_state.show_summary:
+if st.session_state.images_uploaded and not st.session_state.show_summary and not study:
     col1, col2 = st.columns([10, 1])
     with col2:
         if st.button("🔄", help="Re-upload images"):
             st.session_state.images_uploaded = None
+            st.session_state.image_ids = []
             st.session_state.active_image = 0
             st.session_state.responses = []
             st.session_state.favorites = []
@@ -111,8 +144,10 @@ if not st.session_state.images_uploaded:
     )
 
     if uploaded_images and 1 <= len(uploaded_images) <= 4:
-        st.session_state.images_uploaded = uploaded_images
-        num_images = len(uploaded_images)
+        # Photos uploaded twice (or re-encoded copies) are kept once
+        st.session_state.image_ids, st.session_state.images_uploaded = register_uploads(uploaded_images)
+        st.session_state.image_previews = st.session_state.images_uploaded
+        num_images = len(st.session_state.image_ids)
         st.session_state.responses = [{} for _ in range(num_images)]
         st.session_state.favorites = [False for _ in range(num_images)]
         st.session_state.comparison_notes = ["", ""]
@@ -135,7 +170,7 @@ elif not st.session_state.show_summary:
         with col:
             if st.button(f"Kuva {i+1}", key=f"thumb_button_{i}"):
                 st.session_state.active_image = i
-            st.image(uploaded_images[i], use_container_width=True)
+            st.image(st.session_state.image_previews[i], use_container_width=True)
 
     index = st.session_state.active_image
     st.image(uploaded_images[index], use_container_width=True)
@@ -151,6 +186,8 @@ elif not st.session_state.show_summary:
         st.session_state.responses[index][criterion] = response
 
     st.markdown("**Maiseman vaikutus pitkällä aikavälillä:**")
+    indices = image_indices(index)
+    st.caption("Kuva-analyysi: " + " · ".join(f"{label} {indices[name]:.0%}" for name, label in image_index_labels.items()))
     for criterion in impact_visualization:
         response = st.selectbox(
             label=criterion,
@@ -205,6 +242,7 @@ elif st.session_state.viewing_comparison:
                 rating = st.session_state.responses[i].get(crit, "")
                 data.append({
                     "Image": image_label,
+                    "Image ID": st.session_state.image_ids[i],
                     "Criterion": crit,
                     "Rating": rating,
                     "Note": note
@@ -250,7 +288,7 @@ elif st.session_state.show_summary:
     cols[0].markdown("**kriteerit**")
     for i in range(num_images):
         with cols[i + 1]:
-            st.image(images[i], use_container_width=True)
+            st.image(st.session_state.image_previews[i], use_container_width=True)
 
     for criterion in all_criteria:
         row = st.columns(num_images + 1)
@@ -266,6 +304,12 @@ elif st.session_state.show_summary:
             """
             row[i + 1].markdown(tooltip_html, unsafe_allow_html=True)
 
+    for name, label in image_index_labels.items():
+        row = st.columns(num_images + 1)
+        row[0].markdown(f"**{label}**")
+        for i in range(num_images):
+            row[i + 1].markdown(f"<div style='text-align: center;'>{image_indices(i)[name]:.0%}</div>", unsafe_allow_html=True)
+
     st.markdown("---")
 
     # If 1 or 2 favorites have been selected, show the button to continue
@@ -0,0 +1,259 @@
+from typing import Dict, List, Iterator, Optional, Set, Tuple
+import argparse
+import io
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from PIL import Image
+
+from Image_analysis import open_reduced, pixel_array, cover_fractions
+from Image_identity import content_hash, perceptual_hashes
+
+# Batch image features for photo archives.
+# Walks an image directory, decodes and downscales every photo in a process
+# pool and characterizes it the way the evaluators see it: vegetation, sky and
+# impervious fractions (Image_analysis), colour histograms, texture statistics
+# and the perceptual hashes the image index stores (near_duplicate_of). Rows are keyed by the content
+# hash and appended to a Parquet feature store, a directory of part files:
+#
+#   store/part-<run>-<n>.parquet    one file per batch of rows, written atomically
+#   store/_paths-<run>-<n>.parquet  path, size and mtime of files whose content
+#                                   was already stored (moved, renamed or copied
+#                                   photos); no features, and the leading "_"
+#                                   keeps them out of read_feature_store
+#
+# Re-runs are incremental. A file whose relative path, size and mtime match a
+# stored row or path row is not read again; any other file is hashed and
+# skipped when its content is already in the store, and gets a path row so
+# the next run skips it without hashing. Rows from an older FEATURE_VERSION
+# are recomputed, and read_feature_store keeps the newest row per content hash.
+#
+#   python Image_features.py photos/ image_features/ --workers 8
+#   features = read_feature_store("image_features/")
+
+FEATURE_VERSION = 2
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+RGB_BINS = 8
+HUE_BINS = 12
+EDGE_THRESHOLD = 0.1
+
+SCHEMA = pa.schema([
+    ("content_hash", pa.string()),
+    ("path", pa.string()),
+    ("size", pa.int64()),
+    ("mtime", pa.float64()),
+    ("feature_version", pa.int16()),
+    ("width", pa.int32()),
+    ("height", pa.int32()),
+    ("vegetation", pa.float32()),
+    ("sky", pa.float32()),
+    ("impervious", pa.float32()),
+    ("rgb_histogram", pa.list_(pa.float32(), 3 * RGB_BINS)),
+    ("hue_histogram", pa.list_(pa.float32(), HUE_BINS)),
+    ("brightness", pa.float32()),
+    ("contrast", pa.float32()),
+    ("gradient_mean", pa.float32()),
+    ("edge_density", pa.float32()),
+    ("entropy", pa.float32()),
+    ("phash", pa.string()),
+    ("dhash", pa.string())
+])
+PATH_SCHEMA = pa.schema([SCHEMA.field(name) for name in ("content_hash", "path", "size", "mtime", "feature_version")])
+
+# ----------------- Features -----------------
+def colour_histograms(rgb: np.ndarray) -> Tuple[List[float], List[float]]:
+    pixels = rgb.reshape(-1, 3)
+    bins = np.minimum((pixels * RGB_BINS).astype(np.int32), RGB_BINS - 1)
+    rgb_histogram = np.stack([np.bincount(bins[:, c], minlength=RGB_BINS) for c in range(3)]).ravel() / len(pixels)
+
+    # Hue of the saturated pixels only; gray pixels have no meaningful hue
+    high = pixels.max(axis=1)
+    low = pixels.min(axis=1)
+    chroma = high - low
+    saturated = chroma > 0.1
+    red, green, blue = pixels[saturated].T
+    c = chroma[saturated]
+    hue = np.where(
+        high[saturated] == red, ((green - blue) / c) % 6,
+        np.where(high[saturated] == green, (blue - red) / c + 2, (red - green) / c + 4)
+    ) / 6
+    hue_bins = np.minimum((hue * HUE_BINS).astype(np.int32), HUE_BINS - 1)
+    hue_histogram = np.bincount(hue_bins, minlength=HUE_BINS) / max(len(pixels), 1)
+    return rgb_histogram.tolist(), hue_histogram.tolist()
+
+def texture_statistics(rgb: np.ndarray) -> Dict[str, float]:
+    gray = rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    dx = np.abs(np.diff(gray, axis=1))[:-1]
+    dy = np.abs(np.diff(gray, axis=0))[:, :-1]
+    gradient = np.hypot(dx, dy)
+    counts = np.bincount(np.minimum((gray * 64).astype(np.int32), 63).ravel(), minlength=64)
+    p = counts[counts > 0] / gray.size
+    return {
+        "brightness": float(gray.mean()),
+        "contrast": float(gray.std()),
+        "gradient_mean": float(gradient.mean()),
+        "edge_density": float((gradient > EDGE_THRESHOLD).mean()),
+        "entropy": float(-(p * np.log2(p)).sum())
+    }
+
+def image_features(data: bytes) -> Dict[str, object]:
+    width, height = Image.open(io.BytesIO(data)).size
+    image = open_reduced(data)
+    rgb = pixel_array(image)
+    rgb_histogram, hue_histogram = colour_histograms(rgb)
+    features = {"width": width, "height": height}
+    features.update(cover_fractions(rgb))
+    features.update(rgb_histogram=rgb_histogram, hue_histogram=hue_histogram)
+    features.update(texture_statistics(rgb))
+    hashes = perceptual_hashes(data)
+    features.update(phash=f"{hashes['phash']:016x}", dhash=f"{hashes['dhash']:016x}")
+    return features
+
+# ----------------- Workers -----------------
+_known_hashes = set()
+
+def _init_worker(known_hashes: Set[str]) -> None:
+    global _known_hashes
+    _known_hashes = known_hashes
+
+def extract(task: Tuple[str, str]) -> Dict[str, object]:
+    # Runs in a worker process; reads, hashes and (if new) analyzes one file
+    root, relative = task
+    path = os.path.join(root, relative)
+    row = {"path": relative, "feature_version": FEATURE_VERSION}
+    try:
+        # The file may have gone since the directory walk
+        stat = os.stat(path)
+        row.update(size=stat.st_size, mtime=stat.st_mtime)
+        with open(path, "rb") as f:
+            data = f.read()
+        row["content_hash"] = content_hash(data)
+        if row["content_hash"] in _known_hashes:
+            row["status"] = "known"
+            return row
+        row.update(image_features(data))
+        row["status"] = "new"
+    except (OSError, Image.DecompressionBombError) as e:
+        row["status"] = "error"
+        row["error"] = f"{type(e).__name__}: {e}"
+    return row
+
+# ----------------- Store -----------------
+def read_feature_store(path: str, columns: Optional[List[str]] = None):
+    # Newest row per content hash as a pandas DataFrame
+    if not os.path.isdir(path) or not any(name.endswith(".parquet") for name in os.listdir(path)):
+        return SCHEMA.empty_table().to_pandas() if columns is None else SCHEMA.empty_table().select(columns).to_pandas()
+    read = None if columns is None else sorted(set(columns) | {"content_hash", "feature_version"})
+    frame = pq.read_table(path, columns=read).to_pandas()
+    frame = frame.sort_values("feature_version", kind="stable").drop_duplicates("content_hash", keep="last")
+    return frame.reset_index(drop=True) if columns is None else frame[columns].reset_index(drop=True)
+
+def stored_files(path: str) -> Tuple[Set[str], Dict[str, Set[Tuple[int, float]]]]:
+    # Content hashes of current-version rows, and every (size, mtime) recorded
+    # for each relative path by those rows and the path rows
+    frame = read_feature_store(path, ["content_hash", "path", "size", "mtime", "feature_version"])
+    frame = frame[frame["feature_version"] == FEATURE_VERSION]
+    known_hashes = set(frame["content_hash"])
+    files = {}
+    for p, s, m in zip(frame["path"], frame["size"], frame["mtime"]):
+        files.setdefault(p, set()).add((int(s), float(m)))
+    path_parts = sorted(name for name in os.listdir(path) if name.startswith("_paths-") and name.endswith(".parquet"))
+    if path_parts:
+        paths = pa.concat_tables([pq.read_table(os.path.join(path, name), schema=PATH_SCHEMA) for name in path_parts])
+        for h, p, s, m, v in zip(*(paths.column(name).to_pylist() for name in PATH_SCHEMA.names)):
+            if v == FEATURE_VERSION and h in known_hashes:
+                files.setdefault(p, set()).add((int(s), float(m)))
+    return known_hashes, files
+
+def write_part(path: str, rows: List[Dict[str, object]], name: str, schema: pa.Schema = SCHEMA) -> None:
+    table = pa.Table.from_pylist([{field: row.get(field) for field in schema.names} for row in rows], schema=schema)
+    tmp_path = os.path.join(path, f".{name}.tmp")
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, os.path.join(path, name))
+
+def walk_images(root: str) -> Iterator[str]:
+    for directory, subdirectories, names in os.walk(root):
+        subdirectories.sort()
+        for name in sorted(names):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.relpath(os.path.join(directory, name), root)
+
+def update_feature_store(root: str, store: str, workers: int = None, batch_size: int = 1000,
+                         log_every: int = 1000) -> Dict[str, int]:
+    os.makedirs(store, exist_ok=True)
+    known_hashes, files = stored_files(store)
+    counts = {"unchanged": 0, "known": 0, "new": 0, "error": 0}
+
+    tasks = []
+    for relative in walk_images(root):
+        try:
+            stat = os.stat(os.path.join(root, relative))
+        except OSError:
+            # Left to the worker, which records the error
+            tasks.append((root, relative))
+            continue
+        if (stat.st_size, stat.st_mtime) in files.get(relative, ()):
+            counts["unchanged"] += 1
+        else:
+            tasks.append((root, relative))
+
+    # Unique per run, so runs started in the same second never write the same part file
+    run = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    batch = []
+    moved = []
+    parts = 0
+    path_parts = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(known_hashes,)) as executor:
+        for done, row in enumerate(executor.map(extract, tasks, chunksize=8), start=1):
+            status = row.pop("status")
+            if status == "new" and row["content_hash"] in known_hashes:
+                # The same photo twice in this run
+                status = "known"
+            counts[status] += 1
+            if status == "known":
+                moved.append(row)
+                if len(moved) >= batch_size:
+                    write_part(store, moved, f"_paths-{run}-{path_parts:05d}.parquet", PATH_SCHEMA)
+                    path_parts += 1
+                    moved = []
+            elif status == "error":
+                print(f"Skipped {row['path']}: {row['error']}", file=sys.stderr)
+            elif status == "new":
+                known_hashes.add(row["content_hash"])
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    write_part(store, batch, f"part-{run}-{parts:05d}.parquet")
+                    parts += 1
+                    batch = []
+            if log_every and done % log_every == 0:
+                rate = done / (time.perf_counter() - start)
+                print(f"{done}/{len(tasks)} files ({rate:.0f}/s)")
+    if batch:
+        write_part(store, batch, f"part-{run}-{parts:05d}.parquet")
+    if moved:
+        write_part(store, moved, f"_paths-{run}-{path_parts:05d}.parquet", PATH_SCHEMA)
+    return counts
+
+# ----------------- CLI -----------------
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Extract image features of a photo directory into a Parquet feature store.")
+    parser.add_argument("images", help="Directory of photos (searched recursively).")
+    parser.add_argument("store", help="Feature store directory of Parquet part files.")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU).")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per Parquet part file.")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    counts = update_feature_store(args.images, args.store, args.workers, args.batch_size)
+    print(f"{counts['new']} new, {counts['known']} already stored by content, {counts['unchanged']} unchanged, "
+          f"{counts['error']} unreadable in {time.perf_counter() - start:.1f}s; store {args.store}")
+
+if __name__ == "__main__":
+    main()
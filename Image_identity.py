@@ -0,0 +1,158 @@
+from typing import Dict, List, Iterable, Optional, Tuple
+import hashlib
+import io
+import json
+import os
+import threading
+
+import numpy as np
+from PIL import Image
+
+# Content-based image identity for the image evaluators.
+# Every upload gets an exact content hash (SHA-256 of the file bytes) and two
+# 64-bit perceptual hashes of the decoded picture:
+#   dHash  sign of horizontal gradients on a 9×8 grayscale thumbnail
+#   pHash  sign of the 8×8 low-frequency DCT block (vs. its median) of a 32×32 thumbnail
+# The image ID is the content hash, so exports from different participants
+# join on the photo itself and a file uploaded twice is kept once. A photo
+# whose perceptual hashes are within NEAR_DUPLICATE_BITS of a known photo
+# (re-encoded, resized, recompressed, or a design scenario of the same
+# viewpoint) keeps its own ID; the closest earlier photo is recorded as
+# near_duplicate_of for analysis.
+#
+# The index is process-wide and appended to IMAGE_INDEX_PATH (JSON lines of
+# hashes, no pixels), so IDs stay stable across sessions and restarts. It
+# holds only hashes; the photo bytes stay in the session that uploaded them.
+
+IMAGE_INDEX_PATH = os.environ.get(
+    "IMAGE_INDEX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "image_index.jsonl")
+)
+NEAR_DUPLICATE_BITS = {"phash": 8, "dhash": 10}
+
+# ----------------- Hashes -----------------
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+_DCT_32 = _dct_matrix(32)
+
+def _thumbnail(image: Image.Image, size: Tuple[int, int]) -> np.ndarray:
+    return np.asarray(image.resize(size, Image.Resampling.BILINEAR), dtype=np.float32)
+
+def _pack_bits(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+def decode_gray(data: bytes) -> Image.Image:
+    image = Image.open(io.BytesIO(data))
+    # JPEG decoders can downscale while decoding; the hashes only need 32×32
+    image.draft("L", (64, 64))
+    return image.convert("L")
+
+def dhash(gray: Image.Image) -> int:
+    pixels = _thumbnail(gray, (9, 8))
+    return _pack_bits(pixels[:, 1:] > pixels[:, :-1])
+
+def phash(gray: Image.Image) -> int:
+    pixels = _thumbnail(gray, (32, 32))
+    low = (_DCT_32 @ pixels @ _DCT_32.T)[:8, :8]
+    return _pack_bits(low > np.median(low.ravel()[1:]))
+
+def perceptual_hashes(data: bytes) -> Dict[str, int]:
+    gray = decode_gray(data)
+    return {"phash": phash(gray), "dhash": dhash(gray)}
+
+def hamming(hashes: np.ndarray, value: int) -> np.ndarray:
+    # Bit distance from value to every uint64 in hashes
+    xor = np.bitwise_xor(hashes, np.uint64(value))
+    return np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+# ----------------- Hash Index -----------------
+class ImageIndex:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.records = {}
+        self.ids = []
+        self._lock = threading.Lock()
+        values = {kind: [] for kind in NEAR_DUPLICATE_BITS}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = self._remember(json.loads(line))
+                        for kind in NEAR_DUPLICATE_BITS:
+                            values[kind].append(int(record[kind], 16))
+        self.hashes = {kind: np.array(values[kind], dtype=np.uint64) for kind in NEAR_DUPLICATE_BITS}
+
+    def _remember(self, record: Dict) -> Dict:
+        # Older index lines gave near duplicates the matched photo's ID
+        if record["id"] != record["content_hash"]:
+            record = {**record, "id": record["content_hash"], "near_duplicate_of": record["id"]}
+        self.records[record["content_hash"]] = record
+        self.ids.append(record["id"])
+        return record
+
+    def _add(self, record: Dict) -> None:
+        self._remember(record)
+        for kind in NEAR_DUPLICATE_BITS:
+            self.hashes[kind] = np.append(self.hashes[kind], np.uint64(int(record[kind], 16)))
+
+    def _near_duplicate(self, hashes: Dict[str, int]) -> Optional[str]:
+        if not self.ids:
+            return None
+        distances = {kind: hamming(self.hashes[kind], hashes[kind]) for kind in NEAR_DUPLICATE_BITS}
+        close = np.logical_and.reduce([distances[kind] <= limit for kind, limit in NEAR_DUPLICATE_BITS.items()])
+        if not close.any():
+            return None
+        best = np.flatnonzero(close)[np.argmin(distances["phash"][close])]
+        return self.ids[best]
+
+    def register(self, data: bytes, name: str = "") -> str:
+        digest = content_hash(data)
+        record = self.records.get(digest)
+        if record is None:
+            hashes = perceptual_hashes(data)
+            with self._lock:
+                record = self.records.get(digest)
+                if record is None:
+                    record = {
+                        "id": digest,
+                        "content_hash": digest,
+                        "phash": f"{hashes['phash']:016x}",
+                        "dhash": f"{hashes['dhash']:016x}",
+                        "near_duplicate_of": self._near_duplicate(hashes),
+                        "name": name
+                    }
+                    self._add(record)
+                    if self.path:
+                        with open(self.path, "a", encoding="utf-8") as f:
+                            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return record["id"]
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_image_index() -> ImageIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ImageIndex(IMAGE_INDEX_PATH)
+        return _index
+
+def register_uploads(files: Iterable) -> Tuple[List[str], List[bytes]]:
+    # Image IDs of the uploaded files in upload order, each file once, and its
+    # bytes (for the session to keep)
+    index = get_image_index()
+    image_ids, images = [], []
+    for file in files:
+        data = file.getvalue()
+        image_id = index.register(data, getattr(file, "name", ""))
+        if image_id not in image_ids:
+            image_ids.append(image_id)
+            images.append(data)
+    return image_ids, images
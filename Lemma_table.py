@@ -0,0 +1,114 @@
+from typing import Dict, List, Iterator
+import argparse
+import json
+import os
+import time
+
+from Assessment_engine import (
+    RULE_VERSIONS, LEMMA_TABLE_PATH, SpellingIndex, rule_vocabulary, typo_vocabulary, vocabulary_fingerprint,
+    ensure_nltk_resources
+)
+
+# Builds lemma_table.json for the "table" lemmatization backend.
+# The scorers only see lemmatized text through the rule vocabulary: regex
+# matches of rule terms, negation windows, stop word filtering and substring
+# proximity. So a token's lemma matters only when the token or its lemma is a
+# rule word or a stop word, or when lemmatizing changes whether a substring
+# proximity word is inside it (e.g. "microchips" -> "microchip" loses "chips").
+#
+# WordNetLemmatizer only returns a lemma different from the token when the
+# token is an exception-list form or a morphological-rule inflection of a
+# WordNet noun, so every such token is enumerated here and the relevant ones
+# are kept. Everything else lemmatizes to itself.
+#
+# The table also lists the dictionary words within typo distance of a rule
+# word, which typo correction must leave alone ("meadows" is not a typo of
+# "meadow", nor "messing" of "missing"): every token wordnet.morphy resolves
+# in any part of speech, i.e. the lemmas, their exception-list forms and the
+# forms the noun, verb and adjective morphology rules map onto them.
+#
+#   python Lemma_table.py            # rebuild after changing rule vocabulary
+
+def inflections(wordnet, pos: str) -> Iterator[str]:
+    # Every token the morphology rules or exception list of pos can map onto a WordNet lemma of pos
+    yield from wordnet._exception_map[pos]
+    for lemma in wordnet.all_lemma_names(pos):
+        if "_" in lemma:
+            continue
+        for old, new in wordnet.MORPHOLOGICAL_SUBSTITUTIONS[pos]:
+            if lemma.endswith(new):
+                yield lemma[:len(lemma) - len(new)] + old
+
+def noun_inflections(wordnet) -> Iterator[str]:
+    return inflections(wordnet, "n")
+
+def dictionary_words(wordnet) -> set:
+    # Tokens wordnet.morphy resolves in some part of speech
+    words = {lemma for lemma in wordnet.all_lemma_names() if "_" not in lemma}
+    for pos in ("n", "v", "a", "r"):
+        words.update(inflections(wordnet, pos))
+    return words
+
+def substring_words(rule_versions: Dict[str, Dict] = None) -> set:
+    # Words matched inside tokens by the "substring" proximity style (maintenance)
+    return {
+        word for rules in (rule_versions or RULE_VERSIONS).values()
+        for pairs in rules.get("proximity_keywords", {}).values()
+        for pair in pairs for word in pair
+    }
+
+def near_words(wordnet, rule_versions: Dict[str, Dict] = None) -> List[str]:
+    index = SpellingIndex(typo_vocabulary(rule_versions))
+    near = set()
+    for word in dictionary_words(wordnet) - index.words:
+        distance = index.allowed_distance(word, index.max_distance)
+        if distance and index.candidates(word, distance):
+            near.add(word)
+    return sorted(near)
+
+def is_relevant(token: str, lemma: str, words: set, stop_words: set, substrings: set) -> bool:
+    if token in words or lemma in words or token in stop_words or lemma in stop_words:
+        return True
+    return any((word in token) != (word in lemma) for word in substrings)
+
+def build_lemma_table(rule_versions: Dict[str, Dict] = None) -> Dict:
+    ensure_nltk_resources()
+    from nltk.corpus import stopwords, wordnet
+    from nltk.stem import WordNetLemmatizer
+
+    lemmatizer = WordNetLemmatizer()
+    words = rule_vocabulary(rule_versions)
+    stop_words = set(stopwords.words("english"))
+    substrings = substring_words(rule_versions)
+
+    inflections = set(noun_inflections(wordnet))
+    lemmas = {}
+    for token in inflections | words | stop_words:
+        lemma = lemmatizer.lemmatize(token)
+        if lemma != token and is_relevant(token, lemma, words, stop_words, substrings):
+            lemmas[token] = lemma
+
+    return {
+        "vocabulary_hash": vocabulary_fingerprint(rule_versions),
+        "wordnet_version": wordnet.get_version(),
+        "lemmas": dict(sorted(lemmas.items())),
+        "stop_words": sorted(stop_words),
+        "near_words": near_words(wordnet, rule_versions)
+    }
+
+# ----------------- CLI -----------------
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Precompute the inflection -> lemma table for the rule vocabulary.")
+    parser.add_argument("--output", default=LEMMA_TABLE_PATH)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    table = build_lemma_table()
+    with open(args.output + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(table, f, ensure_ascii=False, indent=0)
+    os.replace(args.output + ".tmp", args.output)
+    print(f"Wrote {len(table['lemmas'])} lemmas, {len(table['stop_words'])} stop words and {len(table['near_words'])} near words "
+          f"to {args.output} in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
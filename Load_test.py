@@ -0,0 +1,382 @@
+from typing import Dict, List, Tuple, Iterable
+import argparse
+import csv
+import io
+import os
+import random
+import resource
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+from streamlit.testing.v1 import AppTest
+
+import Image_identity
+from Assessment_engine import iter_corpus
+
+# Load test for the Streamlit tools.
+# Every simulated participant is an AppTest session of the app script. All
+# sessions run in this process on their own threads, the way a Streamlit
+# server runs one script thread per browser tab, so this process plays the
+# server: its CPU and RSS are sampled while the sessions step through
+#   image apps  open, upload, rate every image, summary, favorites,
+#               comparison notes, export
+#   text apps   open, type a description, assess (repeated)
+# with a randomized think time between steps. Every rerun is timed per step.
+# Sessions start evenly over the ramp-up; several session counts can be run
+# one after another to find where latency turns up.
+#
+#   python Load_test.py Image_evaluator_3.py --sessions 25 50 100 150 --timeline load.csv
+#   python Load_test.py Biodiversity_assessment_8.py --sessions 50 --corpus corpus.jsonl
+#
+# AppTest has no file upload, so "upload" registers the photos with the image
+# index and sets the session state exactly as the upload branch of the apps
+# does; with --study the apps load the shared study catalog instead.
+
+IMAGE_APPS = ["Image_evaluator.py", "Image_evaluator_2.py", "Image_evaluator_3.py", "Experts_image_evaluator.py"]
+PHOTO_SIZE = (4032, 3024)
+PERCENTILES = [50, 90, 95, 99]
+
+SAMPLE_DESCRIPTIONS = [
+    "A wildflower meadow with shrubs and a few isolated trees. Species variety is moderate and there is an insect hotel near the path.",
+    "Mostly asphalt parking with a narrow strip of lawn. No trees, the vegetation is sparse and the lawn is mowed weekly.",
+    "Dense vegetation along a rain garden and a bioswale. Deadwood, a rock pile and birdhouses support wildlife; gravel paths let water infiltrate.",
+    "The courtyard has paving stones, two benches, planters with seasonal flowers and a hedge that needs trimming twice a year."
+]
+NOTES = [
+    "Kävelisin täällä ja istuisin penkillä.",
+    "I would have a picnic on the meadow with friends.",
+    "Lapset voisivat leikkiä ja tutkia hyönteisiä."
+]
+
+# ----------------- Inputs -----------------
+class UploadedPhoto(io.BytesIO):
+    # Stand-in for Streamlit's UploadedFile
+    def __init__(self, data: bytes, name: str):
+        super().__init__(data)
+        self.name = name
+
+def is_image_app(app: str) -> bool:
+    return os.path.basename(app) in IMAGE_APPS
+
+def synthetic_photos(count: int, seed: int = 0) -> List[bytes]:
+    # Smooth random colour fields, phone-photo sized and distinct for the perceptual hashes
+    rng = np.random.default_rng(seed)
+    photos = []
+    for _ in range(count):
+        small = Image.fromarray(rng.integers(0, 256, (12, 16, 3), dtype=np.uint8))
+        out = io.BytesIO()
+        small.resize(PHOTO_SIZE, Image.Resampling.BICUBIC).save(out, "JPEG", quality=90)
+        photos.append(out.getvalue())
+    return photos
+
+def read_photos(directory: str) -> List[bytes]:
+    photos = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith((".jpg", ".jpeg", ".png")):
+            with open(os.path.join(directory, name), "rb") as f:
+                photos.append(f.read())
+    return photos
+
+# ----------------- Concurrent AppTest -----------------
+def share_test_runtime() -> None:
+    # AppTest is built for one test at a time. It installs its mock Runtime
+    # for the length of one run and removes it afterwards, so with concurrent
+    # sessions one session's teardown would pull the runtime from under
+    # another session's script thread; lookups fall back to the last runtime
+    # AppTest installed. It also compiles the script on every run, and
+    # concurrent compiles of the same script can fail; sessions share one
+    # script cache, as they do on a server. And it switches on app-test mode
+    # per run, which overlapping runs would switch off for each other.
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.testing.v1 import app_test, local_script_runner
+    script_cache = app_test.ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+    config.set_option("global.appTest", True)
+    shared = {}
+
+    def instance(cls):
+        if cls._instance is not None:
+            shared["runtime"] = cls._instance
+            return cls._instance
+        if "runtime" not in shared:
+            raise RuntimeError("Runtime hasn't been created!")
+        return shared["runtime"]
+
+    def exists(cls):
+        return cls._instance is not None or "runtime" in shared
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(exists)
+
+# ----------------- Sessions -----------------
+def timed_run(at: AppTest, session: int, step: str, latencies: List[Tuple[int, str, float]], prepare=None) -> None:
+    # prepare is work the server would do for this step before the rerun (the upload)
+    start = time.perf_counter()
+    if prepare:
+        prepare()
+    at.run()
+    latencies.append((session, step, time.perf_counter() - start))
+    if at.exception:
+        raise RuntimeError(f"{step}: {at.exception[0].message}")
+
+def think(rng: random.Random, seconds: float, stop: threading.Event) -> None:
+    stop.wait(rng.uniform(0.5, 1.5) * seconds)
+
+def button(at: AppTest, prefix: str):
+    for candidate in at.button:
+        if candidate.label.startswith(prefix):
+            return candidate
+    return None
+
+def upload(at: AppTest, photos: List[bytes]) -> None:
+    image_ids, images = Image_identity.register_uploads(UploadedPhoto(data, f"photo_{i + 1}.jpg") for i, data in enumerate(photos))
+    state = {
+        "image_ids": image_ids,
+        "images_uploaded": images,
+        "image_previews": images,
+        "responses": [{} for _ in images],
+        "favorites": [False for _ in images],
+        "comparison_notes": ["", ""],
+        "active_image": 0,
+        "show_summary": False,
+        "viewing_comparison": False
+    }
+    for key, value in state.items():
+        at.session_state[key] = value
+
+def image_session(app: str, session: int, rng: random.Random, photos: List[bytes], pause: float,
+                  timeout: float, latencies: List, stop: threading.Event) -> None:
+    at = AppTest.from_file(app, default_timeout=timeout)
+    timed_run(at, session, "open", latencies)
+
+    if not at.session_state["images_uploaded"]:
+        think(rng, pause, stop)
+        chosen = rng.sample(photos, 4)
+        timed_run(at, session, "upload", latencies, lambda: upload(at, chosen))
+
+    num_images = len(at.session_state["images_uploaded"])
+    for i in range(num_images):
+        if stop.is_set():
+            return
+        if i:
+            at.button(key=f"thumb_button_{i}").click()
+            timed_run(at, session, "select image", latencies)
+        for j in range(len(at.selectbox)):
+            think(rng, pause, stop)
+            box = at.selectbox[j]
+            box.select(rng.choice(box.options[1:]))
+            timed_run(at, session, "rate", latencies)
+
+    think(rng, pause, stop)
+    button(at, "📊").click()
+    timed_run(at, session, "summary", latencies)
+
+    for i in rng.sample(range(num_images), min(2, num_images)):
+        if at.session_state["viewing_comparison"]:
+            break
+        think(rng, pause, stop)
+        at.button(key=f"star_{i}").click()
+        timed_run(at, session, "favorite", latencies)
+
+    if not at.session_state["viewing_comparison"]:
+        think(rng, pause, stop)
+        button(at, "➡️").click()
+        timed_run(at, session, "comparison", latencies)
+
+    for j in range(len(at.text_area)):
+        think(rng, pause, stop)
+        at.text_area[j].input(rng.choice(NOTES))
+        timed_run(at, session, "note", latencies)
+
+    think(rng, pause, stop)
+    button(at, "✅").click()
+    timed_run(at, session, "export", latencies)
+
+def text_session(app: str, session: int, rng: random.Random, texts: List[str], pause: float,
+                 timeout: float, latencies: List, stop: threading.Event, assessments: int) -> None:
+    at = AppTest.from_file(app, default_timeout=timeout)
+    timed_run(at, session, "open", latencies)
+    for _ in range(assessments):
+        if stop.is_set():
+            return
+        think(rng, pause, stop)
+        at.text_area[0].input(rng.choice(texts))
+        timed_run(at, session, "type", latencies)
+        think(rng, pause, stop)
+        at.button[0].click()
+        timed_run(at, session, "assess", latencies)
+
+# ----------------- Resource Sampling -----------------
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        # Peak rather than current RSS where /proc is unavailable (KiB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+def cpu_seconds() -> float:
+    times = os.times()
+    return times.user + times.system
+
+def sample_resources(samples: List[Dict], active: List[int], interval: float, stop: threading.Event) -> None:
+    start = last_wall = time.perf_counter()
+    last_cpu = cpu_seconds()
+    while not stop.wait(interval):
+        wall, cpu = time.perf_counter(), cpu_seconds()
+        samples.append({
+            "time": round(wall - start, 2),
+            "cpu_percent": round(100 * (cpu - last_cpu) / (wall - last_wall), 1),
+            "rss_mb": round(rss_bytes() / 2 ** 20, 1),
+            "active_sessions": active[0]
+        })
+        last_wall, last_cpu = wall, cpu
+
+# ----------------- Load Levels -----------------
+def run_level(app: str, sessions: int, args: argparse.Namespace, photos: List[bytes], texts: List[str]) -> Dict:
+    latencies = []
+    samples = []
+    failures = []
+    active = [0]
+    lock = threading.Lock()
+    stop = threading.Event()
+    sampler_stop = threading.Event()
+    sampler = threading.Thread(target=sample_resources, args=(samples, active, args.sample_interval, sampler_stop), daemon=True)
+
+    def participant(session: int) -> None:
+        stop.wait(args.ramp_up * session / sessions)
+        if stop.is_set():
+            return
+        rng = random.Random(args.seed * 100003 + session)
+        with lock:
+            active[0] += 1
+        try:
+            if is_image_app(app):
+                image_session(app, session, rng, photos, args.think, args.timeout, latencies, stop)
+            else:
+                text_session(app, session, rng, texts, args.think, args.timeout, latencies, stop, args.assessments)
+        except Exception as e:
+            failures.append((session, f"{type(e).__name__}: {e}"))
+        finally:
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=participant, args=(i,), name=f"session-{i}", daemon=True) for i in range(sessions)]
+    start = time.perf_counter()
+    sampler.start()
+    for thread in threads:
+        thread.start()
+    deadline = start + args.max_duration if args.max_duration else None
+    for thread in threads:
+        thread.join(None if deadline is None else max(deadline - time.perf_counter(), 0))
+    stop.set()
+    for thread in threads:
+        thread.join()
+    sampler_stop.set()
+    sampler.join()
+    return {
+        "sessions": sessions,
+        "elapsed": time.perf_counter() - start,
+        "latencies": latencies,
+        "samples": samples,
+        "failures": failures
+    }
+
+def percentiles(values: Iterable[float]) -> List[float]:
+    values = np.asarray(list(values))
+    if not len(values):
+        return [0.0] * (len(PERCENTILES) + 1)
+    return [float(v) for v in np.percentile(values, PERCENTILES)] + [float(values.max())]
+
+def print_level(app: str, level: Dict) -> None:
+    latencies = level["latencies"]
+    print(f"\n{app}: {level['sessions']} sessions, {len(level['failures'])} failed, "
+          f"{len(latencies)} reruns in {level['elapsed']:.1f}s ({len(latencies) / level['elapsed']:.1f} reruns/s)")
+    header = "".join(f"{'p' + str(p):>9}" for p in PERCENTILES) + f"{'max':>9}"
+    print(f"  {'step (ms)':<14}{'count':>7}{header}")
+    steps = list(dict.fromkeys(step for _, step, _ in latencies)) + ["all"]
+    for step in steps:
+        values = [seconds for _, name, seconds in latencies if step in ("all", name)]
+        print(f"  {step:<14}{len(values):>7}" + "".join(f"{1000 * v:>9.0f}" for v in percentiles(values)))
+    if level["samples"]:
+        cpu = [sample["cpu_percent"] for sample in level["samples"]]
+        rss = [sample["rss_mb"] for sample in level["samples"]]
+        print(f"  CPU mean {np.mean(cpu):.0f}% peak {max(cpu):.0f}% | RSS start {rss[0]:.0f} MB peak {max(rss):.0f} MB end {rss[-1]:.0f} MB")
+    for session, message in level["failures"][:5]:
+        print(f"  session {session} failed: {message}")
+
+# ----------------- CLI -----------------
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Simulate concurrent participants on a Streamlit app and report rerun latency, CPU and RSS.")
+    parser.add_argument("app", help="App script, e.g. Image_evaluator_3.py or Biodiversity_assessment_8.py.")
+    parser.add_argument("--sessions", nargs="+", type=int, default=[10], help="Concurrent sessions; several values run one level after another.")
+    parser.add_argument("--ramp-up", type=float, default=10.0, help="Seconds over which the sessions of a level start.")
+    parser.add_argument("--think", type=float, default=1.0, help="Mean think time between steps in seconds.")
+    parser.add_argument("--assessments", type=int, default=3, help="Assessments per session in the text apps.")
+    parser.add_argument("--max-duration", type=float, help="Stop a level after this many seconds.")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds one rerun may take before it counts as failed.")
+    parser.add_argument("--sample-interval", type=float, default=0.5)
+    parser.add_argument("--photos", help="Directory of photos to upload (default: synthetic phone-sized photos).")
+    parser.add_argument("--study", help="Run the image apps in study mode with this study directory or manifest.")
+    parser.add_argument("--corpus", help="Descriptions for the text apps (.jsonl or one per line).")
+    parser.add_argument("--image-index", default="", help="Image index file (default: in memory only).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="CSV file for every rerun (sessions, session, step, seconds).")
+    parser.add_argument("--timeline", help="CSV file for CPU and RSS samples over time.")
+    args = parser.parse_args(argv)
+    if os.path.exists(args.app):
+        # AppTest resolves relative paths against this file, not the working directory
+        args.app = os.path.abspath(args.app)
+
+    # Keep simulated uploads out of the real image index
+    Image_identity.IMAGE_INDEX_PATH = args.image_index
+    if args.study:
+        os.environ["STUDY_PATH"] = args.study
+    photos = read_photos(args.photos) if args.photos else synthetic_photos(8, args.seed)
+    texts = [text for _, text in iter_corpus(args.corpus)] if args.corpus else SAMPLE_DESCRIPTIONS
+    if is_image_app(args.app) and not args.study and len(photos) < 4:
+        parser.error("The image apps need at least 4 photos.")
+
+    # One session alone first: imports, caches and the shared test runtime are
+    # in place before the measured sessions start, as on a running server
+    share_test_runtime()
+    warm_up = argparse.Namespace(**dict(vars(args), think=0.0, ramp_up=0.0, assessments=1))
+    if run_level(args.app, 1, warm_up, photos, texts)["failures"]:
+        print("Warning: the warm-up session failed.")
+
+    levels = []
+    for sessions in args.sessions:
+        level = run_level(args.app, sessions, args, photos, texts)
+        print_level(args.app, level)
+        levels.append(level)
+
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["sessions", "session", "step", "seconds"])
+            for level in levels:
+                writer.writerows((level["sessions"], session, step, f"{seconds:.4f}") for session, step, seconds in level["latencies"])
+    if args.timeline:
+        with open(args.timeline, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=["sessions", "time", "cpu_percent", "rss_mb", "active_sessions"])
+            writer.writeheader()
+            for level in levels:
+                writer.writerows(dict(sample, sessions=level["sessions"]) for sample in level["samples"])
+
+    if len(levels) > 1:
+        print(f"\n{'sessions':>8}{'reruns/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'CPU %':>8}{'RSS MB':>8}{'failed':>8}")
+        for level in levels:
+            p50, _, p95, p99, _ = percentiles(seconds for _, _, seconds in level["latencies"])
+            cpu = np.mean([s["cpu_percent"] for s in level["samples"]]) if level["samples"] else 0
+            rss = max([s["rss_mb"] for s in level["samples"]], default=0)
+            print(f"{level['sessions']:>8}{len(level['latencies']) / level['elapsed']:>10.1f}{1000 * p50:>9.0f}"
+                  f"{1000 * p95:>9.0f}{1000 * p99:>9.0f}{cpu:>8.0f}{rss:>8.0f}{len(level['failures']):>8}")
+
+if __name__ == "__main__":
+    main()
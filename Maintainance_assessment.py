@@ -1,12 +1,12 @@
 import streamlit as st
+from Background_assessment import start_assessment, cancel_assessment, assessment_result
+from Assessment_engine import MAX_INPUT_CHARS, such_as_follows, get_lemmatizer
 from typing import Dict, Tuple, List
-import nltk
-from nltk.stem import WordNetLemmatizer
 import re
 from collections import defaultdict
 
-nltk.download("wordnet")
-lemmatizer = WordNetLemmatizer()
+# Shared lemmatizer, fully loaded before any assessment thread uses it
+lemmatizer = get_lemmatizer()
 
 # ----------------- Synonym Mapping -----------------
 synonym_map = {
@@ -128,7 +128,7 @@ def is_negated(text: str, original_keyword: str) -> bool:
                 for i in range(len(window) - len(keyword_lemmas) + 1):
                     if window[i:i + len(keyword_lemmas)] == keyword_lemmas:
                         return True
-                if re.search(term + r".*such as.*" + re.escape(original_keyword), sentence):
+                if such_as_follows(sentence, term, original_keyword):
                     return True
     return False
 
@@ -191,22 +191,27 @@ st.set_page_config(page_title="Landscape Maintenance Effort Evaluation", layout=
 st.title("🧹 Landscape Maintenance Effort Evaluation Tool")
 st.markdown("Describe a landscape scenario and estimate the maintenance effort based on vegetation complexity, hardscape, infrastructure, and biodiversity microhabitats.")
 
-description = st.text_area("📝 Paste or write your landscape description below:", height=250)
+description = st.text_area("📝 Paste or write your landscape description below:", height=250, max_chars=MAX_INPUT_CHARS)
 
 if st.button("🧹 Evaluate Maintenance Effort"):
     if description.strip():
-        score, label, matches = evaluate_maintenance(description)
-        st.subheader("💡 Maintenance Evaluation Results")
+        start_assessment("maintenance_job", evaluate_maintenance, description)
+    else:
+        cancel_assessment("maintenance_job")
+        st.warning("Please enter a description to analyze.")
 
-        if matches:
-            for elem, weight in matches.items():
-                st.write(f"- {elem} → weight {weight}")
-        else:
-            st.info("No maintenance-related elements detected in the description.")
+evaluation = assessment_result("maintenance_job", description, "🧹 Evaluating maintenance effort...")
+if evaluation:
+    score, label, matches = evaluation
+    st.subheader("💡 Maintenance Evaluation Results")
 
-        st.success(f"🧹 **Overall Score: {score} — {label}**")
+    if matches:
+        for elem, weight in matches.items():
+            st.write(f"- {elem} → weight {weight}")
     else:
-        st.warning("Please enter a description to analyze.")
+        st.info("No maintenance-related elements detected in the description.")
+
+    st.success(f"🧹 **Overall Score: {score} — {label}**")
 
 
 
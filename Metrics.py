@@ -0,0 +1,245 @@
+from typing import Callable, Dict, Iterable, List, Tuple
+import atexit
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Operational metrics for the scorers in Streamlit servers and batch workers.
+# Counters and latency histograms are updated in place where the work happens
+# (one lock and a few additions per observation); cache statistics, resource
+# load times and Streamlit session gauges are read only when the metrics are
+# collected, so they cost nothing between scrapes. Everything is rendered in
+# the Prometheus text format and exported when the environment asks for it:
+#
+#   ASSESSMENT_METRICS_PORT=9108      serve GET /metrics on this port
+#   ASSESSMENT_METRICS_FILE=a.prom    rewrite this file (atomically) every
+#   ASSESSMENT_METRICS_INTERVAL=15    seconds and at exit, e.g. for the
+#                                     node_exporter textfile collector
+#   ASSESSMENT_METRICS=0              skip the hot-path timing altogether
+#
+#   ASSESSMENT_METRICS_PORT=9108 streamlit run Biodiversity_assessment_8.py
+#   ASSESSMENT_METRICS_FILE=scoring.prom python Assessment_engine.py corpus.jsonl
+#
+# Exporters start when this module is first imported in the main process;
+# worker processes only keep their own counters.
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+Sample = Tuple[str, Labels, Tuple[Tuple[str, str], ...], float]
+
+# ----------------- Metric Types -----------------
+class Counter:
+    def __init__(self, registry: "Registry"):
+        self.registry = registry
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        if not self.registry.enabled:
+            return
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def snapshot(self) -> Dict[Labels, float]:
+        with self.lock:
+            return dict(self.values)
+
+    def samples(self) -> List[Sample]:
+        return [("", labels, (), value) for labels, value in self.snapshot().items()]
+
+class Histogram:
+    def __init__(self, registry: "Registry", buckets: Iterable[float]):
+        self.registry = registry
+        self.buckets = tuple(buckets)
+        # Per label set: a count per bucket, the +Inf count, then the sum
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, labels: Labels, value: float) -> None:
+        if not self.registry.enabled:
+            return
+        series = self.series.get(labels)
+        if series is None:
+            with self.lock:
+                series = self.series.setdefault(labels, [0] * (len(self.buckets) + 1) + [0.0])
+        i = bisect_left(self.buckets, value)
+        with self.lock:
+            series[i] += 1
+            series[-1] += value
+
+    def samples(self) -> List[Sample]:
+        with self.lock:
+            snapshot = [(labels, list(series)) for labels, series in self.series.items()]
+        samples = []
+        for labels, series in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                samples.append(("_bucket", labels, (("le", format_value(bound)),), cumulative))
+            samples.append(("_sum", labels, (), series[-1]))
+            samples.append(("_count", labels, (), cumulative))
+        return samples
+
+# ----------------- Registry -----------------
+class Registry:
+    def __init__(self):
+        self.enabled = os.environ.get("ASSESSMENT_METRICS", "1") != "0"
+        self.families = {}
+        self.lock = threading.Lock()
+
+    def _add(self, name: str, kind: str, help: str, labelnames: Iterable[str], source: Callable[[], List[Sample]]) -> None:
+        # Several modules may feed one family (e.g. every cache into cache_lookups_total)
+        with self.lock:
+            family = self.families.setdefault(name, {"type": kind, "help": help, "labelnames": tuple(labelnames), "sources": []})
+            if family["type"] != kind or family["labelnames"] != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered as a {family['type']} with labels {family['labelnames']}")
+            family["sources"].append(source)
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        counter = Counter(self)
+        self._add(name, "counter", help, labelnames, counter.samples)
+        return counter
+
+    def histogram(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        histogram = Histogram(self, buckets)
+        self._add(name, "histogram", help, labelnames, histogram.samples)
+        return histogram
+
+    def collector(self, name: str, kind: str, help: str, labelnames: Iterable[str], collect: Callable[[], Dict[Labels, float]]) -> None:
+        # collect() runs at collection time and returns {label values: value}
+        self._add(name, kind, help, labelnames, lambda: [("", labels, (), value) for labels, value in collect().items()])
+
+    def render(self) -> str:
+        with self.lock:
+            families = sorted(self.families.items())
+        lines = []
+        for name, family in families:
+            samples = []
+            for source in family["sources"]:
+                try:
+                    samples.extend(source())
+                except Exception as e:
+                    # A broken collector must not take the whole endpoint down
+                    print(f"Metrics: collecting {name} failed: {type(e).__name__}: {e}", file=sys.stderr)
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['type']}")
+            for suffix, labels, extra, value in samples:
+                pairs = list(zip(family["labelnames"], labels)) + list(extra)
+                label_text = ",".join(f'{key}="{escape_label(str(item))}"' for key, item in pairs)
+                lines.append(f"{name}{suffix}{{{label_text}}} {format_value(value)}" if pairs else f"{name}{suffix} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+METRICS = Registry()
+
+def register_cache(cache: str, stats: Callable[[], Tuple[int, int]]) -> None:
+    # stats() returns (hits, misses) so far, e.g. from functools' cache_info()
+    def ratio():
+        hits, misses = stats()
+        return {(cache,): hits / (hits + misses) if hits + misses else 0.0}
+    METRICS.collector("cache_lookups_total", "counter", "Cache lookups by result.", ("cache", "result"),
+                      lambda: dict(zip(((cache, "hit"), (cache, "miss")), stats())))
+    METRICS.collector("cache_hit_ratio", "gauge", "Share of cache lookups that were hits.", ("cache",), ratio)
+
+# ----------------- Process and Streamlit -----------------
+_started = time.time()
+SESSION_IMAGE_KEYS = ("images_uploaded", "image_previews")
+
+def _active_sessions() -> List:
+    # Sessions of the Streamlit server this process runs, if any (never imports Streamlit)
+    runtime = sys.modules.get("streamlit.runtime")
+    if runtime is None or not runtime.exists():
+        return []
+    return runtime.get_instance()._session_mgr.list_active_sessions()
+
+def _session_images() -> Tuple[int, int]:
+    # Photos held in session state, and their bytes; study photos shared between sessions count once
+    images = 0
+    held = {}
+    for info in _active_sessions():
+        state = info.session.session_state
+        for key in SESSION_IMAGE_KEYS:
+            value = state[key] if key in state else None
+            for image in value or []:
+                if key == "images_uploaded":
+                    images += 1
+                if isinstance(image, (bytes, bytearray)):
+                    held[id(image)] = len(image)
+    return images, sum(held.values())
+
+METRICS.collector("process_start_time_seconds", "gauge", "Start time of the process since the epoch.", (),
+                  lambda: {(): _started})
+METRICS.collector("streamlit_active_sessions", "gauge", "Browser sessions connected to this Streamlit server.", (),
+                  lambda: {(): len(_active_sessions())})
+METRICS.collector("streamlit_session_images", "gauge", "Uploaded or study photos held in session state.", (),
+                  lambda: {(): _session_images()[0]})
+METRICS.collector("streamlit_session_image_bytes", "gauge", "Bytes of the photos held in session state.", (),
+                  lambda: {(): _session_images()[1]})
+
+# ----------------- Exporters -----------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = METRICS.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_http_server(port: int, host: str = "") -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+def write_metrics(path: str) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(METRICS.render())
+    os.replace(tmp_path, path)
+
+def start_file_dump(path: str, interval: float) -> None:
+    def dump():
+        while True:
+            time.sleep(interval)
+            try:
+                write_metrics(path)
+            except OSError as e:
+                print(f"Metrics: writing {path} failed: {e}", file=sys.stderr)
+    threading.Thread(target=dump, name="metrics-file", daemon=True).start()
+    atexit.register(write_metrics, path)
+
+def start_exporters() -> None:
+    if multiprocessing.parent_process() is not None:
+        return
+    port = os.environ.get("ASSESSMENT_METRICS_PORT")
+    if port:
+        try:
+            start_http_server(int(port))
+        except OSError as e:
+            print(f"Metrics: cannot serve on port {port}: {e}", file=sys.stderr)
+    path = os.environ.get("ASSESSMENT_METRICS_FILE")
+    if path:
+        start_file_dump(path, float(os.environ.get("ASSESSMENT_METRICS_INTERVAL", 15)))
+
+start_exporters()
@@ -0,0 +1,74 @@
+from typing import Dict, Tuple, List, Iterable
+import argparse
+import csv
+
+from Assessment_engine import (
+    RULE_VERSIONS, ENGINE_FAMILIES, LANGUAGE_VERSIONS, flatten_scores, score_any_language
+)
+from Expert_calibration import CRITERION_VERSIONS, RATING_SCORES
+
+# Scores the free-text notes participants write for their favourite images
+# (comparison_notes in the image evaluators, exported as the Note column of
+# the reflection CSV) and lists them next to the participant's own ratings.
+# The language of each note is detected; Finnish notes go through the Finnish
+# normalization stage and the *_fi rule versions.
+#
+#   python Reflection_notes.py landscape_reflections*.csv --output note_scores.csv
+
+CRITERION_FAMILIES = {
+    criterion: ENGINE_FAMILIES[RULE_VERSIONS[version]["engine"]]
+    for criterion, version in CRITERION_VERSIONS.items()
+}
+
+def read_notes(paths: Iterable[str]) -> List[Tuple[str, str, str, Dict[str, str]]]:
+    # (file, image, note, {criterion: rating}) for every image with a note
+    notes = []
+    for path in paths:
+        images = {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                image = row.get("Image ID") or row["Image"]
+                note, ratings = images.setdefault(image, (row.get("Note", ""), {}))
+                ratings[row["Criterion"]] = row.get("Rating", "")
+        notes.extend((path, image, note, ratings) for image, (note, ratings) in images.items() if note.strip())
+    return notes
+
+def score_notes(notes: Iterable[Tuple[str, str, str, Dict[str, str]]]) -> List[Dict[str, object]]:
+    rows = []
+    for path, image, note, ratings in notes:
+        language, results = score_any_language(note)
+        for criterion, family in CRITERION_FAMILIES.items():
+            version = LANGUAGE_VERSIONS[language][family]
+            rating = ratings.get(criterion, "")
+            rows.append({
+                "File": path,
+                "Image": image,
+                "Language": language,
+                "Criterion": criterion,
+                "Version": version,
+                "Note score": flatten_scores(RULE_VERSIONS[version]["engine"], results[family])["overall"],
+                "Participant rating": RATING_SCORES.get(rating[:1], "")
+            })
+    return rows
+
+# ----------------- CLI -----------------
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Score the comparison notes of reflection CSVs with the text scorers.")
+    parser.add_argument("reflections", nargs="+", help="Reflection CSVs exported by the image evaluators.")
+    parser.add_argument("--output", help="CSV file for note scores next to participant ratings.")
+    args = parser.parse_args(argv)
+
+    rows = score_notes(read_notes(args.reflections))
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["File", "Image"])
+            writer.writeheader()
+            writer.writerows(rows)
+
+    agree = sum(1 for row in rows if row["Note score"] == row["Participant rating"])
+    rated = sum(1 for row in rows if row["Participant rating"] != "")
+    print(f"Scored {len(rows) // max(len(CRITERION_FAMILIES), 1)} notes; "
+          f"note score equals participant rating in {agree} of {rated} rated criteria.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+from typing import Dict, List, Optional, Tuple
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import time
+
+import numpy as np
+
+import Assessment_engine as engine
+from Assessment_engine import RULE_VERSIONS, ENGLISH_VERSIONS, corpus_document, run_corpus, set_lemmatizer
+from Batch_scoring import build_term_matrix, score_term_matrix
+
+# Resumable batch scoring for large archives.
+# The corpus (JSONL, CSV or one description per line) is memory-mapped and
+# indexed once by record start offsets, so any chunk of records can be read
+# without touching the rest of the file. Chunks are scored in order and each
+# is written atomically to the work directory, followed by a checkpoint:
+#
+#   <output>.work/index.bin         int64 offsets of every record, plus the file size
+#   <output>.work/chunk-<n>.csv     score rows of chunk n (no header)
+#   <output>.work/checkpoint.json   job settings and finished chunks
+#
+# A restarted job with the same settings skips the finished chunks; when all
+# are done they are concatenated into the output, which is byte-identical to
+# an uninterrupted run (and to Assessment_engine.py --output), and the work
+# directory is removed. A job with different input, versions or rules refuses
+# to resume unless started over with --restart. Only these files are ever
+# deleted: a work directory holding anything else and no checkpoint is
+# refused, and one the job did not create is left in place when it finishes.
+#
+#   python Resumable_scoring.py archive.jsonl scores.csv --chunk-size 10000 --threads 4
+#   python Resumable_scoring.py archive.csv scores.csv --scorer matrix
+
+INDEX_BLOCK_BYTES = 1 << 26
+# The files a job writes to its work directory, and their temporary versions
+WORK_FILE = re.compile(r"(index\.bin|checkpoint\.json|chunk-\d+\.csv)(\.tmp)?")
+NEWLINE = ord("\n")
+QUOTE = ord('"')
+
+# ----------------- Corpus Index -----------------
+def record_offsets(data: np.ndarray, quoted: bool = False) -> np.ndarray:
+    # Start offset of every record and the end of the file. With quoted (CSV),
+    # a newline inside a quoted field does not end a record.
+    starts = [np.zeros(1, dtype=np.int64)]
+    inside_quotes = 0
+    for block_start in range(0, len(data), INDEX_BLOCK_BYTES):
+        block = data[block_start:block_start + INDEX_BLOCK_BYTES]
+        newlines = np.flatnonzero(block == NEWLINE)
+        if quoted:
+            quotes = np.cumsum(block == QUOTE, dtype=np.int64) + inside_quotes
+            newlines = newlines[quotes[newlines] % 2 == 0]
+            inside_quotes = int(quotes[-1]) % 2
+        starts.append(newlines.astype(np.int64) + block_start + 1)
+    offsets = np.concatenate(starts)
+    if offsets[-1] != len(data):
+        offsets = np.append(offsets, np.int64(len(data)))
+    return offsets
+
+class CorpusIndex:
+    def __init__(self, path: str, index_path: str = None):
+        self.path = path
+        self.csv = path.endswith(".csv")
+        self.data = np.memmap(path, dtype=np.uint8, mode="r") if os.path.getsize(path) else np.zeros(0, dtype=np.uint8)
+        if index_path and os.path.exists(index_path):
+            self.offsets = np.memmap(index_path, dtype=np.int64, mode="r")
+        else:
+            self.offsets = record_offsets(self.data, self.csv)
+            if index_path:
+                tmp_path = index_path + ".tmp"
+                self.offsets.tofile(tmp_path)
+                os.replace(tmp_path, index_path)
+        self.header = next(csv.reader(io.StringIO(self.record(0), newline="")), []) if self.csv and len(self) else []
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def first(self) -> int:
+        # Records before the first document (the CSV header)
+        return 1 if self.csv else 0
+
+    def record(self, i: int) -> str:
+        return self.data[int(self.offsets[i]):int(self.offsets[i + 1])].tobytes().decode("utf-8")
+
+    def documents(self, start: int, stop: int) -> List[Tuple[str, str]]:
+        # Documents of records start..stop-1, numbered as iter_corpus numbers them
+        documents = []
+        for i in range(start, stop):
+            text = self.record(i)
+            if self.csv:
+                row = next(csv.reader(io.StringIO(text, newline="")), [])
+                if row:
+                    documents.append(corpus_document(self.path, dict(zip(self.header, row)), i))
+            elif text.strip():
+                documents.append(corpus_document(self.path, text.strip(), i + 1))
+        return documents
+
+# ----------------- Scorers -----------------
+def engine_rows(documents: List[Tuple[str, str]], versions: List[str], rule_versions: Dict[str, Dict],
+                threads: int) -> List[list]:
+    rows = []
+    for doc_id, scores in run_corpus(documents, versions, rule_versions, threads):
+        for version, criteria in scores.items():
+            for criterion, score in criteria.items():
+                rows.append([doc_id, version, criterion, score])
+    return rows
+
+def matrix_rows(documents: List[Tuple[str, str]], versions: List[str], rule_versions: Dict[str, Dict],
+                threads: int) -> List[list]:
+    # The rows Batch_scoring.py writes, one term matrix per chunk
+    if not documents:
+        return []
+    matrix, columns = build_term_matrix((text for _, text in documents), versions)
+    scores = score_term_matrix(matrix, columns, versions)
+    return [
+        [doc_id, version, criterion, int(values[i])]
+        for i, (doc_id, _) in enumerate(documents)
+        for version, criteria in scores.items() for criterion, values in criteria.items()
+    ]
+
+SCORERS = {
+    "engine": engine_rows,
+    "matrix": matrix_rows
+}
+
+# ----------------- Checkpoints -----------------
+def rules_fingerprint(versions: List[str], rule_versions: Dict[str, Dict] = None) -> str:
+    # Stable across processes: sets are sorted and other objects (compiled
+    # indexes) contribute only their type
+    def plain(value):
+        return sorted(value) if isinstance(value, (set, frozenset)) else type(value).__name__
+    rules = {name: (rule_versions or RULE_VERSIONS)[name] for name in versions}
+    encoded = json.dumps(rules, sort_keys=True, default=plain, ensure_ascii=False)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()[:12]
+
+def write_atomic(path: str, data: bytes) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def csv_bytes(rows: List[list]) -> bytes:
+    buffer = io.StringIO(newline="")
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+def clear_work_files(work_dir: str) -> None:
+    for name in os.listdir(work_dir):
+        if WORK_FILE.fullmatch(name):
+            os.remove(os.path.join(work_dir, name))
+
+def read_checkpoint(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+# ----------------- Resumable Runs -----------------
+def run_resumable(corpus: str, output: str, versions: List[str], rule_versions: Dict[str, Dict] = None,
+                  scorer: str = "engine", chunk_size: int = 10000, threads: int = 1, work_dir: str = None,
+                  restart: bool = False) -> Dict[str, int]:
+    work_dir = work_dir or output + ".work"
+    checkpoint_path = os.path.join(work_dir, "checkpoint.json")
+    created = not os.path.isdir(work_dir)
+    if restart and not created:
+        created = (read_checkpoint(checkpoint_path) or {}).get("created_work_dir", False)
+        clear_work_files(work_dir)
+    os.makedirs(work_dir, exist_ok=True)
+
+    stat = os.stat(corpus)
+    job = {
+        "corpus": os.path.abspath(corpus),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "versions": versions,
+        "rules": rules_fingerprint(versions, rule_versions),
+        "lemmatizer": engine._lemma_backend,
+        "scorer": scorer,
+        "chunk_size": chunk_size
+    }
+    checkpoint = read_checkpoint(checkpoint_path)
+    if checkpoint is not None and checkpoint["job"] != job:
+        changed = sorted(key for key in job if checkpoint["job"].get(key) != job[key])
+        sys.exit(f"{work_dir} belongs to a job with different {', '.join(changed)}; "
+                 "rerun with --restart to start over.")
+    if checkpoint is None:
+        # A work directory without a checkpoint has no finished chunks, and its index may be stale
+        foreign = sorted(name for name in os.listdir(work_dir) if not WORK_FILE.fullmatch(name))
+        if foreign:
+            sys.exit(f"{work_dir} holds files this job did not write ({', '.join(foreign[:3])}); "
+                     "use an empty or new --work-dir.")
+        clear_work_files(work_dir)
+        checkpoint = {"job": job, "done": [], "documents": 0, "created_work_dir": created}
+
+    index = CorpusIndex(corpus, os.path.join(work_dir, "index.bin"))
+    bounds = list(range(index.first, len(index), chunk_size))
+    done = set(checkpoint["done"])
+    counts = {"chunks": len(bounds), "skipped": len(done), "scored": 0, "documents": checkpoint["documents"]}
+
+    scored = 0
+    start = time.perf_counter()
+    for chunk, first in enumerate(bounds):
+        chunk_path = os.path.join(work_dir, f"chunk-{chunk:06d}.csv")
+        if chunk in done and os.path.exists(chunk_path):
+            continue
+        documents = index.documents(first, min(first + chunk_size, len(index)))
+        write_atomic(chunk_path, csv_bytes(SCORERS[scorer](documents, versions, rule_versions, threads)))
+        done.add(chunk)
+        counts["scored"] += 1
+        counts["documents"] += len(documents)
+        checkpoint.update(done=sorted(done), documents=counts["documents"])
+        write_atomic(checkpoint_path, json.dumps(checkpoint, indent=1).encode("utf-8"))
+        scored += len(documents)
+        print(f"chunk {chunk + 1}/{len(bounds)}: {len(documents)} documents "
+              f"({scored / (time.perf_counter() - start):.0f}/s)", file=sys.stderr)
+
+    tmp_output = output + ".tmp"
+    with open(tmp_output, "wb") as out:
+        out.write(csv_bytes([["doc_id", "version", "criterion", "score"]]))
+        for chunk in range(len(bounds)):
+            with open(os.path.join(work_dir, f"chunk-{chunk:06d}.csv"), "rb") as f:
+                shutil.copyfileobj(f, out)
+    os.replace(tmp_output, output)
+    # Release the memory-mapped index before its file goes
+    del index
+    clear_work_files(work_dir)
+    if checkpoint.get("created_work_dir") and not os.listdir(work_dir):
+        os.rmdir(work_dir)
+    return counts
+
+# ----------------- CLI -----------------
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Score a large corpus in checkpointed chunks that survive restarts.")
+    parser.add_argument("corpus", help="JSONL with 'id' and 'description', CSV with those columns, or one description per line.")
+    parser.add_argument("output", help="CSV file for per-document scores (doc_id, version, criterion, score).")
+    parser.add_argument("--versions", nargs="+", choices=list(RULE_VERSIONS), default=ENGLISH_VERSIONS)
+    parser.add_argument("--scorer", choices=list(SCORERS), default="engine",
+                        help="engine: Assessment_engine tiers; matrix: the Batch_scoring term matrix per chunk.")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Records per chunk and checkpoint.")
+    parser.add_argument("--threads", type=int, default=1, help="Scoring threads (engine scorer).")
+    parser.add_argument("--lemmatizer", choices=["wordnet", "table"])
+    parser.add_argument("--typo-tolerance", type=int, choices=[0, 1, 2], default=0,
+                        help="Correct misspelled rule words up to this many edits before matching (engine scorer).")
+    parser.add_argument("--work-dir", help="Chunk and checkpoint directory (default: <output>.work).")
+    parser.add_argument("--restart", action="store_true", help="Discard the finished chunks of an earlier run.")
+    args = parser.parse_args(argv)
+    if args.typo_tolerance and args.scorer != "engine":
+        parser.error("--typo-tolerance needs the engine scorer")
+    if args.lemmatizer:
+        set_lemmatizer(args.lemmatizer)
+    rule_versions = None
+    if args.typo_tolerance:
+        rule_versions = {name: {**rules, "typo_tolerance": args.typo_tolerance} for name, rules in RULE_VERSIONS.items()}
+
+    start = time.perf_counter()
+    counts = run_resumable(args.corpus, args.output, args.versions, rule_versions, args.scorer, args.chunk_size,
+                           args.threads, args.work_dir, args.restart)
+    print(f"Scored {counts['documents']} documents in {counts['chunks']} chunks "
+          f"({counts['skipped']} finished before this run) in {time.perf_counter() - start:.1f}s; "
+          f"scores in {args.output}")
+
+if __name__ == "__main__":
+    main()
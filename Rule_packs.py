@@ -0,0 +1,258 @@
+from typing import Dict, Tuple, List, Iterable
+import argparse
+import csv
+import hashlib
+import json
+import os
+import pickle
+import sys
+import threading
+import time
+
+import Assessment_engine as engine
+from Assessment_engine import (
+    RULE_VERSIONS, ENGINES, LANGUAGE_VERSIONS, LEMMA_TABLE_PATH, iter_corpus,
+    build_spelling_index, rule_vocabulary, vocabulary_fingerprint, word_pattern, reverse_synonyms
+)
+
+# Rule packs: rule versions as data files.
+# A pack is a JSON file of rule versions in the RULE_VERSIONS layout. Tables
+# shared between versions are written once under "tables" and referenced as
+# "@name":
+#
+#   {"name": "current",
+#    "tables": {"maintenance_weights": {"bench": 2, ...}, ...},
+#    "versions": {"maintenance_3": {"engine": "maintenance", "weights": "@maintenance_weights", ...}}}
+#
+# Compiling a pack validates it, resolves the tables, adds the lemma table
+# entries for its vocabulary, builds the typo-correction index over it (used
+# by versions with "typo_tolerance") and lists every term whose regex the
+# engines will need. The result is pickled under rules/.compiled/<content hash>.pickle,
+# so a pack is compiled once per content, by whoever loads it first.
+#
+# LiveRules serves a pack: a background thread watches the file, loads and
+# warms the new compiled pack off the request path, then swaps it in with one
+# attribute assignment. Requests read the pack reference once, so each request
+# is scored entirely with either the old or the new rules.
+#
+#   python Rule_packs.py export rules/current.json
+#   python Rule_packs.py compile rules/current.json
+#   python Rule_packs.py score rules/current.json corpus.jsonl --output scores.csv
+
+RULE_PACK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules")
+COMPILED_DIR = os.path.join(RULE_PACK_DIR, ".compiled")
+COMPILER_VERSION = 3
+
+# ----------------- Export -----------------
+def _shared_tables() -> Dict[int, str]:
+    # Engine constants such as MAINTENANCE_WEIGHTS become named tables
+    return {
+        id(value): name.lower() for name, value in vars(engine).items()
+        if name.isupper() and isinstance(value, (dict, list)) and name not in ("RULE_VERSIONS", "LANGUAGE_VERSIONS")
+    }
+
+def export_rule_pack(path: str, versions: Iterable[str], name: str = None) -> Dict:
+    shared = _shared_tables()
+    tables = {}
+    pack_versions = {}
+    for version in versions:
+        rules = {}
+        for key, value in RULE_VERSIONS[version].items():
+            if id(value) in shared:
+                tables[shared[id(value)]] = value
+                value = "@" + shared[id(value)]
+            rules[key] = value
+        pack_versions[version] = rules
+    pack = {"name": name or os.path.splitext(os.path.basename(path))[0], "tables": tables, "versions": pack_versions}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(pack, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+    return pack
+
+# ----------------- Compile -----------------
+def resolve_pack(pack: Dict) -> Dict[str, Dict]:
+    tables = pack.get("tables", {})
+    versions = {}
+    for version, rules in pack["versions"].items():
+        if rules.get("engine") not in ENGINES:
+            raise ValueError(f"Rule pack version {version}: unknown engine {rules.get('engine')!r}")
+        resolved = {}
+        for key, value in rules.items():
+            if isinstance(value, str) and value.startswith("@"):
+                if value[1:] not in tables:
+                    raise ValueError(f"Rule pack version {version}: unknown table {value}")
+                value = tables[value[1:]]
+            resolved[key] = value
+        # Every key the built-in versions of this engine use must be present
+        required = {
+            key for builtin in RULE_VERSIONS.values() if builtin["engine"] == rules["engine"]
+            for key in builtin if key not in ("source", "language")
+        }
+        missing = required - set(resolved)
+        if missing:
+            raise ValueError(f"Rule pack version {version}: missing {', '.join(sorted(missing))}")
+        versions[version] = resolved
+    return versions
+
+def pack_lemma_table(versions: Dict[str, Dict]) -> Dict:
+    # Lemma table for the pack vocabulary: the shipped table when the
+    # vocabulary is unchanged, otherwise built from WordNet at compile time
+    with open(LEMMA_TABLE_PATH, encoding="utf-8") as f:
+        shipped = json.load(f)
+    if shipped["vocabulary_hash"] == vocabulary_fingerprint(versions) or not rule_vocabulary(versions) - rule_vocabulary():
+        return shipped
+    try:
+        from Lemma_table import build_lemma_table
+        return build_lemma_table(versions)
+    except (ImportError, LookupError) as e:
+        print(f"Warning: WordNet unavailable ({e}); new pack words are not lemmatized by the table backend.", file=sys.stderr)
+        return shipped
+
+def pattern_terms(versions: Dict[str, Dict]) -> List[str]:
+    # Terms passed to word_pattern by the engines
+    terms = set()
+    for rules in versions.values():
+        terms.update(engine._rule_strings([
+            value for key, value in rules.items() if key not in ("engine", "source", "proximity", "rounding", "language")
+        ]))
+    return sorted(terms)
+
+def compile_rule_pack(source: bytes) -> Dict:
+    versions = resolve_pack(json.loads(source.decode("utf-8")))
+    terms = pattern_terms(versions)
+    lemma_table = pack_lemma_table(versions)
+    spelling = build_spelling_index(versions, lemma_table.get("near_words", []))
+    # One shared index, pickled once, is referenced by every version
+    versions = {name: {**rules, "spelling_index": spelling} for name, rules in versions.items()}
+    return {
+        "compiler": COMPILER_VERSION,
+        "versions": versions,
+        "lemmas": lemma_table["lemmas"],
+        "terms": terms
+    }
+
+def load_rule_pack(path: str) -> Dict:
+    with open(path, "rb") as f:
+        source = f.read()
+    digest = hashlib.sha256(source + f"compiler-{COMPILER_VERSION}".encode()).hexdigest()[:16]
+    compiled_path = os.path.join(COMPILED_DIR, f"{digest}.pickle")
+    if os.path.exists(compiled_path):
+        with open(compiled_path, "rb") as f:
+            compiled = pickle.load(f)
+    else:
+        compiled = compile_rule_pack(source)
+        os.makedirs(COMPILED_DIR, exist_ok=True)
+        tmp_path = f"{compiled_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(compiled, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, compiled_path)
+    compiled["hash"] = digest
+    compiled["path"] = path
+    return compiled
+
+def warm_rule_pack(compiled: Dict) -> None:
+    # Builds every cached structure the pack needs before it serves requests
+    engine.extend_lemma_table(compiled["lemmas"])
+    for term in compiled["terms"]:
+        word_pattern(term)
+        word_pattern(term, True)
+    for rules in compiled["versions"].values():
+        if "synonym_map" in rules:
+            reverse_synonyms(rules["synonym_map"])
+    engine.get_stop_words()
+
+# ----------------- Live Rules -----------------
+def _file_stamp(path: str) -> Tuple[float, int]:
+    stat = os.stat(path)
+    return stat.st_mtime, stat.st_size
+
+class LiveRules:
+    def __init__(self, path: str, interval: float = 2.0):
+        self.path = path
+        self.interval = interval
+        self.pack = load_rule_pack(path)
+        warm_rule_pack(self.pack)
+        self._stamp = _file_stamp(path)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> "LiveRules":
+        self._thread = threading.Thread(target=self._watch, name="rule-pack-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def reload(self) -> bool:
+        stamp = _file_stamp(self.path)
+        if stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        pack = load_rule_pack(self.path)
+        if pack["hash"] == self.pack["hash"]:
+            return False
+        warm_rule_pack(pack)
+        self.pack = pack
+        return True
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                if self.reload():
+                    print(f"Loaded rule pack {self.path} ({self.pack['hash']})")
+            except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+                # A broken pack keeps the previous rules in service
+                print(f"Rule pack {self.path} not loaded: {e}", file=sys.stderr)
+
+    def score(self, text: str, versions: Iterable[str] = None, score_only: bool = False) -> Dict[str, object]:
+        pack = self.pack
+        return engine.score_document(text, versions or list(pack["versions"]), rule_versions=pack["versions"],
+                                     score_only=score_only)
+
+# ----------------- CLI -----------------
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Export, compile and score with rule packs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="Write built-in rule versions as a rule pack.")
+    export.add_argument("pack")
+    export.add_argument("--versions", nargs="+", choices=list(RULE_VERSIONS),
+                        default=[name for versions in LANGUAGE_VERSIONS.values() for name in versions.values()])
+    compile_command = commands.add_parser("compile", help="Compile a rule pack into the on-disk cache.")
+    compile_command.add_argument("pack")
+    score = commands.add_parser("score", help="Score a corpus with a rule pack.")
+    score.add_argument("pack")
+    score.add_argument("corpus")
+    score.add_argument("--versions", nargs="+")
+    score.add_argument("--output", help="CSV file for per-document scores (doc_id, version, criterion, score).")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        pack = export_rule_pack(args.pack, args.versions)
+        print(f"Exported {len(pack['versions'])} versions and {len(pack['tables'])} tables to {args.pack}")
+        return
+
+    start = time.perf_counter()
+    live = LiveRules(args.pack)
+    print(f"Rule pack {args.pack} ({live.pack['hash']}): {len(live.pack['versions'])} versions, "
+          f"{len(live.pack['terms'])} terms, ready in {time.perf_counter() - start:.2f}s")
+    if args.command == "compile":
+        return
+
+    versions = args.versions or list(live.pack["versions"])
+    with open(args.output, "w", newline="", encoding="utf-8") if args.output else open(os.devnull, "w") as out_file:
+        writer = csv.writer(out_file)
+        writer.writerow(["doc_id", "version", "criterion", "score"])
+        count = 0
+        for doc_id, text in iter_corpus(args.corpus):
+            for version, scores in live.score(text, versions, score_only=True).items():
+                for criterion, value in scores.items():
+                    writer.writerow([doc_id, version, criterion, value])
+            count += 1
+    print(f"Scored {count} documents with {len(versions)} versions.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+from typing import Dict, Tuple, List, Iterator
+import argparse
+import csv
+import hashlib
+import json
+import os
+import time
+from itertools import product
+
+import numpy as np
+from scipy import sparse
+
+from Assessment_engine import RULE_VERSIONS, iter_corpus
+from Batch_scoring import Column, MATRIX_RULES, aggregate, build_term_matrix
+
+# Threshold and weight sensitivity sweeps.
+# The corpus is matched once and its term matrix cached next to it (or read
+# from a Feature_export store). Documents with identical match rows are
+# collapsed into one weighted row, weight settings are applied with one sparse
+# product each, and threshold settings are broadcast as arrays through the
+# tier rules in Batch_scoring, so a grid of thousands of settings yields its
+# score distribution tables in seconds.
+#
+#   python Sensitivity_sweep.py corpus.jsonl --version maintenance_3 \
+#       --param effort_thresholds.0=14:26 --param effort_thresholds.1=6:16 \
+#       --param weights.bench=1,2,3 --output sweep.csv
+
+WEIGHT_TABLES = ("weights", "vegetation_weights")
+
+# ----------------- Feature Cache -----------------
+def rules_fingerprint(versions: List[str]) -> str:
+    payload = json.dumps([[name, RULE_VERSIONS[name]] for name in versions], sort_keys=True, default=list)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+def load_term_matrix(source: str, versions: List[str]) -> Tuple[sparse.csr_matrix, List[Column]]:
+    if os.path.isdir(source):
+        from Feature_export import FeatureStore
+        return FeatureStore(source).term_matrix()
+
+    cache = f"{source}.{rules_fingerprint(versions)}.terms.npz"
+    if os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(source):
+        with np.load(cache, allow_pickle=False) as f:
+            matrix = sparse.csr_matrix((f["data"], f["indices"], f["indptr"]), shape=tuple(f["shape"]))
+            columns = [tuple(column) for column in json.loads(str(f["columns"]))]
+        return matrix, columns
+
+    matrix, columns = build_term_matrix((text for _, text in iter_corpus(source)), versions)
+    with open(cache + ".tmp", "wb") as f:
+        np.savez(f, data=matrix.data, indices=matrix.indices, indptr=matrix.indptr,
+                 shape=np.asarray(matrix.shape), columns=json.dumps(columns))
+    os.replace(cache + ".tmp", cache)
+    return matrix, columns
+
+def compress_rows(matrix: sparse.csr_matrix, columns: List[Column], version: str) -> Tuple[sparse.csr_matrix, np.ndarray, np.ndarray, List[Column]]:
+    # Collapse documents with identical match rows for this version into
+    # (unique rows, count per unique row, unique row of every document).
+    # Rows are grouped by two random projections, then the grouping is checked exactly.
+    keep = [i for i, column in enumerate(columns) if column[0] == version]
+    sub = sparse.csr_matrix(matrix)[:, keep]
+    projections = sub @ np.random.default_rng(0).random((len(keep), 2))
+    keys = projections[:, 0] + 1j * projections[:, 1]
+    _, first, inverse, counts = np.unique(keys, return_index=True, return_inverse=True, return_counts=True)
+    unique = sub[first]
+    if (sub - unique[inverse.ravel()]).count_nonzero():
+        rows, inverse, counts = np.unique(sub.toarray(), axis=0, return_inverse=True, return_counts=True)
+        unique = sparse.csr_matrix(rows)
+    return unique, counts.astype(np.int64), inverse.ravel(), [columns[i] for i in keep]
+
+# ----------------- Parameter Grid -----------------
+def parse_values(spec: str) -> List[float]:
+    if ":" in spec:
+        parts = [float(p) for p in spec.split(":")]
+        start, stop = parts[0], parts[1]
+        step = parts[2] if len(parts) > 2 else 1
+        return list(np.round(np.arange(start, stop + step / 2, step), 6))
+    return [float(v) for v in spec.split(",")]
+
+def parse_param(text: str) -> Tuple[str, List[float]]:
+    path, values = text.split("=", 1)
+    return path, parse_values(values)
+
+def override(rules: Dict, path: str, value) -> Dict:
+    # "effort_thresholds.1" replaces an item of a tuple, "weights.bench" a dict entry
+    key, _, item = path.partition(".")
+    rules = dict(rules)
+    if not item:
+        rules[key] = value
+    elif isinstance(rules[key], dict):
+        rules[key] = {**rules[key], item: value}
+    else:
+        values = list(rules[key])
+        values[int(item)] = value
+        rules[key] = tuple(values)
+    return rules
+
+def split_grid(params: List[Tuple[str, List[float]]]) -> Tuple[List[Tuple[str, List[float]]], List[Tuple[str, List[float]]]]:
+    weights = [p for p in params if p[0].split(".")[0] in WEIGHT_TABLES]
+    thresholds = [p for p in params if p[0].split(".")[0] not in WEIGHT_TABLES]
+    return weights, thresholds
+
+# ----------------- Sweep -----------------
+def score_grid(unique: sparse.csr_matrix, version_columns: List[Column], version: str,
+               params: List[Tuple[str, List[float]]]) -> Iterator[Tuple[List[Dict[str, float]], Dict[str, np.ndarray]]]:
+    # Yields (settings, {criterion: scores of shape (unique rows, len(settings))}) per weight setting
+    base = RULE_VERSIONS[version]
+    aggregates, scores = MATRIX_RULES[base["engine"]]
+    weight_params, threshold_params = split_grid(params)
+
+    threshold_grid = list(product(*(values for _, values in threshold_params))) or [()]
+    for weight_setting in product(*(values for _, values in weight_params)):
+        rules = base
+        for (path, _), value in zip(weight_params, weight_setting):
+            rules = override(rules, path, value)
+        a = {name: values[:, None] for name, values in aggregate(unique, version_columns, version, aggregates(rules)).items()}
+
+        # Broadcast every threshold setting as a (1, g) array through the tier rules
+        for i, (path, _) in enumerate(threshold_params):
+            rules = override(rules, path, np.asarray([setting[i] for setting in threshold_grid])[None, :])
+        result = {
+            criterion: np.broadcast_to(values, (unique.shape[0], len(threshold_grid)))
+            for criterion, values in scores(a, rules).items()
+        }
+
+        settings = []
+        for threshold_setting in threshold_grid:
+            setting = dict(zip((p for p, _ in weight_params), weight_setting))
+            setting.update(zip((p for p, _ in threshold_params), threshold_setting))
+            settings.append(setting)
+        yield settings, result
+
+def sweep(matrix: sparse.csr_matrix, columns: List[Column], version: str,
+          params: List[Tuple[str, List[float]]]) -> Iterator[Tuple[Dict[str, float], Dict[str, np.ndarray]]]:
+    # Yields (setting, {criterion: [n_score_1, n_score_2, n_score_3]}) for every grid point
+    unique, counts, _, version_columns = compress_rows(matrix, columns, version)
+    for settings, result in score_grid(unique, version_columns, version, params):
+        distributions = {
+            criterion: np.stack([counts @ (values == s) for s in (1, 2, 3)], axis=1)
+            for criterion, values in result.items()
+        }
+        for g, setting in enumerate(settings):
+            yield setting, {criterion: table[g] for criterion, table in distributions.items()}
+
+# ----------------- CLI -----------------
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Re-score a matched corpus over a grid of thresholds and weights.")
+    parser.add_argument("source", help="Corpus file (matched once and cached) or a Feature_export directory.")
+    parser.add_argument("--version", choices=list(RULE_VERSIONS), required=True)
+    parser.add_argument("--param", action="append", default=[], type=parse_param,
+                        help="path=values, e.g. effort_thresholds.0=10:30, diversity_threshold=8:16:0.5, weights.bench=1,2,3")
+    parser.add_argument("--output", help="CSV file for the distribution table.")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    matrix, columns = load_term_matrix(args.source, [args.version])
+    loaded = time.perf_counter()
+
+    paths = [path for path, _ in args.param]
+    out_file = open(args.output, "w", newline="", encoding="utf-8") if args.output else None
+    writer = csv.writer(out_file) if out_file else None
+    if writer:
+        writer.writerow(paths + ["criterion", "score_1", "score_2", "score_3", "mean_score"])
+    settings = 0
+    try:
+        for setting, distributions in sweep(matrix, columns, args.version, args.param):
+            settings += 1
+            if writer:
+                for criterion, table in distributions.items():
+                    total = table.sum()
+                    mean = (table * np.array([1, 2, 3])).sum() / total if total else 0
+                    writer.writerow([setting[p] for p in paths] + [criterion, *map(int, table), f"{mean:.4f}"])
+    finally:
+        if out_file:
+            out_file.close()
+
+    print(f"Loaded {matrix.shape[0]} documents in {loaded - start:.2f}s; "
+          f"swept {settings} settings in {time.perf_counter() - loaded:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import streamlit as st
+from Assessment_engine import MAX_INPUT_CHARS
 from typing import Dict
 import re
 
@@ -137,7 +138,7 @@ st.title("💧 Stormwater Infiltration & Retention Assessment Tool")
 
 st.markdown("Describe a landscape and assess its potential for stormwater infiltration and retention based on surface types, vegetation, and vegetation density.")
 
-description = st.text_area("📝 Enter your landscape description:", height=250)
+description = st.text_area("📝 Enter your landscape description:", height=250, max_chars=MAX_INPUT_CHARS)
 
 if st.button("💧 Assess Stormwater Infiltration"):
     if description.strip():
@@ -1,7 +1,10 @@
 import streamlit as st
-from typing import Dict
+from Assessment_engine import MAX_INPUT_CHARS
+from typing import Dict, List, Tuple
 import re
 import string
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
 
 # ----------------- Surface Categories -----------------
 surface_types = {
@@ -32,6 +35,14 @@ synonym_map = {
     "single tree": "isolated tree", "several trees": "tree cluster", "dense tree cluster": "tree cluster", "trees cluster": "tree cluster"
 }
 
+# Density keywords and multipliers (earlier entries win when several share a window)
+density_map = {
+    "sparse": 0.5, "scattered": 0.5, "patchy": 0.5, "thin": 0.5,
+    "moderate": 0.5, "some": 0.5, "few": 0.5,
+    "dense": 1, "thick": 1, "lush": 1, "abundant": 1
+}
+density_rank = {term: rank for rank, term in enumerate(density_map)}
+
 def normalize_text(text: str) -> str:
     for syn, standard in synonym_map.items():
         text = re.sub(rf"\b{re.escape(syn)}\b", standard, text.lower())
@@ -55,6 +66,35 @@ def keywords_nearby(text: str, phrase1: str, phrase2: str, max_distance: int = 1
                 return True
     return False
 
+# ----------------- Density Context Index -----------------
+def build_density_index(description: str) -> Tuple[Dict[str, List[int]], List[int], List[str]]:
+    # One pass over the words: positions of every word, plus the sorted
+    # positions of density modifiers so each window becomes a bisect lookup.
+    word_positions = defaultdict(list)
+    density_positions = []
+    density_terms = []
+    for i, word in enumerate(description.lower().split()):
+        word_positions[word].append(i)
+        if word in density_rank:
+            density_positions.append(i)
+            density_terms.append(word)
+    return word_positions, density_positions, density_terms
+
+def get_density_multiplier(index: Tuple[Dict[str, List[int]], List[int], List[str]], veg: str, window_size: int = 6) -> float:
+    word_positions, density_positions, density_terms = index
+    multipliers = []
+
+    for i in word_positions.get(veg.lower().split()[0], []):
+        lo = bisect_left(density_positions, i - window_size)
+        hi = bisect_right(density_positions, i + window_size)
+        if lo < hi:
+            term = min(density_terms[lo:hi], key=density_rank.get)
+            multipliers.append(density_map[term])
+        else:
+            multipliers.append(1.0)
+
+    return max(multipliers) if multipliers else 1.0
+
 # ----------------- Surface Evaluation -----------------
 def evaluate_permeable_balance(surface_counts: Dict[str, int]) -> (int, str):
     permeable = surface_counts["permeable"]
@@ -102,8 +142,9 @@ def evaluate_density(description: str) -> (int, str):
     return 1, "Sparse or low vegetation coverage."
 
 # ----------------- Assessment Logic -----------------
-def assess_stormwater(description: str) -> Dict:
+def assess_stormwater(description: str, density_weighted: bool = False) -> Dict:
     description = normalize_text(description)
+    density_index = build_density_index(description) if density_weighted else None
 
     # ---- Surface Area Assessment ----
     surface_counts = {"permeable": 0, "semi-permeable": 0, "impermeable": 0}
@@ -118,9 +159,14 @@ def assess_stormwater(description: str) -> Dict:
     veg_found = []
     for veg, base_weight in vegetation_weights.items():
         if re.search(rf"\b{re.escape(veg)}\b", description):
-            weighted_score = base_weight
+            if density_weighted:
+                density_multiplier = get_density_multiplier(density_index, veg)
+                weighted_score = base_weight * density_multiplier
+                veg_found.append(f"{veg} (base {base_weight} × density {density_multiplier} = {weighted_score})")
+            else:
+                weighted_score = base_weight
+                veg_found.append(f"{veg} (weight {base_weight})")
             veg_score_raw += weighted_score
-            veg_found.append(f"{veg} (weight {base_weight})")
 
     # Normalize based on a reasonable diversity threshold 
     diversity_threshold = 12
@@ -153,11 +199,12 @@ st.title("💧 Stormwater Infiltration & Retention Assessment Tool")
 
 st.markdown("Describe a landscape and assess its potential for stormwater infiltration and retention based on surface types, vegetation, and vegetation density.")
 
-description = st.text_area("📝 Enter your landscape description:", height=250)
+description = st.text_area("📝 Enter your landscape description:", height=250, max_chars=MAX_INPUT_CHARS)
+density_weighted = st.checkbox("Weight vegetation by nearby density words (sparse, dense, lush, ...)")
 
 if st.button("💧 Assess Stormwater Infiltration"):
     if description.strip():
-        results = assess_stormwater(description)
+        results = assess_stormwater(description, density_weighted=density_weighted)
         st.subheader("🔎 Assessment Results")
         st.markdown(f"**Permeable Surface Area**: Score {results['permeable_surface']['score']} — {results['permeable_surface']['comment']}")
         st.markdown(f"**Vegetation for Water Retention**: Score {results['vegetation_retention']['score']} — {results['vegetation_retention']['comment']}")
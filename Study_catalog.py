@@ -0,0 +1,94 @@
+from typing import Dict, List, Optional, Tuple
+import glob
+import io
+import json
+import os
+
+import streamlit as st
+from PIL import Image
+
+from Image_identity import get_image_index
+
+# Study mode for the image evaluators.
+# A study is a directory of photos, or a JSON manifest
+#
+#   {"name": "Workshop 2", "images": ["photos/park.jpg", "photos/yard.png"]}
+#
+# with paths relative to the manifest. It is chosen with the STUDY_PATH
+# environment variable or the ?study=<name> URL parameter, which looks for
+# studies/<name>/ or studies/<name>.json. The photos are read, registered in
+# the image index and resized to display and preview JPEGs once per process
+# (st.cache_resource); every session shares those bytes read-only, so
+# participants start rating without uploading anything. Only the resized
+# copies are kept: the index stores hashes, and each original is decoded once
+# and released before the next photo is read.
+
+STUDIES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "studies")
+STUDY_IMAGE_TYPES = ("*.jpg", "*.jpeg", "*.png")
+DISPLAY_SIZE = 1600
+PREVIEW_SIZE = 360
+
+def study_source() -> Optional[str]:
+    path = os.environ.get("STUDY_PATH")
+    if path:
+        return path
+    name = st.query_params.get("study")
+    if not name or os.path.basename(name) != name:
+        return None
+    for candidate in (os.path.join(STUDIES_DIR, name), os.path.join(STUDIES_DIR, f"{name}.json")):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+def study_files(source: str) -> Tuple[str, List[str]]:
+    if os.path.isdir(source):
+        paths = sorted(p for pattern in STUDY_IMAGE_TYPES for p in glob.glob(os.path.join(source, pattern)))
+        return os.path.basename(os.path.normpath(source)), paths
+    with open(source, encoding="utf-8") as f:
+        manifest = json.load(f)
+    base = os.path.dirname(os.path.abspath(source))
+    paths = [os.path.join(base, path) for path in manifest["images"]]
+    return manifest.get("name", os.path.splitext(os.path.basename(source))[0]), paths
+
+def study_stamp(source: str) -> float:
+    # Changes when the manifest or any photo changes, so the cached study reloads
+    _, paths = study_files(source)
+    return max([os.path.getmtime(source)] + [os.path.getmtime(p) for p in paths])
+
+def decode_reduced(data: bytes, max_side: int) -> Image.Image:
+    image = Image.open(io.BytesIO(data))
+    image.draft("RGB", (max_side, max_side))
+    image = image.convert("RGB")
+    image.thumbnail((max_side, max_side))
+    return image
+
+def jpeg_bytes(image: Image.Image, max_side: int) -> bytes:
+    image = image.copy()
+    image.thumbnail((max_side, max_side))
+    out = io.BytesIO()
+    image.save(out, "JPEG", quality=85)
+    return out.getvalue()
+
+@st.cache_resource(show_spinner="Loading study images...")
+def load_study(source: str, stamp: float) -> Dict:
+    name, paths = study_files(source)
+    index = get_image_index()
+    image_ids, images, previews = [], [], []
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        image_id = index.register(data, os.path.basename(path))
+        if image_id in image_ids:
+            continue
+        image_ids.append(image_id)
+        # The preview is cut from the display-size decode instead of decoding the original again
+        display = decode_reduced(data, DISPLAY_SIZE)
+        images.append(jpeg_bytes(display, DISPLAY_SIZE))
+        previews.append(jpeg_bytes(display, PREVIEW_SIZE))
+    return {"name": name, "image_ids": tuple(image_ids), "images": tuple(images), "previews": tuple(previews)}
+
+def current_study() -> Optional[Dict]:
+    source = study_source()
+    if source is None:
+        return None
+    return load_study(source, study_stamp(source))
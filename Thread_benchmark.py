@@ -0,0 +1,64 @@
+from typing import Dict, List, Tuple
+import argparse
+import sys
+import sysconfig
+import time
+
+from Assessment_engine import RULE_VERSIONS, ENGLISH_VERSIONS, initialize, iter_corpus, run_corpus, set_lemmatizer
+
+# Thread scaling benchmark for the batch scorer.
+# Scores the same corpus with run_corpus at each thread count and reports
+# documents per second and the speedup over one thread, after checking that
+# every thread count produced the same scores as the single-threaded run.
+# On a standard (GIL) build the speedup stays near 1; on a free-threaded
+# build (python3.13t, Py_GIL_DISABLED) it should grow with the cores.
+#
+#   python Thread_benchmark.py corpus.jsonl --threads 1 2 4 8
+#   python3.13t Thread_benchmark.py corpus.jsonl --lemmatizer table
+#   PYTHON_GIL=1 python3.13t Thread_benchmark.py corpus.jsonl   # same build with the GIL back on
+
+def interpreter() -> str:
+    free_threaded = bool(sysconfig.get_config_var("Py_GIL_DISABLED"))
+    gil_check = getattr(sys, "_is_gil_enabled", None)
+    gil = "enabled" if gil_check is None or gil_check() else "disabled"
+    return f"Python {sys.version.split()[0]} ({'free-threaded' if free_threaded else 'standard'} build, GIL {gil})"
+
+def time_run(documents: List[Tuple[str, str]], versions: List[str], threads: int) -> Tuple[float, List]:
+    start = time.perf_counter()
+    rows = list(run_corpus(documents, versions, threads=threads))
+    return time.perf_counter() - start, rows
+
+# ----------------- CLI -----------------
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Measure how batch scoring scales with threads.")
+    parser.add_argument("corpus", help="Text file with one description per line, or JSONL with 'id' and 'description'.")
+    parser.add_argument("--threads", nargs="+", type=int, default=[1, 2, 4, 8])
+    parser.add_argument("--versions", nargs="+", choices=list(RULE_VERSIONS), default=ENGLISH_VERSIONS)
+    parser.add_argument("--lemmatizer", choices=["wordnet", "table"])
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per thread count; the fastest is reported.")
+    parser.add_argument("--limit", type=int, help="Use only the first documents of the corpus.")
+    args = parser.parse_args(argv)
+    if args.lemmatizer:
+        set_lemmatizer(args.lemmatizer)
+
+    documents = list(iter_corpus(args.corpus))[:args.limit]
+    initialize(args.versions)
+    # Warm-up: fills the lemma cache so every thread count starts from the same state
+    _, expected = time_run(documents, args.versions, 1)
+
+    print(f"{interpreter()}; {len(documents)} documents, {len(args.versions)} rule versions, best of {args.repeat}")
+    print(f"{'threads':>8}{'seconds':>10}{'docs/s':>10}{'speedup':>10}")
+    results: Dict[int, float] = {}
+    for threads in args.threads:
+        best = None
+        for _ in range(args.repeat):
+            seconds, rows = time_run(documents, args.versions, threads)
+            if rows != expected:
+                sys.exit(f"{threads} threads produced different scores than one thread")
+            best = seconds if best is None else min(best, seconds)
+        results[threads] = best
+        baseline = results.get(1, results[args.threads[0]])
+        print(f"{threads:>8}{best:>10.2f}{len(documents) / best:>10.0f}{baseline / best:>10.2f}")
+
+if __name__ == "__main__":
+    main()
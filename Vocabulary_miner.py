@@ -0,0 +1,240 @@
+from typing import Dict, Iterable, Iterator, List, Tuple
+import argparse
+import csv
+import hashlib
+import re
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+from Assessment_engine import (
+    RULE_VERSIONS, ENGLISH_VERSIONS, NEGATION_TERMS, NUMBER_WORDS, ATTRIBUTE_GRAMMAR_KEYS, _rule_strings, attribute_facts,
+    get_stop_words, iter_corpus, lemmatize
+)
+
+# Unmatched vocabulary mining for the synonym maps and keyword tables.
+# Streams a corpus once and counts the 1-4 word n-grams that no rule of the
+# chosen versions covers: a token is covered when a rule phrase (synonym,
+# keyword, weight or surface term, as written or lemmatized) matches at it
+# or it is part of an attribute statement ("plant mix is quite high") the
+# version's grammar matches, and n-grams touching a covered token, starting or ending with a stop word,
+# or crossing punctuation are skipped. Counts go into a count-min sketch of
+# fixed size and a bounded top-k table keeps the heaviest n-grams with a few
+# example contexts and the rule terms seen next to them, so memory does not
+# grow with the corpus. Counts are sketch estimates (upper bounds).
+#
+#   python Vocabulary_miner.py corpus.jsonl --versions maintenance_2 --output candidates.csv
+
+RULE_META_KEYS = ("engine", "source", "proximity", "rounding", "language")
+CHUNK_SPLIT = re.compile(r"[.,;:!?()\[\]\"\n]+")
+TOKEN_PATTERN = re.compile(r"[a-zäöå][a-zäöå'-]*")
+CONTEXT_WORDS = 6
+MAX_CONTEXT_CHARS = 160
+
+# ----------------- Rule Coverage -----------------
+def covering_value(value):
+    # An attribute grammar covers its subjects and canonical statements; its
+    # verbs, fillers and bare values ("high", "wide", "here") are covered only
+    # inside a matched statement (statement_coverage)
+    if isinstance(value, dict) and value.keys() == ATTRIBUTE_GRAMMAR_KEYS:
+        return [list(value["subjects"]), [statement for table in value["statements"].values() for statement in table.values()]]
+    return value
+
+def rule_phrases(versions: Iterable[str]) -> Dict[str, List[Tuple[str, ...]]]:
+    # Rule phrases as token tuples (surface and lemma forms), indexed by first token, longest first
+    phrases = set()
+    for name in versions:
+        values = [covering_value(value) for key, value in RULE_VERSIONS[name].items() if key not in RULE_META_KEYS]
+        for text in _rule_strings([values, NEGATION_TERMS, list(NUMBER_WORDS)]):
+            tokens = tuple(TOKEN_PATTERN.findall(text.lower()))
+            if tokens:
+                phrases.add(tokens)
+                phrases.add(tuple(lemmatize(token) for token in tokens))
+    index = {}
+    for phrase in sorted(phrases, key=len, reverse=True):
+        index.setdefault(phrase[0], []).append(phrase)
+    return index
+
+def covered_tokens(tokens: List[str], lemmas: List[str], index: Dict[str, List[Tuple[str, ...]]]) -> Tuple[List[bool], List[str]]:
+    # Which tokens a rule phrase covers, and the rule phrases found
+    covered = [False] * len(tokens)
+    found = []
+    for i in range(len(tokens)):
+        for sequence in (tokens, lemmas):
+            for phrase in index.get(sequence[i], ()):
+                if tuple(sequence[i:i + len(phrase)]) == phrase:
+                    covered[i:i + len(phrase)] = [True] * len(phrase)
+                    found.append(" ".join(phrase))
+                    break
+    return covered, found
+
+def rule_grammars(versions: Iterable[str]) -> List[Dict]:
+    grammars = {}
+    for name in versions:
+        grammar = RULE_VERSIONS[name].get("attribute_statements")
+        if grammar:
+            grammars[id(grammar)] = grammar
+    return list(grammars.values())
+
+def statement_coverage(chunk: str, spans: List[Tuple[int, int]], grammars: List[Dict],
+                       covered: List[bool], found: List[str]) -> None:
+    # Marks the tokens (character spans in chunk) inside matched attribute statements
+    for grammar in grammars:
+        for subject, value, _, start, end in attribute_facts(chunk, grammar):
+            for i, (token_start, token_end) in enumerate(spans):
+                if token_start < end and token_end > start:
+                    covered[i] = True
+            found.append(grammar["statements"][subject][value])
+
+def context_of(tokens: List[str], start: int, end: int) -> str:
+    return " ".join(tokens[max(start - CONTEXT_WORDS, 0):end + CONTEXT_WORDS])[:MAX_CONTEXT_CHARS]
+
+def document_ngrams(text: str, index: Dict[str, List[Tuple[str, ...]]], stop_words: set, max_n: int,
+                    grammars: List[Dict] = ()) -> Iterator[Tuple[str, List[str], int, int, List[str]]]:
+    # (n-gram, chunk tokens, start, end, rule phrases in the chunk) for every uncovered n-gram
+    for chunk in CHUNK_SPLIT.split(text.lower()):
+        matches = list(TOKEN_PATTERN.finditer(chunk))
+        if not matches:
+            continue
+        tokens = [match.group() for match in matches]
+        lemmas = [lemmatize(token) for token in tokens]
+        covered, found = covered_tokens(tokens, lemmas, index)
+        if grammars:
+            statement_coverage(chunk, [match.span() for match in matches], grammars, covered, found)
+        for i in range(len(tokens)):
+            if covered[i] or tokens[i] in stop_words:
+                continue
+            for n in range(1, max_n + 1):
+                end = i + n
+                if end > len(tokens) or covered[end - 1]:
+                    break
+                if tokens[end - 1] in stop_words:
+                    continue
+                yield " ".join(tokens[i:end]), tokens, i, end, found
+
+# ----------------- Sketches -----------------
+class CountMinSketch:
+    def __init__(self, width: int, depth: int):
+        self.width = width
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.rows = np.arange(depth, dtype=np.uint64)
+
+    def indices(self, keys: List[str]) -> np.ndarray:
+        # Double hashing: cell i of a key is h1 + i * h2 (mod width)
+        digests = b"".join(hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest() for key in keys)
+        h = np.frombuffer(digests, dtype=np.uint64).reshape(-1, 2)
+        return ((h[:, :1] + self.rows[None, :] * (h[:, 1:] | np.uint64(1))) % np.uint64(self.width)).astype(np.int64)
+
+    def add(self, keys: List[str], counts: np.ndarray) -> np.ndarray:
+        # Adds the counts and returns the new estimates of the keys
+        cells = self.indices(keys)
+        rows = np.broadcast_to(np.arange(self.table.shape[0]), cells.shape)
+        np.add.at(self.table, (rows, cells), np.broadcast_to(counts[:, None], cells.shape))
+        return self.table[rows, cells].min(axis=1)
+
+class HeavyHitters:
+    def __init__(self, capacity: int, examples: int):
+        self.capacity = capacity
+        self.examples = examples
+        self.counts = {}
+        self.contexts = {}
+        self.rule_terms = {}
+
+    def threshold(self) -> int:
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def offer(self, key: str, estimate: int, context: str, terms: List[str]) -> None:
+        self.counts[key] = estimate
+        contexts = self.contexts.setdefault(key, [])
+        if len(contexts) < self.examples and context not in contexts:
+            contexts.append(context)
+        nearby = self.rule_terms.setdefault(key, Counter())
+        nearby.update(set(terms))
+        if len(nearby) > 20:
+            self.rule_terms[key] = Counter(dict(nearby.most_common(10)))
+        if len(self.counts) > 2 * self.capacity:
+            self.prune()
+
+    def prune(self) -> None:
+        for key in sorted(self.counts, key=self.counts.get, reverse=True)[self.capacity:]:
+            del self.counts[key], self.contexts[key], self.rule_terms[key]
+
+    def ranked(self) -> List[Tuple[str, int]]:
+        self.prune()
+        return sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))
+
+# ----------------- Mining -----------------
+def mine(texts: Iterable[str], versions: List[str], max_n: int = 4, width: int = 1 << 20, depth: int = 4,
+         top: int = 500, examples: int = 3, batch_size: int = 1000, log_every: int = 100000) -> Tuple[HeavyHitters, int]:
+    index = rule_phrases(versions)
+    grammars = rule_grammars(versions)
+    stop_words = get_stop_words()
+    sketch = CountMinSketch(width, depth)
+    # Twice the output size is tracked so late risers can still enter the top list
+    hitters = HeavyHitters(2 * top, examples)
+
+    def flush(batch_counts: Counter, batch_first: Dict[str, Tuple[str, List[str]]]) -> None:
+        keys = list(batch_counts)
+        estimates = sketch.add(keys, np.fromiter(batch_counts.values(), dtype=np.int64, count=len(keys)))
+        threshold = hitters.threshold()
+        for key, estimate in zip(keys, estimates.tolist()):
+            if key in hitters.counts or estimate > threshold:
+                hitters.offer(key, estimate, *batch_first[key])
+
+    documents = 0
+    batch_counts = Counter()
+    batch_first = {}
+    start = time.perf_counter()
+    for text in texts:
+        for ngram, tokens, i, end, terms in document_ngrams(text, index, stop_words, max_n, grammars):
+            batch_counts[ngram] += 1
+            if ngram not in batch_first:
+                batch_first[ngram] = (context_of(tokens, i, end), terms)
+        documents += 1
+        if documents % batch_size == 0:
+            flush(batch_counts, batch_first)
+            batch_counts, batch_first = Counter(), {}
+        if log_every and documents % log_every == 0:
+            print(f"{documents} documents ({documents / (time.perf_counter() - start):.0f}/s)", file=sys.stderr)
+    if batch_counts:
+        flush(batch_counts, batch_first)
+    return hitters, documents
+
+def write_candidates(path: str, hitters: HeavyHitters, top: int, min_count: int) -> int:
+    rows = [(key, count) for key, count in hitters.ranked()[:top] if count >= min_count]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["rank", "ngram", "words", "estimated_count", "rule_terms_nearby", "examples"])
+        for rank, (key, count) in enumerate(rows, start=1):
+            nearby = ", ".join(term for term, _ in hitters.rule_terms[key].most_common(5))
+            writer.writerow([rank, key, len(key.split()), count, nearby, " | ".join(hitters.contexts[key])])
+    return len(rows)
+
+# ----------------- CLI -----------------
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Find frequent phrases in a corpus that no rule covers.")
+    parser.add_argument("corpus", help="Text file with one description per line, or JSONL with 'id' and 'description'.")
+    parser.add_argument("--versions", nargs="+", choices=list(RULE_VERSIONS), default=ENGLISH_VERSIONS,
+                        help="Rule versions whose vocabulary counts as covered.")
+    parser.add_argument("--output", default="vocabulary_candidates.csv")
+    parser.add_argument("--max-n", type=int, default=4, help="Longest n-gram in words.")
+    parser.add_argument("--top", type=int, default=500)
+    parser.add_argument("--min-count", type=int, default=5)
+    parser.add_argument("--examples", type=int, default=3, help="Example contexts per candidate.")
+    parser.add_argument("--width", type=int, default=1 << 20, help="Count-min sketch width.")
+    parser.add_argument("--depth", type=int, default=4, help="Count-min sketch depth.")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    hitters, documents = mine((text for _, text in iter_corpus(args.corpus)), args.versions, args.max_n,
+                              args.width, args.depth, args.top, args.examples)
+    written = write_candidates(args.output, hitters, args.top, args.min_count)
+    print(f"Mined {documents} documents in {time.perf_counter() - start:.1f}s; "
+          f"{written} candidates written to {args.output}")
+    for key, count in hitters.ranked()[:20]:
+        print(f"  {count:>8}  {key}")
+
+if __name__ == "__main__":
+    main()